@@ -2,6 +2,14 @@ from __future__ import annotations
 
 import base64
 from dataclasses import dataclass
+from typing import Any
+
+# Bump whenever CAPTION_PROMPT changes so cached captions are not reused across prompts.
+PROMPT_VERSION = "1"
+CAPTION_PROMPT = (
+    "请识别图片内容，输出一句中文描述（不超过40字），尽量包含关键信息。"
+    "只返回纯文本，不要加引号，不要输出 Markdown。"
+)
 
 
 @dataclass(frozen=True)
@@ -29,6 +37,19 @@ class AzureOpenAIVisionClient:
             temperature=config.temperature,
         )
 
+    @classmethod
+    def from_settings(cls, settings: dict[str, Any]) -> "AzureOpenAIVisionClient":
+        cfg = AzureOpenAIVisionConfig(
+            endpoint=settings.get("aoai_endpoint", "") or "",
+            key=settings.get("aoai_key", "") or "",
+            deployment=settings.get("aoai_deployment", "") or "",
+            api_version=settings.get("aoai_api_version", "") or "",
+            temperature=float(settings.get("aoai_temperature", 0.0) or 0.0),
+        )
+        if not cfg.endpoint or not cfg.key or not cfg.deployment or not cfg.api_version:
+            raise ValueError("aoai_config_missing")
+        return cls(cfg)
+
     def describe_image(self, image_bytes: bytes, hint: str = "") -> str:
         try:
             from langchain_core.messages import HumanMessage
@@ -36,10 +57,7 @@ class AzureOpenAIVisionClient:
             raise Exception(f"langchain_core_missing: {e}")
 
         b64 = base64.b64encode(image_bytes).decode("ascii")
-        prompt = (
-            "请识别图片内容，输出一句中文描述（不超过40字），尽量包含关键信息。"
-            "只返回纯文本，不要加引号，不要输出 Markdown。"
-        )
+        prompt = CAPTION_PROMPT
         hint = (hint or "").strip()
         if hint:
             prompt = f"{prompt}\n\n已知上下文（可选）：{hint}"
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from typing import Callable, TypeVar
+
+from loguru import logger
+
+from .. import metrics
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate_per_min`."""
+
+    def __init__(self, rate_per_min: float, capacity: float | None = None) -> None:
+        self.rate_per_s = float(rate_per_min) / 60.0
+        self.capacity = float(capacity if capacity is not None else rate_per_min)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_s)
+        self._updated = now
+
+    def acquire(self, amount: float = 1.0) -> None:
+        # A request larger than the bucket would never fit; let it drain the bucket instead.
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait_s = (amount - self._tokens) / self.rate_per_s
+            time.sleep(wait_s)
+
+
+class RateLimiter:
+    """Requests/min and tokens/min budget shared by all caption workers.
+
+    A 0 limit disables that bucket. `pause` blocks every caller, used when the
+    service answers 429 so the whole pool backs off, not just one worker.
+    """
+
+    def __init__(self, requests_per_min: float = 0, tokens_per_min: float = 0) -> None:
+        self._requests = TokenBucket(requests_per_min) if requests_per_min > 0 else None
+        self._tokens = TokenBucket(tokens_per_min) if tokens_per_min > 0 else None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, delay_s: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay_s)
+
+    def acquire(self, tokens: int = 0) -> None:
+        while True:
+            with self._lock:
+                wait_s = self._paused_until - time.monotonic()
+            if wait_s <= 0:
+                break
+            time.sleep(wait_s)
+        if self._requests is not None:
+            self._requests.acquire(1)
+        if self._tokens is not None and tokens > 0:
+            self._tokens.acquire(tokens)
+
+
+def is_rate_limited(err: BaseException) -> bool:
+    """A 429 by status code or the SDK's RateLimitError type, never by message text."""
+    for exc in (err, err.__cause__):
+        if exc is None:
+            continue
+        for obj in (exc, getattr(exc, "response", None)):
+            if getattr(obj, "status_code", None) == 429:
+                return True
+        # openai.RateLimitError and its subclasses, without importing the SDK here.
+        if any(cls.__name__ == "RateLimitError" for cls in type(exc).__mro__):
+            return True
+    return False
+
+
+def retry_after_s(err: Exception) -> float | None:
+    headers = getattr(getattr(err, "response", None), "headers", None) or {}
+    for name in ("retry-after-ms", "Retry-After-Ms"):
+        if name in headers:
+            try:
+                return float(headers[name]) / 1000.0
+            except (TypeError, ValueError):
+                pass
+    for name in ("retry-after", "Retry-After"):
+        if name in headers:
+            try:
+                return float(headers[name])
+            except (TypeError, ValueError):
+                pass
+    return None
+
+
+def call_with_backoff(
+    fn: Callable[[], T],
+    limiter: RateLimiter,
+    tokens: int = 0,
+    retries: int = 5,
+    base_delay_s: float = 2.0,
+    max_delay_s: float = 60.0,
+) -> T:
+    attempt = 0
+    while True:
+        limiter.acquire(tokens)
+        try:
+            return fn()
+        except Exception as e:
+            if not is_rate_limited(e) or attempt >= retries:
+                raise
+            delay_s = retry_after_s(e)
+            if delay_s is None:
+                delay_s = min(max_delay_s, base_delay_s * (2**attempt)) * (0.5 + random.random() / 2)
+            attempt += 1
+            metrics.incr("ai_retries")
+            logger.warning(f"aoai_rate_limited: retry={attempt} delay_s={delay_s:.1f}")
+            limiter.pause(delay_s)
@@ -0,0 +1,496 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import dataclasses
+import glob
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Iterable
+
+from loguru import logger
+
+from .cache.parse_cache import ParseCache, open_parse_cache
+from .context import PipelineConfig, PipelineContext
+from .incremental import (
+    STATUS_ADDED,
+    STATUS_CHANGED,
+    STATUS_UNCHANGED,
+    IncrementalManifest,
+    config_fingerprint,
+    has_outputs,
+)
+from .metrics import MetricsRecorder, activate, merge_metrics, write_metrics
+from .pipeline import RagPreprocessPipeline
+from .utils.file_utils import BATCH_STATE_DIR, batch_state_dir, calculate_file_md5, get_file_extension
+
+
+@dataclass(frozen=True)
+class BatchJob:
+    input_path: str
+    output_dir: str
+
+
+@dataclass
+class BatchResult:
+    input_path: str
+    output_dir: str
+    ok: bool
+    size_bytes: int = 0
+    elapsed_s: float = 0.0
+    error: str | None = None
+    status: str | None = None
+    input_md5: str | None = None
+    config_fingerprint: str | None = None
+    output_md5: str | None = None
+    metrics: dict[str, Any] | None = None
+
+
+@dataclass
+class BatchSummary:
+    total: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    total_bytes: int = 0
+    elapsed_s: float = 0.0
+    docs_per_s: float = 0.0
+    mb_per_s: float = 0.0
+    added: int = 0
+    changed: int = 0
+    removed: int = 0
+    unchanged: int = 0
+    failures: list[dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        return dataclasses.asdict(self)
+
+
+def collect_input_files(
+    input_dir: str | None = None,
+    pattern: str | None = None,
+    manifest: str | None = None,
+) -> list[str]:
+    files: list[str] = []
+    if input_dir:
+        for root, dirs, names in os.walk(input_dir):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for name in sorted(names):
+                if name.startswith("."):
+                    continue
+                files.append(os.path.join(root, name))
+    if pattern:
+        for path in sorted(glob.glob(pattern, recursive=True)):
+            if os.path.isfile(path):
+                files.append(path)
+    if manifest:
+        base_dir = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                path = line if os.path.isabs(line) else os.path.join(base_dir, line)
+                files.append(path)
+
+    seen: set[str] = set()
+    unique: list[str] = []
+    for path in files:
+        path = os.path.abspath(path)
+        if path in seen:
+            continue
+        seen.add(path)
+        unique.append(path)
+    return unique
+
+
+def build_jobs(files: list[str], output_root: str, base_dir: str | None = None) -> list[BatchJob]:
+    if not files:
+        return []
+    if base_dir is None:
+        base_dir = os.path.commonpath([os.path.dirname(p) for p in files])
+
+    jobs: list[BatchJob] = []
+    for path in files:
+        rel = os.path.relpath(path, base_dir)
+        if rel.startswith(".."):
+            rel = os.path.basename(path)
+        if rel.split(os.sep)[0] == BATCH_STATE_DIR:
+            rel = "_" + rel
+        jobs.append(BatchJob(input_path=path, output_dir=os.path.join(output_root, rel)))
+    return jobs
+
+
+def run_job(
+    job: BatchJob,
+    config: PipelineConfig,
+    ai_settings: dict[str, Any] | None = None,
+    previous_state: dict[str, Any] | None = None,
+    ai_client: Any = None,
+    record_metrics: bool = False,
+) -> BatchResult:
+    started = time.perf_counter()
+    context: PipelineContext | None = None
+    try:
+        context = job_context(job, config, ai_settings, previous_state, ai_client, record_metrics)
+        ok = RagPreprocessPipeline(context).run()
+        error = None if ok else (context.error or "pipeline_failed")
+    except Exception as e:
+        ok = False
+        error = f"{type(e).__name__}: {e}"
+    return job_result(job, context, ok, error, time.perf_counter() - started)
+
+
+def job_context(
+    job: BatchJob,
+    config: PipelineConfig,
+    ai_settings: dict[str, Any] | None = None,
+    previous_state: dict[str, Any] | None = None,
+    ai_client: Any = None,
+    record_metrics: bool = False,
+) -> PipelineContext:
+    os.makedirs(job.output_dir, exist_ok=True)
+    parser_kwargs = dict(config.parser_kwargs or {})
+    parser_kwargs["output_dir"] = job.output_dir
+    context = PipelineContext(
+        input_path=job.input_path,
+        output_dir=job.output_dir,
+        config=dataclasses.replace(config, parser_kwargs=parser_kwargs),
+    )
+    context.ai_settings = dict(ai_settings) if ai_settings else None
+    context.ai_client = ai_client
+    context.previous_state = previous_state
+    if record_metrics:
+        context.metrics = MetricsRecorder(trace_memory=config.trace_memory)
+    return context
+
+
+def job_result(
+    job: BatchJob,
+    context: PipelineContext | None,
+    ok: bool,
+    error: str | None,
+    elapsed_s: float,
+) -> BatchResult:
+    try:
+        size_bytes = os.path.getsize(job.input_path)
+    except OSError:
+        size_bytes = 0
+    return BatchResult(
+        input_path=job.input_path,
+        output_dir=job.output_dir,
+        ok=ok,
+        size_bytes=size_bytes,
+        elapsed_s=elapsed_s,
+        error=error,
+        status=context.change_status if context is not None else None,
+        input_md5=context.input_md5 if context is not None else None,
+        config_fingerprint=context.config_fingerprint if context is not None else None,
+        output_md5=context.output_md5 if context is not None else None,
+        metrics=context.metrics.to_dict() if context is not None and context.metrics is not None else None,
+    )
+
+
+def summarize(results: Iterable[BatchResult], elapsed_s: float) -> BatchSummary:
+    summary = BatchSummary(elapsed_s=elapsed_s)
+    for r in results:
+        summary.total += 1
+        summary.total_bytes += r.size_bytes
+        if r.ok:
+            summary.succeeded += 1
+            if r.status == STATUS_ADDED:
+                summary.added += 1
+            elif r.status == STATUS_CHANGED:
+                summary.changed += 1
+            elif r.status == STATUS_UNCHANGED:
+                summary.unchanged += 1
+        else:
+            summary.failed += 1
+            summary.failures.append({"input_path": r.input_path, "output_dir": r.output_dir, "error": r.error})
+    if elapsed_s > 0:
+        summary.docs_per_s = summary.total / elapsed_s
+        summary.mb_per_s = summary.total_bytes / (1024 * 1024) / elapsed_s
+    return summary
+
+
+def run_batch(
+    jobs: list[BatchJob],
+    config: PipelineConfig,
+    ai_settings: dict[str, Any] | None = None,
+    workers: int = 1,
+    output_root: str | None = None,
+) -> tuple[list[BatchResult], BatchSummary]:
+    started = time.perf_counter()
+    results: list[BatchResult] = []
+    total = len(jobs)
+
+    manifest: IncrementalManifest | None = None
+    if config.incremental and output_root:
+        manifest = IncrementalManifest.load(output_root)
+
+    def _collect(result: BatchResult) -> None:
+        results.append(result)
+        if not result.ok:
+            logger.warning(f"batch_doc_failed: file={result.input_path} err={result.error}")
+        logger.info(f"batch_progress: {len(results)}/{total}")
+
+    if workers <= 1 or total <= 1:
+        for job in jobs:
+            _collect(run_job(job, config, ai_settings, _previous(manifest, job)))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(run_job, job, config, ai_settings, _previous(manifest, job)): job
+                for job in jobs
+            }
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = BatchResult(
+                        input_path=job.input_path,
+                        output_dir=job.output_dir,
+                        ok=False,
+                        error=f"{type(e).__name__}: {e}",
+                    )
+                _collect(result)
+
+    return _finish_batch(jobs, results, manifest, output_root, started, config)
+
+
+def run_batch_async_di(
+    jobs: list[BatchJob],
+    config: PipelineConfig,
+    ai_settings: dict[str, Any] | None = None,
+    workers: int = 1,
+    output_root: str | None = None,
+    di_concurrency: int = 8,
+    di_tps: float = 15.0,
+) -> tuple[list[BatchResult], BatchSummary]:
+    """Batch layout mode with Azure DI analyses pipelined across documents.
+
+    All documents are submitted to an AsyncLayoutAnalyzer up front. Each
+    finished analysis is saved to <output_dir>/di_result and immediately
+    handed to a worker that runs the regular pipeline in layout-replay mode
+    (table merge, figure placement, chunking, writing), while other
+    analyses are still running. Documents already in the parse cache skip
+    the analysis and run the regular layout pipeline, which reads the cache.
+    """
+    from .parser.azure_di.async_analyzer import AsyncLayoutAnalyzer
+    from .parser.azure_di.di_tools import DI_RESULT_DIR, AzureDocumentIntelligenceTools
+
+    started = time.perf_counter()
+    results: list[BatchResult] = []
+    total = len(jobs)
+
+    manifest: IncrementalManifest | None = None
+    if config.incremental and output_root:
+        manifest = IncrementalManifest.load(output_root)
+
+    di_config = AzureDocumentIntelligenceTools()._resolve_config(**(config.parser_kwargs or {}))
+    replay_config = dataclasses.replace(config, extractor="layout-replay")
+    fingerprint = config_fingerprint(config, ai_settings)
+
+    def _collect(result: BatchResult) -> None:
+        results.append(result)
+        if not result.ok:
+            logger.warning(f"batch_doc_failed: file={result.input_path} err={result.error}")
+        logger.info(f"batch_progress: {len(results)}/{total}")
+
+    cache = open_parse_cache(config)
+    pending: list[BatchJob] = []
+    cached: list[BatchJob] = []
+    for job in jobs:
+        previous = _previous(manifest, job)
+        input_md5 = calculate_file_md5(job.input_path) if previous or cache is not None else ""
+        if (
+            previous
+            and previous.get("config_fingerprint") == fingerprint
+            and previous.get("input_md5") == input_md5
+            and has_outputs(job.output_dir)
+        ):
+            # Unchanged: the pipeline's incremental check stops before parsing, no analysis needed.
+            _collect(run_job(job, config, ai_settings, previous))
+        elif cache is not None and cache.contains(
+            ParseCache.make_key(
+                input_md5,
+                config.parser or get_file_extension(job.input_path) or "txt",
+                config.extractor,
+                config.parser_kwargs,
+            )
+        ):
+            cached.append(job)
+        else:
+            pending.append(job)
+    if cached:
+        logger.info(f"async_di_parse_cache_hits: docs={len(cached)}")
+
+    async def _run() -> None:
+        loop = asyncio.get_running_loop()
+        by_key = {job.input_path: job for job in pending}
+        futures: list[asyncio.Future] = []
+        # An explicit single thread, not asyncio's default pool, keeps replays bounded by --workers.
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else ThreadPoolExecutor(max_workers=1)
+
+        def submit(job: BatchJob, job_config: PipelineConfig) -> None:
+            future = loop.run_in_executor(executor, run_job, job, job_config, ai_settings, _previous(manifest, job))
+            future.add_done_callback(lambda f, job=job: _collect(_job_result(f, job)))
+            futures.append(future)
+
+        def on_done(doc: Any) -> None:
+            job = by_key[doc.key]
+            if doc.error:
+                _collect(BatchResult(input_path=job.input_path, output_dir=job.output_dir, ok=False, error=doc.error))
+                return
+            submit(job, replay_config)
+
+        try:
+            for job in cached:
+                submit(job, config)
+            if pending:
+                analyzer = AsyncLayoutAnalyzer(
+                    di_config,
+                    max_in_flight=di_concurrency,
+                    tps=di_tps,
+                    shard_pages=int((config.parser_kwargs or {}).get("di_shard_pages") or 0),
+                )
+                items = [(job.input_path, job.input_path, os.path.join(job.output_dir, DI_RESULT_DIR)) for job in pending]
+                await analyzer.analyze_many(items, on_done)
+            if futures:
+                await asyncio.gather(*futures, return_exceptions=True)
+        finally:
+            executor.shutdown()
+
+    for job in pending:
+        os.makedirs(job.output_dir, exist_ok=True)
+    # Analyses run in this process, outside any document pipeline; record them as their own stage.
+    stage = MetricsRecorder(trace_memory=config.trace_memory) if config.metrics_formats else None
+    if pending or cached:
+        measure = stage.step("AsyncLayoutAnalyze") if stage is not None else contextlib.nullcontext()
+        with activate(stage), measure:
+            asyncio.run(_run())
+
+    return _finish_batch(jobs, results, manifest, output_root, started, config, [stage.to_dict()] if stage else [])
+
+
+def run_batch_staged(
+    jobs: list[BatchJob],
+    config: PipelineConfig,
+    ai_settings: dict[str, Any] | None = None,
+    stages: list[Any] | None = None,
+    output_root: str | None = None,
+    ai_client: Any = None,
+) -> tuple[list[BatchResult], BatchSummary]:
+    """Batch mode on the staged scheduler: parsing, chunking, captioning and
+    writing of different documents overlap, each stage with its own workers.
+    All documents share one vision client."""
+    from .scheduler import StagedScheduler, default_stages
+
+    started = time.perf_counter()
+    results: list[BatchResult] = []
+    total = len(jobs)
+
+    manifest: IncrementalManifest | None = None
+    if config.incremental and output_root:
+        manifest = IncrementalManifest.load(output_root)
+
+    def _collect(result: BatchResult) -> None:
+        results.append(result)
+        if not result.ok:
+            logger.warning(f"batch_doc_failed: file={result.input_path} err={result.error}")
+        logger.info(f"batch_progress: {len(results)}/{total}")
+
+    if ai_client is None and (ai_settings or {}).get("enable_image_caption"):
+        from .ai.azure_openai_vision_client import AzureOpenAIVisionClient
+
+        try:
+            ai_client = AzureOpenAIVisionClient.from_settings(ai_settings or {})
+        except Exception as e:
+            # Left unset, each document's caption step reports the error as before.
+            logger.warning(f"staged_ai_client_unavailable: err={e}")
+
+    scheduler = StagedScheduler(stages or default_stages(), config, ai_settings, ai_client=ai_client)
+    scheduler.run(jobs, previous_state=lambda job: _previous(manifest, job), on_result=_collect)
+    return _finish_batch(jobs, results, manifest, output_root, started, config)
+
+
+def _finish_batch(
+    jobs: list[BatchJob],
+    results: list[BatchResult],
+    manifest: IncrementalManifest | None,
+    output_root: str | None,
+    started: float,
+    config: PipelineConfig | None = None,
+    stage_metrics: list[dict[str, Any]] | None = None,
+) -> tuple[list[BatchResult], BatchSummary]:
+    order = {job.input_path: i for i, job in enumerate(jobs)}
+    results.sort(key=lambda r: order.get(r.input_path, 0))
+
+    removed: list[dict[str, Any]] = []
+    if manifest is not None and output_root:
+        for r in results:
+            if r.ok:
+                manifest.record(r.input_path, r.input_md5, r.config_fingerprint, r.output_md5, r.output_dir)
+        removed = manifest.remove_missing({job.input_path for job in jobs})
+        for entry in removed:
+            _remove_outputs(output_root, entry.get("output_dir"))
+        manifest.save()
+
+    summary = summarize(results, time.perf_counter() - started)
+    summary.removed = len(removed)
+    logger.info(
+        f"batch_done: docs={summary.total} ok={summary.succeeded} failed={summary.failed} "
+        f"docs_per_s={summary.docs_per_s:.2f} mb_per_s={summary.mb_per_s:.2f}"
+    )
+    if config is not None and config.metrics_formats and output_root:
+        runs = list(stage_metrics or []) + [r.metrics for r in results if r.metrics]
+        totals = merge_metrics(runs)
+        totals["attributes"].update({"documents": len(results), "elapsed_s": summary.elapsed_s})
+        write_metrics(totals, batch_state_dir(output_root), config.metrics_formats)
+    if manifest is not None:
+        logger.info(
+            f"incremental_summary: added={summary.added} changed={summary.changed} "
+            f"removed={summary.removed} unchanged={summary.unchanged}"
+        )
+    return results, summary
+
+
+def _job_result(future: Any, job: BatchJob) -> BatchResult:
+    try:
+        return future.result()
+    except Exception as e:
+        return BatchResult(
+            input_path=job.input_path,
+            output_dir=job.output_dir,
+            ok=False,
+            error=f"{type(e).__name__}: {e}",
+        )
+
+
+def _previous(manifest: IncrementalManifest | None, job: BatchJob) -> dict[str, Any] | None:
+    if manifest is None:
+        return None
+    return manifest.get(job.input_path)
+
+
+def _remove_outputs(output_root: str, output_dir: str | None) -> None:
+    if not output_dir:
+        return
+    output_root = os.path.abspath(output_root)
+    output_dir = os.path.abspath(output_dir)
+    if output_dir != output_root and output_dir.startswith(output_root + os.sep):
+        shutil.rmtree(output_dir, ignore_errors=True)
+        logger.info(f"incremental_removed_outputs: {output_dir}")
+
+
+def write_batch_summary(output_root: str, summary: BatchSummary) -> str:
+    state_dir = batch_state_dir(output_root)
+    os.makedirs(state_dir, exist_ok=True)
+    path = os.path.join(state_dir, "batch_summary.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(summary.to_dict(), f, ensure_ascii=False, indent=2)
+    return path
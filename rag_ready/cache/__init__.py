@@ -0,0 +1,16 @@
+from typing import TYPE_CHECKING
+
+from ..utils.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .caption_cache import CaptionCache
+    from .parse_cache import ParseCache
+
+_EXPORTS = {
+    "CaptionCache": ".caption_cache:CaptionCache",
+    "ParseCache": ".parse_cache:ParseCache",
+}
+
+__all__ = list(_EXPORTS)
+
+__getattr__ = lazy_exports(__name__, _EXPORTS)
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import time
+
+from loguru import logger
+
+from .. import metrics
+from ..utils.image_hash import BKTree
+
+DEFAULT_MAX_DISTANCE = 4
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS captions (
+    image_hash TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    caption TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (image_hash, model, prompt_version)
+)
+"""
+
+
+class CaptionCache:
+    """SQLite store of image captions keyed by dHash, model deployment and prompt version.
+
+    A lookup matches any stored hash within `max_distance` bits, so the same
+    logo or diagram re-encoded in another document reuses its caption.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 0,
+        max_age_s: float = 0.0,
+        max_distance: int = DEFAULT_MAX_DISTANCE,
+    ) -> None:
+        self.path = os.path.abspath(path)
+        self.max_entries = int(max_entries or 0)
+        self.max_age_s = float(max_age_s or 0.0)
+        self.max_distance = int(max_distance)
+        self.hits = 0
+        self.misses = 0
+        self._known: dict[tuple[str, str], BKTree[str]] = {}
+
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def close(self) -> None:
+        self.prune()
+        self._conn.close()
+
+    def lookup(self, image_hash: str, model: str, prompt_version: str) -> str | None:
+        row = self._conn.execute(
+            "SELECT caption FROM captions WHERE image_hash = ? AND model = ? AND prompt_version = ?",
+            (image_hash, model, prompt_version),
+        ).fetchone()
+        matched_hash = image_hash if row else None
+
+        if row is None and self.max_distance > 0:
+            matched_hash = self._nearest(image_hash, model, prompt_version)
+            if matched_hash is not None:
+                row = self._conn.execute(
+                    "SELECT caption FROM captions WHERE image_hash = ? AND model = ? AND prompt_version = ?",
+                    (matched_hash, model, prompt_version),
+                ).fetchone()
+
+        if row is None:
+            self.misses += 1
+            metrics.incr("caption_cache_misses")
+            return None
+
+        self.hits += 1
+        metrics.incr("caption_cache_hits")
+        self._conn.execute(
+            "UPDATE captions SET last_used = ? WHERE image_hash = ? AND model = ? AND prompt_version = ?",
+            (time.time(), matched_hash, model, prompt_version),
+        )
+        self._conn.commit()
+        return str(row[0])
+
+    def store(self, image_hash: str, model: str, prompt_version: str, caption: str) -> None:
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO captions (image_hash, model, prompt_version, caption, created_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (image_hash, model, prompt_version, caption, now, now),
+        )
+        self._conn.commit()
+        known = self._known.get((model, prompt_version))
+        if known is not None:
+            known.add(int(image_hash, 16), image_hash)
+
+    def prune(self) -> int:
+        removed = 0
+        if self.max_age_s > 0:
+            cur = self._conn.execute("DELETE FROM captions WHERE last_used < ?", (time.time() - self.max_age_s,))
+            removed += cur.rowcount
+        if self.max_entries > 0:
+            cur = self._conn.execute(
+                "DELETE FROM captions WHERE rowid IN ("
+                "SELECT rowid FROM captions ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            removed += cur.rowcount
+        self._conn.commit()
+        if removed:
+            self._known.clear()
+            logger.info(f"caption_cache_pruned: entries={removed}")
+        return removed
+
+    def _nearest(self, image_hash: str, model: str, prompt_version: str) -> str | None:
+        key = (model, prompt_version)
+        known = self._known.get(key)
+        if known is None:
+            rows = self._conn.execute(
+                "SELECT image_hash FROM captions WHERE model = ? AND prompt_version = ?",
+                key,
+            ).fetchall()
+            known = BKTree()
+            for (h,) in rows:
+                known.add(int(h, 16), h)
+            self._known[key] = known
+
+        match = known.find(int(image_hash, 16), self.max_distance)
+        return match[1] if match else None
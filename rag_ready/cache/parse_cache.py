@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+
+from loguru import logger
+
+from ..context import PipelineConfig
+from ..models.document_model import DocumentInfo
+
+# parser_kwargs that never change the parsed result (paths, secrets, transport)
+IGNORED_PARSER_KWARGS = {
+    "output_dir",
+    "azure_di_key",
+    "no_proxy",
+    "file_info",
+    "figure_fetch_workers",
+    "save_di_result",
+    "di_result_dir",
+    "figure_index_path",
+}
+
+# Replaying a saved Azure DI analysis yields what the live layout call produced, so both share entries.
+_EXTRACTOR_ALIASES = {"layout-replay": "layout"}
+
+_RE_IMAGE_REF = re.compile(r"!\[[^\]]*\]\(([^)]+)\)")
+
+DOCUMENT_FILE = "document.json"
+FILES_DIR = "files"
+PRUNE_MARKER = ".last_prune"
+PRUNE_INTERVAL_S = 300.0
+
+
+class ParseCache:
+    """On-disk cache of parsed DocumentInfo, one directory per key.
+
+    Local images referenced by the parsed Markdown are stored alongside the
+    entry and restored into the output dir on a hit. Entries are evicted by
+    last use: older than max_age_s, or least recently used beyond max_bytes.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 0, max_age_s: float = 0.0) -> None:
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = int(max_bytes or 0)
+        self.max_age_s = float(max_age_s or 0.0)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(file_md5: str, parser_name: str, extractor: str | None, parser_kwargs: dict | None) -> str:
+        relevant = {
+            k: v
+            for k, v in sorted((parser_kwargs or {}).items())
+            if k not in IGNORED_PARSER_KWARGS
+        }
+        payload = json.dumps(
+            {
+                "md5": file_md5,
+                "parser": parser_name,
+                "extractor": _EXTRACTOR_ALIASES.get(extractor or "", extractor or ""),
+                "kwargs": relevant,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def contains(self, key: str) -> bool:
+        """Whether `get` would find a live entry, without reading or touching it."""
+        try:
+            mtime = os.path.getmtime(os.path.join(self._entry_dir(key), DOCUMENT_FILE))
+        except OSError:
+            return False
+        return not (self.max_age_s > 0 and time.time() - mtime > self.max_age_s)
+
+    def get(self, key: str, output_dir: str | None = None) -> DocumentInfo | None:
+        entry_dir = self._entry_dir(key)
+        doc_path = os.path.join(entry_dir, DOCUMENT_FILE)
+        try:
+            if self.max_age_s > 0 and time.time() - os.path.getmtime(doc_path) > self.max_age_s:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                return None
+            with open(doc_path, "r", encoding="utf-8") as f:
+                doc_info = DocumentInfo.model_validate_json(f.read())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"parse_cache_read_failed: key={key} err={e}")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return None
+
+        files_dir = os.path.join(entry_dir, FILES_DIR)
+        if output_dir and os.path.isdir(files_dir):
+            shutil.copytree(files_dir, output_dir, dirs_exist_ok=True)
+
+        try:
+            os.utime(doc_path)
+        except OSError:
+            pass
+        return doc_info
+
+    def put(self, key: str, doc_info: DocumentInfo, output_dir: str | None = None) -> None:
+        entry_dir = self._entry_dir(key)
+        tmp_dir = f"{entry_dir}.tmp-{uuid.uuid4().hex}"
+        try:
+            os.makedirs(tmp_dir)
+            for rel_path in self._local_image_refs(doc_info, output_dir):
+                dst = os.path.join(tmp_dir, FILES_DIR, rel_path)
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                shutil.copyfile(os.path.join(output_dir, rel_path), dst)
+            with open(os.path.join(tmp_dir, DOCUMENT_FILE), "w", encoding="utf-8") as f:
+                f.write(doc_info.model_dump_json())
+
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+        except Exception as e:
+            logger.warning(f"parse_cache_write_failed: key={key} err={e}")
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        self._maybe_prune()
+
+    def prune(self) -> int:
+        entries: list[tuple[float, int, str]] = []
+        now = time.time()
+        removed = 0
+        for shard in os.listdir(self.cache_dir):
+            shard_dir = os.path.join(self.cache_dir, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                entry_dir = os.path.join(shard_dir, name)
+                doc_path = os.path.join(entry_dir, DOCUMENT_FILE)
+                try:
+                    st = os.stat(doc_path)
+                except OSError:
+                    continue
+                if self.max_age_s > 0 and now - st.st_mtime > self.max_age_s:
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                    removed += 1
+                    continue
+                entries.append((st.st_mtime, self._dir_size(entry_dir), entry_dir))
+
+        if self.max_bytes > 0:
+            total = sum(size for _, size, _ in entries)
+            for _, size, entry_dir in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                total -= size
+                removed += 1
+
+        if removed:
+            logger.info(f"parse_cache_pruned: entries={removed}")
+        return removed
+
+    def _maybe_prune(self) -> None:
+        if self.max_bytes <= 0 and self.max_age_s <= 0:
+            return
+        marker = os.path.join(self.cache_dir, PRUNE_MARKER)
+        try:
+            if time.time() - os.path.getmtime(marker) < PRUNE_INTERVAL_S:
+                return
+        except OSError:
+            pass
+        with open(marker, "w", encoding="utf-8"):
+            pass
+        self.prune()
+
+    def _local_image_refs(self, doc_info: DocumentInfo, output_dir: str | None) -> list[str]:
+        if not output_dir:
+            return []
+        texts: list[str] = [doc_info.content or ""]
+        texts.extend(page.content or "" for page in doc_info.page_list)
+
+        refs: list[str] = []
+        seen: set[str] = set()
+        for text in texts:
+            if "![" not in text:
+                continue
+            for m in _RE_IMAGE_REF.finditer(text):
+                rel_path = m.group(1).strip()
+                if rel_path in seen or os.path.isabs(rel_path) or rel_path.startswith(("..", "data:")) or "://" in rel_path:
+                    continue
+                seen.add(rel_path)
+                if os.path.isfile(os.path.join(output_dir, rel_path)):
+                    refs.append(rel_path)
+        return refs
+
+    @staticmethod
+    def _dir_size(path: str) -> int:
+        total = 0
+        for root, _, names in os.walk(path):
+            for name in names:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+
+def open_parse_cache(config: PipelineConfig) -> ParseCache | None:
+    if not config.parse_cache_dir:
+        return None
+    return ParseCache(
+        config.parse_cache_dir,
+        max_bytes=config.parse_cache_max_bytes,
+        max_age_s=config.parse_cache_max_age_s,
+    )
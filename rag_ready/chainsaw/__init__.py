@@ -1,9 +1,29 @@
-from .chainsaw_man import ChainsawMan
-from .recursive_character_text import RecursiveCharacterText
-from .chainsaw_factory import ChainsawFactory
-
-__all__ = [
-    "ChainsawMan",
-    "RecursiveCharacterText",
-    "ChainsawFactory",
-]
+from typing import TYPE_CHECKING
+
+from ..utils.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .chainsaw_man import ChainsawMan
+    from .recursive_character_text import RecursiveCharacterText
+    from .langchain_character_text import LangChainRecursiveCharacterText
+    from .token_character_text import TokenRecursiveCharacterText
+    from .markdown_layout import MarkdownLayoutChainsaw, PageChainsaw
+    from .json_records import JsonLinesChainsaw, JsonRecordChainsaw
+    from .chainsaw_factory import CHAINSAWS, ChainsawFactory
+
+_EXPORTS = {
+    "ChainsawMan": ".chainsaw_man:ChainsawMan",
+    "RecursiveCharacterText": ".recursive_character_text:RecursiveCharacterText",
+    "LangChainRecursiveCharacterText": ".langchain_character_text:LangChainRecursiveCharacterText",
+    "TokenRecursiveCharacterText": ".token_character_text:TokenRecursiveCharacterText",
+    "MarkdownLayoutChainsaw": ".markdown_layout:MarkdownLayoutChainsaw",
+    "PageChainsaw": ".markdown_layout:PageChainsaw",
+    "JsonRecordChainsaw": ".json_records:JsonRecordChainsaw",
+    "JsonLinesChainsaw": ".json_records:JsonLinesChainsaw",
+    "ChainsawFactory": ".chainsaw_factory:ChainsawFactory",
+    "CHAINSAWS": ".chainsaw_factory:CHAINSAWS",
+}
+
+__all__ = list(_EXPORTS)
+
+__getattr__ = lazy_exports(__name__, _EXPORTS)
@@ -1,30 +1,75 @@
 from __future__ import annotations
 
-from typing import Dict, Type
+from typing import Dict
 
+from loguru import logger
+
+from ..utils.registry import Registry
 from .chainsaw_man import ChainsawMan
-from .recursive_character_text import RecursiveCharacterText
-
-FILE_TYPE_CHAINSAW: Dict[str, Type[ChainsawMan]] = {
-    "default": RecursiveCharacterText,
-    "md": RecursiveCharacterText,
-    "doc": RecursiveCharacterText,
-    "docx": RecursiveCharacterText,
-    "json": RecursiveCharacterText,
-    "html": RecursiveCharacterText,
-    "htm": RecursiveCharacterText,
-    "txt": RecursiveCharacterText,
+
+CHAINSAW_ENTRY_POINT_GROUP = "rag_ready.chainsaws"
+
+_RECURSIVE = ".recursive_character_text:RecursiveCharacterText"
+_LAYOUT = ".markdown_layout:MarkdownLayoutChainsaw"
+_TOKENS = ".token_character_text:TokenRecursiveCharacterText"
+
+# "module:Class" specs, imported only when that chainsaw is used
+FILE_TYPE_CHAINSAW: Dict[str, str] = {
+    "default": _RECURSIVE,
+    "md": _RECURSIVE,
+    "doc": _RECURSIVE,
+    "docx": _RECURSIVE,
+    "json": ".json_records:JsonRecordChainsaw",
+    "jsonl": ".json_records:JsonLinesChainsaw",
+    "html": _RECURSIVE,
+    "htm": _RECURSIVE,
+    "txt": _RECURSIVE,
+    "recursive": _RECURSIVE,
+    "langchain": ".langchain_character_text:LangChainRecursiveCharacterText",
+    "layout": _LAYOUT,
+    "layout-replay": _LAYOUT,
+    "page": ".markdown_layout:PageChainsaw",
 }
 
+# Installed packages add or replace chainsaws through the `rag_ready.chainsaws`
+# entry point group; `tokens` is the recursive splitter used with --chunk-unit tokens.
+CHAINSAWS: Registry[ChainsawMan] = Registry(
+    CHAINSAW_ENTRY_POINT_GROUP, {**FILE_TYPE_CHAINSAW, "tokens": _TOKENS}, __package__
+)
+
 
 class ChainsawFactory:
-    def __init__(self, chunk_size: int, chunk_overlap: int) -> None:
+    def __init__(
+        self,
+        chunk_size: int,
+        chunk_overlap: int,
+        chunk_unit: str = "chars",
+        tokenizer_path: str | None = None,
+    ) -> None:
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.chunk_unit = chunk_unit
+        self.tokenizer_path = tokenizer_path
 
     def get_chainsaw(self, chainsaw_name: str, file_type: str) -> ChainsawMan:
-        ChainsawClass = FILE_TYPE_CHAINSAW.get(
-            file_type,
-            FILE_TYPE_CHAINSAW.get(chainsaw_name, RecursiveCharacterText),
-        )
-        return ChainsawClass(self.chunk_size, self.chunk_overlap, self.file_info)
+        # An explicitly chosen chainsaw wins over the per-file-type default.
+        if chainsaw_name and chainsaw_name != "default" and chainsaw_name in CHAINSAWS:
+            name = chainsaw_name
+        else:
+            name = file_type if file_type in CHAINSAWS else "default"
+        if self.chunk_unit == "tokens":
+            if CHAINSAWS.spec(name) == _RECURSIVE:
+                name = "tokens"
+            if getattr(CHAINSAWS.resolve(name), "token_aware", False):
+                return CHAINSAWS.instance(name, self.chunk_size, self.chunk_overlap, tokenizer_path=self.tokenizer_path)
+            _warn_once(name)
+        return CHAINSAWS.instance(name, self.chunk_size, self.chunk_overlap)
+
+
+_warned: set[str] = set()
+
+
+def _warn_once(name: str) -> None:
+    if name not in _warned:
+        _warned.add(name)
+        logger.warning(f"chunk_unit_ignored: chainsaw={name} chunk_unit=tokens")
@@ -1,12 +1,21 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import List
+from typing import ClassVar, Iterable, Iterator, List
 
-from ..models.document_model import DocumentInfo
+from ..models.document_model import DocumentChunkInfo, DocumentInfo, DocumentPageInfo
+
+STREAM_WINDOW_MIN_CHARS = 64 * 1024
 
 
 class ChainsawMan(ABC):
+    # Shared by ChainsawFactory across documents with the same settings; set
+    # False in subclasses that keep per-document state.
+    reusable: ClassVar[bool] = True
+    # True when the constructor accepts `tokenizer_path` and then measures
+    # chunk_size in tokens; used by ChainsawFactory for --chunk-unit tokens.
+    token_aware: ClassVar[bool] = False
+
     def __init__(self, chunk_size: int, chunk_overlap: int) -> None:
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
@@ -15,3 +24,34 @@ class ChainsawMan(ABC):
     def split_text(self, doc_info: DocumentInfo) -> List[str]:
         raise NotImplementedError
 
+    def split_chunks(self, doc_info: DocumentInfo) -> List[DocumentChunkInfo]:
+        return [DocumentChunkInfo(text=text, metadata={"part": idx}) for idx, text in enumerate(self.split_text(doc_info))]
+
+    def iter_chunks(self, blocks: Iterable[DocumentPageInfo]) -> Iterator[DocumentChunkInfo]:
+        """Split a stream of text blocks while holding only a bounded window.
+
+        Blocks are concatenated into a buffer; once it exceeds the window it is
+        split and every chunk except the last is emitted. The last one is kept
+        as the head of the next window so chunks never end at a block edge.
+        """
+        window = max(self.chunk_size * 16, STREAM_WINDOW_MIN_CHARS)
+        buffer = ""
+        part = 0
+        for block in blocks:
+            buffer += block.content or ""
+            if len(buffer) < window:
+                continue
+            parts = self.split_text(DocumentInfo(content=buffer))
+            if not parts:
+                buffer = ""
+                continue
+            for text in parts[:-1]:
+                yield DocumentChunkInfo(text=text, metadata={"part": part})
+                part += 1
+            tail_at = buffer.rfind(parts[-1])
+            buffer = buffer[tail_at:] if tail_at >= 0 else parts[-1]
+
+        if buffer:
+            for text in self.split_text(DocumentInfo(content=buffer)):
+                yield DocumentChunkInfo(text=text, metadata={"part": part})
+                part += 1
@@ -0,0 +1,381 @@
+from __future__ import annotations
+
+import itertools
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional
+
+from loguru import logger
+
+from ..models.document_model import DocumentChunkInfo, DocumentInfo, DocumentPageInfo
+from .chainsaw_man import ChainsawMan
+from .token_character_text import CountTokens, length_splitter
+
+# Consumed text is dropped from the reader buffer once this much has piled up.
+COMPACT_AT = 64 * 1024
+# A container is first decoded in one C-level call over this many characters
+# per chunk_size character; only when it does not fit is it walked token by token.
+FAST_DECODE_RATIO = 8
+
+_WHITESPACE = " \t\r\n"
+_SCALAR_END = re.compile(r"[\s,\]\}:]")
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_CLOSE = {"[": "]", "{": "}"}
+# A JSON Lines root: values separated by newlines, rendered without brackets.
+_LINES = "\n"
+_DECODER = json.JSONDecoder()
+
+
+class JsonSyntaxError(ValueError):
+    def __init__(self, message: str, offset: int, rest: str) -> None:
+        super().__init__(f"{message} at offset {offset}")
+        self.offset = offset
+        self.rest = rest
+
+
+class _Reader:
+    """Pull tokens from a stream of text blocks, holding only unconsumed text."""
+
+    def __init__(self, blocks: Iterator[str]) -> None:
+        self.blocks = blocks
+        self.buf = ""
+        self.pos = 0
+        self.consumed = 0
+
+    def _fill(self) -> bool:
+        for block in self.blocks:
+            if block:
+                if self.pos >= COMPACT_AT or self.pos == len(self.buf):
+                    self.consumed += self.pos
+                    self.buf = self.buf[self.pos :]
+                    self.pos = 0
+                self.buf += block
+                return True
+        return False
+
+    def peek(self) -> str:
+        """Next non-whitespace character without consuming it, "" at the end."""
+        while True:
+            buf = self.buf
+            pos = self.pos
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not self._fill():
+                return ""
+
+    def take(self, expected: str) -> None:
+        if self.peek() != expected:
+            self.fail(f"expected {expected!r}")
+        self.pos += 1
+
+    def decode_within(self, limit: int) -> tuple[object, int] | None:
+        """Decode the value at the cursor if it ends within `limit` characters, without consuming it."""
+        while len(self.buf) - self.pos < limit and self._fill():
+            pass
+        try:
+            return _DECODER.raw_decode(self.buf[self.pos : self.pos + limit])
+        except ValueError:
+            return None
+
+    def token(self) -> str:
+        """A complete string, number or literal token as written in the source."""
+        return self._string() if self.peek() == '"' else self._scalar()
+
+    def _string(self) -> str:
+        parts: List[str] = []
+        start = self.pos
+        scan = start + 1
+        carried = 0  # trailing backslashes of text already moved into `parts`
+        while True:
+            end = self.buf.find('"', scan)
+            if end < 0:
+                parts.append(self.buf[start:])
+                tail = parts[-1]
+                stripped = len(tail) - len(tail.rstrip("\\"))
+                carried = carried + stripped if stripped == len(tail) else stripped
+                self.consumed += len(self.buf)
+                self.buf, self.pos, start, scan = "", 0, 0, 0
+                if not self._fill():
+                    raise JsonSyntaxError("unterminated_string", self.consumed, "".join(parts))
+                continue
+            k = end - 1
+            slashes = 0
+            while k >= start and self.buf[k] == "\\":
+                slashes += 1
+                k -= 1
+            if k < start:
+                slashes += carried
+            if slashes % 2 == 0:
+                parts.append(self.buf[start : end + 1])
+                self.pos = end + 1
+                return "".join(parts)
+            scan = end + 1
+
+    def _scalar(self) -> str:
+        parts: List[str] = []
+        while True:
+            match = _SCALAR_END.search(self.buf, self.pos)
+            if match is not None:
+                parts.append(self.buf[self.pos : match.start()])
+                self.pos = match.start()
+                break
+            parts.append(self.buf[self.pos :])
+            self.pos = len(self.buf)
+            if not self._fill():
+                break
+        token = "".join(parts)
+        if not token:
+            self.fail("expected_value")
+        return token
+
+    def rest(self) -> str:
+        return self.buf[self.pos :]
+
+    def fail(self, message: str) -> None:
+        raise JsonSyntaxError(message, self.consumed + self.pos, self.rest())
+
+
+def _decode(reader: _Reader, token: str) -> object:
+    try:
+        return json.loads(token)
+    except ValueError:
+        raise JsonSyntaxError("invalid_token", reader.consumed + reader.pos - len(token), token + reader.rest())
+
+
+def _render(reader: _Reader, token: str) -> str:
+    # Strings are re-encoded so \uXXXX escapes come out as readable text.
+    value = _decode(reader, token)
+    return json.dumps(value, ensure_ascii=False) if isinstance(value, str) else token
+
+
+def _member_path(parent: str, key: str) -> str:
+    if _IDENTIFIER.match(key):
+        return f"{parent}.{key}"
+    return f"{parent}[{json.dumps(key, ensure_ascii=False)}]"
+
+
+@dataclass
+class _Frame:
+    kind: str
+    path: str
+    prefix: str
+    prefix_size: int = 0
+    count: int = 0
+    split: bool = False
+    paths: List[str] = field(default_factory=list)
+    texts: List[str] = field(default_factory=list)
+    size: int = 0
+
+    def rendered_size(self, extra: int = 0) -> int:
+        n = len(self.texts) + (1 if extra else 0)
+        sep = 1 if self.kind == _LINES else 2
+        brackets = 0 if self.kind == _LINES else 2
+        return brackets + self.size + extra + sep * max(0, n - 1)
+
+    def render(self) -> str:
+        if self.kind == _LINES:
+            return "\n".join(self.texts)
+        return self.kind + ", ".join(self.texts) + _CLOSE[self.kind]
+
+
+class _Chunker:
+    """Pack the records of one document; state lives here so the chainsaw can be shared.
+
+    Sizes are in the chainsaw's chunk units (characters or tokens); brackets
+    and separators are counted as characters, which over-counts in tokens.
+    """
+
+    def __init__(self, chainsaw: "JsonRecordChainsaw") -> None:
+        self.budget = max(1, chainsaw.chunk_size)
+        # A record must still fit once its container's brackets are around it.
+        self.record_budget = max(1, self.budget - 2)
+        self.fast_limit = self.budget * FAST_DECODE_RATIO + 4096
+        self.fallback = chainsaw.splitter
+        self.measure = chainsaw.splitter.text_length
+        self.lines = chainsaw.lines
+        self.stack: List[_Frame] = []
+        self.out: List[DocumentChunkInfo] = []
+        self.part = 0
+
+    def run(self, reader: _Reader) -> Iterator[DocumentChunkInfo]:
+        if self.lines:
+            self.stack.append(_Frame(kind=_LINES, path="$", prefix=""))
+            member = self._next_member(reader, self.stack[-1])
+            if member is None:
+                return
+            path, prefix = member
+        else:
+            path, prefix = "$", ""
+            if not reader.peek():
+                return
+
+        while True:
+            ch = reader.peek()
+            decoded = reader.decode_within(self.fast_limit) if ch in _CLOSE else None
+            text = prefix + json.dumps(decoded[0], ensure_ascii=False) if decoded is not None else ""
+            size = self.measure(text) if decoded is not None else 0
+            if decoded is not None and size <= self.record_budget:
+                reader.pos += decoded[1]
+                self._add(path, text, size)
+            elif ch in _CLOSE:
+                reader.take(ch)
+                self.stack.append(_Frame(kind=ch, path=path, prefix=prefix, prefix_size=self.measure(prefix)))
+            else:
+                self._add(path, prefix + _render(reader, reader.token()))
+
+            while self.stack:
+                member = self._next_member(reader, self.stack[-1])
+                if member is not None:
+                    path, prefix = member
+                    break
+                self._close(self.stack.pop())
+            else:
+                if reader.peek():
+                    reader.fail("trailing_data")
+                yield from self._drain()
+                return
+            yield from self._drain()
+
+    def recover(self) -> Iterator[DocumentChunkInfo]:
+        """Emit every complete record still buffered, after a syntax error."""
+        if self.stack:
+            self._split_upto(len(self.stack) - 1)
+        return self._drain()
+
+    def _next_member(self, reader: _Reader, frame: _Frame) -> tuple[str, str] | None:
+        ch = reader.peek()
+        if frame.kind == _LINES:
+            if not ch:
+                return None
+        else:
+            if ch == _CLOSE[frame.kind]:
+                reader.take(ch)
+                return None
+            if frame.count:
+                reader.take(",")
+        index = frame.count
+        frame.count += 1
+        if frame.kind != "{":
+            return f"{frame.path}[{index}]", ""
+        if reader.peek() != '"':
+            reader.fail("expected_key")
+        key_token = reader.token()
+        reader.take(":")
+        key = str(_decode(reader, key_token))
+        return _member_path(frame.path, key), json.dumps(key, ensure_ascii=False) + ": "
+
+    def _close(self, frame: _Frame) -> None:
+        if frame.split:
+            self._flush(frame)
+        else:
+            self._add(frame.path, frame.prefix + frame.render(), frame.prefix_size + frame.rendered_size())
+
+    def _add(self, path: str, text: str, size: int | None = None) -> None:
+        if size is None:
+            size = self.measure(text)
+        if size > self.record_budget:
+            if self.stack:
+                self._split_upto(len(self.stack) - 1)
+            for piece in self.fallback.split_text(DocumentInfo(content=text)):
+                self._emit(piece, path, path)
+            return
+        if not self.stack:
+            self._emit(text, path, path)
+            return
+        frame = self.stack[-1]
+        # A split frame packs chunks; an unsplit one must still fit as one record of its parent.
+        if frame.split:
+            full = frame.rendered_size(size) > self.budget
+        else:
+            full = frame.rendered_size(size) + frame.prefix_size > self.record_budget
+        if full:
+            if frame.split:
+                self._flush(frame)
+            else:
+                self._split_upto(len(self.stack) - 1)
+        frame.paths.append(path)
+        frame.texts.append(text)
+        frame.size += size
+
+    def _split_upto(self, index: int) -> None:
+        # Outer frames first: their buffered siblings come before anything inside.
+        for frame in self.stack[: index + 1]:
+            frame.split = True
+            self._flush(frame)
+
+    def _flush(self, frame: _Frame) -> None:
+        if frame.texts:
+            self._emit(frame.render(), frame.paths[0], frame.paths[-1])
+        frame.paths, frame.texts, frame.size = [], [], 0
+
+    def _emit(self, text: str, first: str, last: str) -> None:
+        metadata = {"part": self.part, "json_path": first}
+        if last != first:
+            metadata["json_path_end"] = last
+        self.out.append(DocumentChunkInfo(text=text, metadata=metadata))
+        self.part += 1
+
+    def _drain(self) -> Iterator[DocumentChunkInfo]:
+        out, self.out = self.out, []
+        return iter(out)
+
+
+class JsonRecordChainsaw(ChainsawMan):
+    """Structure-aware chunks for JSON, read incrementally.
+
+    Array elements and object members are packed into chunks of up to
+    chunk_size characters, each chunk a valid JSON fragment of one container
+    with the JSONPath of its first (and last) record in the metadata. Records
+    that do not fit are split into their own members; an oversized string or
+    number falls back to the recursive splitter. At most one chunk of records
+    per nesting level is buffered, so memory does not grow with the file.
+    Text after a syntax error is split as plain text. With a tokenizer,
+    chunk_size is measured in tokens.
+    """
+
+    lines = False
+    token_aware = True
+
+    def __init__(
+        self,
+        chunk_size: int,
+        chunk_overlap: int,
+        tokenizer_path: Optional[str] = None,
+        count_tokens: Optional[CountTokens] = None,
+    ) -> None:
+        super().__init__(chunk_size, chunk_overlap)
+        self.splitter = length_splitter(chunk_size, chunk_overlap, tokenizer_path, count_tokens)
+
+    def split_text(self, doc_info: DocumentInfo) -> List[str]:
+        return [c.text for c in self.split_chunks(doc_info)]
+
+    def split_chunks(self, doc_info: DocumentInfo) -> List[DocumentChunkInfo]:
+        return list(self.iter_chunks([DocumentPageInfo(content=doc_info.content or "")]))
+
+    def iter_chunks(self, blocks: Iterable[DocumentPageInfo]) -> Iterator[DocumentChunkInfo]:
+        reader = _Reader(block.content or "" for block in blocks)
+        chunker = _Chunker(self)
+        try:
+            yield from chunker.run(reader)
+            return
+        except JsonSyntaxError as e:
+            logger.warning(f"json_chainsaw_fallback: {e}")
+            rest = e.rest
+        yield from chunker.recover()
+
+        part = chunker.part
+        tail = itertools.chain([rest], reader.blocks)
+        for chunk in self.splitter.iter_chunks(DocumentPageInfo(content=t) for t in tail):
+            chunk.metadata["part"] = part
+            part += 1
+            yield chunk
+
+
+class JsonLinesChainsaw(JsonRecordChainsaw):
+    """JSON Lines: every line is a record at `$[n]`, packed like array elements."""
+
+    lines = True
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from typing import Any, List
+
+from ..models.document_model import DocumentInfo
+from .chainsaw_man import ChainsawMan
+
+
+class LangChainRecursiveCharacterText(ChainsawMan):
+    """LangChain's RecursiveCharacterTextSplitter, kept as the `langchain` chainsaw for comparison."""
+
+    _splitter: Any = None
+
+    def split_text(self, doc_info: DocumentInfo) -> List[str]:
+        return self._get_splitter().split_text(doc_info.content or "")
+
+    def _get_splitter(self) -> Any:
+        # Built once per instance; the factory reuses instances across documents.
+        if self._splitter is None:
+            try:
+                from langchain_text_splitters import RecursiveCharacterTextSplitter
+            except Exception as e:
+                raise Exception(f"langchain_deps_missing: {e}")
+
+            self._splitter = RecursiveCharacterTextSplitter(
+                chunk_size=self.chunk_size,
+                chunk_overlap=self.chunk_overlap,
+                length_function=len,
+                is_separator_regex=False,
+            )
+        return self._splitter
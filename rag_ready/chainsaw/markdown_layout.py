@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional
+
+from ..models.document_model import DocumentChunkInfo, DocumentInfo, DocumentPageInfo
+from .chainsaw_man import ChainsawMan
+from .token_character_text import CountTokens, length_splitter
+
+PAGE_BREAK = "<!-- PageBreak -->"
+
+_RE_HEADING = re.compile(r"^#{1,6}\s")
+_RE_HTML_ROW = re.compile(r"<tr[\s>].*?</tr>", re.S | re.I)
+_RE_PIPE_SEPARATOR = re.compile(r"^\s*\|?[\s:|-]+\|?\s*$")
+
+KIND_HEADING = "heading"
+KIND_TABLE = "table"
+KIND_FIGURE = "figure"
+KIND_TEXT = "text"
+
+
+@dataclass
+class LayoutBlock:
+    kind: str
+    text: str
+    page: int
+
+
+class MarkdownLayoutChainsaw(ChainsawMan):
+    """Packs Azure DI layout Markdown into chunks along its structure.
+
+    Each page is indexed once into headings, tables, figures and text blocks.
+    Blocks are packed up to chunk_size across page boundaries; a heading starts
+    a new chunk once the current one is at least half full and is never left
+    at the end of a chunk. Oversized tables are split between rows (the header
+    is repeated), figures are kept whole and long text falls back to the
+    recursive splitter. Chunks carry page_start/page_end metadata. With a
+    tokenizer, chunk_size is measured in tokens.
+    """
+
+    token_aware = True
+
+    def __init__(
+        self,
+        chunk_size: int,
+        chunk_overlap: int,
+        tokenizer_path: Optional[str] = None,
+        count_tokens: Optional[CountTokens] = None,
+    ) -> None:
+        super().__init__(chunk_size, chunk_overlap)
+        self.splitter = length_splitter(chunk_size, chunk_overlap, tokenizer_path, count_tokens)
+
+    def split_text(self, doc_info: DocumentInfo) -> List[str]:
+        return [c.text for c in self.split_chunks(doc_info)]
+
+    def iter_chunks(self, blocks: Iterable[DocumentPageInfo]) -> Iterator[DocumentChunkInfo]:
+        # Layout output is already in memory as pages, so packing needs no window.
+        yield from self.split_chunks(DocumentInfo(page_list=list(blocks)))
+
+    def split_chunks(self, doc_info: DocumentInfo) -> List[DocumentChunkInfo]:
+        budget = max(1, self.chunk_size)
+        chunks: List[DocumentChunkInfo] = []
+        current: List[LayoutBlock] = []
+        sizes: List[int] = []
+        size = 0
+
+        def flush() -> None:
+            nonlocal current, sizes, size
+            carried: List[LayoutBlock] = []
+            carried_sizes: List[int] = []
+            while current and current[-1].kind == KIND_HEADING and len(current) > 1:
+                carried.insert(0, current.pop())
+                carried_sizes.insert(0, sizes.pop())
+            if current:
+                pages = [b.page for b in current]
+                chunks.append(
+                    DocumentChunkInfo(
+                        text="\n\n".join(b.text for b in current),
+                        metadata={
+                            "part": len(chunks),
+                            "page": min(pages),
+                            "page_start": min(pages),
+                            "page_end": max(pages),
+                        },
+                    )
+                )
+            current, sizes = carried, carried_sizes
+            size = sum(sizes) + 2 * max(0, len(current) - 1)
+
+        for block in self.index(doc_info):
+            for piece, piece_size in self._fit(block, budget):
+                if piece.kind == KIND_HEADING and current and size >= budget // 2:
+                    flush()
+                added = piece_size + (2 if current else 0)
+                if current and size + added > budget:
+                    flush()
+                    added = piece_size + (2 if current else 0)
+                current.append(piece)
+                sizes.append(piece_size)
+                size += added
+        flush()
+        return chunks
+
+    def index(self, doc_info: DocumentInfo) -> List[LayoutBlock]:
+        """Structural blocks of every page, in document order."""
+        pages = [(self._page_number(p, i), p.content or "") for i, p in enumerate(doc_info.page_list)]
+        if not pages:
+            pages = [(i + 1, text) for i, text in enumerate((doc_info.content or "").split(PAGE_BREAK))]
+
+        blocks: List[LayoutBlock] = []
+        for page, content in pages:
+            blocks.extend(self._index_page(content, page))
+        return blocks
+
+    def _page_number(self, page: DocumentPageInfo, idx: int) -> int:
+        try:
+            return int((page.metadata or {}).get("page", idx + 1))
+        except (TypeError, ValueError):
+            return idx + 1
+
+    def _index_page(self, content: str, page: int) -> List[LayoutBlock]:
+        blocks: List[LayoutBlock] = []
+        lines = content.split("\n")
+        text: List[str] = []
+
+        def end_text() -> None:
+            if text:
+                joined = "\n".join(text).strip()
+                if joined:
+                    blocks.append(LayoutBlock(KIND_TEXT, joined, page))
+                text.clear()
+
+        i = 0
+        while i < len(lines):
+            line = lines[i]
+            stripped = line.strip()
+            lowered = stripped.lower()
+            if not stripped:
+                end_text()
+                i += 1
+            elif _RE_HEADING.match(stripped):
+                end_text()
+                blocks.append(LayoutBlock(KIND_HEADING, stripped, page))
+                i += 1
+            elif lowered.startswith("<table") or lowered.startswith("<figure"):
+                end_text()
+                kind = KIND_TABLE if lowered.startswith("<table") else KIND_FIGURE
+                close = "</table>" if kind == KIND_TABLE else "</figure>"
+                j = i
+                while j < len(lines) and close not in lines[j].lower():
+                    j += 1
+                j = min(j, len(lines) - 1)
+                blocks.append(LayoutBlock(kind, "\n".join(lines[i : j + 1]).strip(), page))
+                i = j + 1
+            elif stripped.startswith("|"):
+                end_text()
+                j = i
+                while j < len(lines) and lines[j].strip().startswith("|"):
+                    j += 1
+                blocks.append(LayoutBlock(KIND_TABLE, "\n".join(lines[i:j]).strip(), page))
+                i = j
+            elif stripped.startswith("![") and stripped.endswith(")"):
+                end_text()
+                blocks.append(LayoutBlock(KIND_FIGURE, stripped, page))
+                i += 1
+            else:
+                text.append(line)
+                i += 1
+        end_text()
+        return blocks
+
+    def _fit(self, block: LayoutBlock, budget: int) -> List[tuple[LayoutBlock, int]]:
+        """The block, or its parts when it does not fit, each with its size in chunk units."""
+        size = self.splitter.text_length(block.text)
+        if size <= budget or block.kind in (KIND_HEADING, KIND_FIGURE):
+            return [(block, size)]
+        if block.kind == KIND_TABLE:
+            parts = self._split_table(block.text, budget)
+        else:
+            parts = self.splitter.split_text(DocumentInfo(content=block.text))
+        return [(LayoutBlock(block.kind, p, block.page), self.splitter.text_length(p)) for p in parts]
+
+    def _split_table(self, table: str, budget: int) -> List[str]:
+        """Split a table between rows, repeating its header in every part."""
+        if table.lstrip().lower().startswith("<table"):
+            rows = [m.group(0) for m in _RE_HTML_ROW.finditer(table)]
+            if not rows:
+                return [table]
+            first = _RE_HTML_ROW.search(table)
+            head = table[: first.start()].rstrip() if first else "<table>"
+            header = [rows.pop(0)] if "<th" in rows[0].lower() else []
+            opening, closing, joiner = "\n".join([head, *header]), "</table>", "\n"
+        else:
+            lines = [ln for ln in table.split("\n") if ln.strip()]
+            n_header = 2 if len(lines) > 1 and _RE_PIPE_SEPARATOR.match(lines[1]) else 0
+            opening, closing, joiner = "\n".join(lines[:n_header]), "", "\n"
+            rows = lines[n_header:]
+
+        length = self.splitter.text_length
+        parts: List[str] = []
+        group: List[str] = []
+        fixed = length(opening) + length(closing) + 2
+        size = fixed
+        for row in rows:
+            row_size = length(row)
+            if group and size + row_size + 1 > budget:
+                parts.append(joiner.join(x for x in [opening, *group, closing] if x))
+                group, size = [], fixed
+            group.append(row)
+            size += row_size + 1
+        if group:
+            parts.append(joiner.join(x for x in [opening, *group, closing] if x))
+        return parts
+
+
+class PageChainsaw(ChainsawMan):
+    """One chunk per page, the layout behaviour before structure-aware packing."""
+
+    def split_text(self, doc_info: DocumentInfo) -> List[str]:
+        return [c.text for c in self.split_chunks(doc_info)]
+
+    def iter_chunks(self, blocks: Iterable[DocumentPageInfo]) -> Iterator[DocumentChunkInfo]:
+        for page in blocks:
+            yield DocumentChunkInfo(text=page.content or "", metadata=page.metadata or {})
+
+    def split_chunks(self, doc_info: DocumentInfo) -> List[DocumentChunkInfo]:
+        if not doc_info.page_list:
+            return [DocumentChunkInfo(text=doc_info.content or "", metadata={"part": 0})]
+        return [DocumentChunkInfo(text=p.content or "", metadata=p.metadata or {}) for p in doc_info.page_list]
@@ -1,20 +1,108 @@
 from __future__ import annotations
 
-from typing import List
-
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from collections import deque
+from typing import List, Sequence
 
 from ..models.document_model import DocumentInfo
 from .chainsaw_man import ChainsawMan
 
+DEFAULT_SEPARATORS = ("\n\n", "\n", " ", "")
+
+Span = tuple[int, int]
+
 
 class RecursiveCharacterText(ChainsawMan):
+    """Recursive character splitter working on (start, end) offsets into one string.
+
+    Produces the same chunks as LangChain's RecursiveCharacterTextSplitter with
+    its defaults (separators kept at the start of each piece, chunks stripped),
+    but never copies a piece until a chunk is emitted. Merged pieces are always
+    contiguous, so a chunk is a single slice of the source text.
+    """
+
+    separators: Sequence[str] = DEFAULT_SEPARATORS
+
     def split_text(self, doc_info: DocumentInfo) -> List[str]:
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size,
-            chunk_overlap=self.chunk_overlap,
-            length_function=len,
-            is_separator_regex=False,
-        )
-        return splitter.split_text(doc_info.content or "")
+        text = doc_info.content or ""
+        chunks: List[str] = []
+        if text:
+            self._split(text, 0, len(text), 0, chunks)
+        return chunks
+
+    def span_lengths(self, text: str, spans: List[Span]) -> List[int]:
+        """Lengths of text[start:end] in chunk units, for every piece of one split level.
+
+        Subclasses that count tokens override this to measure a whole level in one batch.
+        """
+        return [end - start for start, end in spans]
+
+    def text_length(self, text: str) -> int:
+        """Length of a whole text in chunk units."""
+        return len(text)
+
+    def _split(self, text: str, start: int, end: int, level: int, chunks: List[str]) -> None:
+        separators = self.separators
+        separator = separators[-1]
+        next_level = len(separators)
+        for i in range(level, len(separators)):
+            s = separators[i]
+            if not s:
+                separator = s
+                break
+            if text.find(s, start, end) != -1:
+                separator = s
+                next_level = i + 1
+                break
+
+        pieces = self._pieces(text, start, end, separator)
+        lengths = self.span_lengths(text, pieces)
+        good: List[tuple[int, int, int]] = []
+        for (piece_start, piece_end), length in zip(pieces, lengths):
+            if length < self.chunk_size:
+                good.append((piece_start, piece_end, length))
+                continue
+            if good:
+                self._merge(text, good, chunks)
+                good = []
+            if next_level >= len(separators):
+                chunks.append(text[piece_start:piece_end])
+            else:
+                self._split(text, piece_start, piece_end, next_level, chunks)
+        if good:
+            self._merge(text, good, chunks)
+
+    def _pieces(self, text: str, start: int, end: int, separator: str) -> List[Span]:
+        if not separator:
+            return [(i, i + 1) for i in range(start, end)]
+        pieces: List[Span] = []
+        step = len(separator)
+        prev = start
+        pos = text.find(separator, start, end)
+        while pos != -1:
+            if pos > prev:
+                pieces.append((prev, pos))
+            prev = pos
+            pos = text.find(separator, pos + step, end)
+        if end > prev:
+            pieces.append((prev, end))
+        return pieces
+
+    def _merge(self, text: str, pieces: List[tuple[int, int, int]], chunks: List[str]) -> None:
+        chunk_size = self.chunk_size
+        chunk_overlap = self.chunk_overlap
+        current: deque[tuple[int, int, int]] = deque()
+        total = 0
+        for start, end, length in pieces:
+            if current and total + length > chunk_size:
+                self._emit(text, current[0][0], current[-1][1], chunks)
+                while total > chunk_overlap or (total + length > chunk_size and total > 0):
+                    total -= current.popleft()[2]
+            current.append((start, end, length))
+            total += length
+        if current:
+            self._emit(text, current[0][0], current[-1][1], chunks)
 
+    def _emit(self, text: str, start: int, end: int, chunks: List[str]) -> None:
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import base64
+import os
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+from .recursive_character_text import RecursiveCharacterText, Span
+
+CountTokens = Callable[[List[str]], List[int]]
+
+# Memoized piece lengths kept per chainsaw; separators and short pieces repeat a lot.
+# The chainsaw is shared across documents, so only short pieces are kept, under a total size bound.
+MAX_CACHED_PIECE_CHARS = 256
+MAX_CACHED_CHARS = 4_000_000
+
+# Pre-split patterns of the public tiktoken encodings (as in tiktoken_ext.openai_public).
+_R50K_PATTERN = r"""'(?:[sdmt]|ll|ve|re)| ?\p{L}++| ?\p{N}++| ?[^\s\p{L}\p{N}]++|\s++$|\s+(?!\S)|\s"""
+_CL100K_PATTERN = (
+    r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}{1,3}+| ?[^\s\p{L}\p{N}]++[\r\n]*+|\s++$|\s*[\r\n]|\s+(?!\S)|\s"""
+)
+_O200K_PATTERN = "|".join(
+    [
+        r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]*[\p{Ll}\p{Lm}\p{Lo}\p{M}]+(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+        r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]+[\p{Ll}\p{Lm}\p{Lo}\p{M}]*(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+        r"""\p{N}{1,3}""",
+        r""" ?[^\s\p{L}\p{N}]+[\r\n/]*""",
+        r"""\s*[\r\n]+""",
+        r"""\s+(?!\S)""",
+        r"""\s+""",
+    ]
+)
+
+# A local .tiktoken vocabulary is matched to its encoding by file name, e.g. o200k_base.tiktoken.
+TIKTOKEN_PATTERNS: Dict[str, str] = {
+    "o200k_harmony": _O200K_PATTERN,
+    "o200k_base": _O200K_PATTERN,
+    "cl100k_base": _CL100K_PATTERN,
+    "p50k_edit": _R50K_PATTERN,
+    "p50k_base": _R50K_PATTERN,
+    "r50k_base": _R50K_PATTERN,
+    "gpt2": _R50K_PATTERN,
+}
+
+
+def tiktoken_pattern(path: str) -> str:
+    """Pre-split pattern for a .tiktoken file; unknown encodings are refused rather than miscounted."""
+    name = os.path.basename(path)
+    for encoding, pattern in TIKTOKEN_PATTERNS.items():
+        if encoding in name:
+            return pattern
+    known = ", ".join(TIKTOKEN_PATTERNS)
+    raise ValueError(f"tokenizer_unknown_encoding: {name} (file name must contain one of: {known})")
+
+
+@lru_cache(maxsize=4)
+def load_token_counter(path: str) -> CountTokens:
+    """Batch token counter for a local tokenizer.json (HF tokenizers) or .tiktoken vocabulary."""
+    if not path or not os.path.isfile(path):
+        raise ValueError("tokenizer_missing")
+
+    if path.endswith(".tiktoken"):
+        try:
+            import tiktoken
+        except Exception as e:
+            raise Exception(f"tokenizer_deps_missing: {e}")
+
+        pattern = tiktoken_pattern(path)
+        ranks: Dict[bytes, int] = {}
+        with open(path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    token, rank = line.split()
+                    ranks[base64.b64decode(token)] = int(rank)
+        encoding = tiktoken.Encoding(
+            name=os.path.basename(path),
+            pat_str=pattern,
+            mergeable_ranks=ranks,
+            special_tokens={},
+        )
+        return lambda texts: [len(ids) for ids in encoding.encode_ordinary_batch(texts)]
+
+    try:
+        from tokenizers import Tokenizer
+    except Exception as e:
+        raise Exception(f"tokenizer_deps_missing: {e}")
+
+    tokenizer = Tokenizer.from_file(path)
+    return lambda texts: [len(e.ids) for e in tokenizer.encode_batch(texts, add_special_tokens=False)]
+
+
+class TokenRecursiveCharacterText(RecursiveCharacterText):
+    """Recursive splitter whose chunk_size and chunk_overlap are measured in tokens.
+
+    Each split level is counted in one batch call. Lengths of short pieces
+    that fit a chunk are memoized, so repeated separators and words are
+    tokenized once; pieces that will be split again are never kept.
+    """
+
+    token_aware = True
+
+    def __init__(
+        self,
+        chunk_size: int,
+        chunk_overlap: int,
+        tokenizer_path: Optional[str] = None,
+        count_tokens: Optional[CountTokens] = None,
+    ) -> None:
+        super().__init__(chunk_size, chunk_overlap)
+        self.count_tokens = count_tokens or load_token_counter(tokenizer_path or "")
+        self._lengths: Dict[str, int] = {}
+        self._cached_chars = 0
+
+    def span_lengths(self, text: str, spans: List[Span]) -> List[int]:
+        pieces = [text[start:end] for start, end in spans]
+        # The instance is shared between threads: a full cache is replaced, never
+        # cleared, so `memo` keeps every entry this call has seen.
+        memo = self._lengths
+        missing = list({p for p in pieces if p not in memo})
+        if not missing:
+            return [memo[p] for p in pieces]
+
+        counted = dict(zip(missing, self.count_tokens(missing)))
+        keep = {p: n for p, n in counted.items() if len(p) <= MAX_CACHED_PIECE_CHARS and n < self.chunk_size}
+        if keep:
+            size = sum(len(p) for p in keep)
+            store = memo
+            if self._cached_chars + size > MAX_CACHED_CHARS:
+                store = self._lengths = {}
+                self._cached_chars = 0
+            store.update(keep)
+            self._cached_chars += size
+        return [counted[p] if p in counted else memo[p] for p in pieces]
+
+    def text_length(self, text: str) -> int:
+        return self.count_tokens([text])[0] if text else 0
+
+
+def length_splitter(
+    chunk_size: int,
+    chunk_overlap: int,
+    tokenizer_path: Optional[str] = None,
+    count_tokens: Optional[CountTokens] = None,
+) -> RecursiveCharacterText:
+    """Recursive splitter measuring in tokens when a tokenizer is given, characters otherwise.
+
+    Structure-aware chainsaws use its `text_length` for their own packing and
+    the splitter itself for text that does not fit.
+    """
+    if tokenizer_path or count_tokens:
+        return TokenRecursiveCharacterText(chunk_size, chunk_overlap, tokenizer_path, count_tokens)
+    return RecursiveCharacterText(chunk_size, chunk_overlap)
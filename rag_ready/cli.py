@@ -10,7 +10,7 @@ import time
 from loguru import logger
 
 from .context import PipelineContext, PipelineConfig
-from .pipeline import RagPreprocessPipeline
+from .metrics import METRICS_FORMATS
 
 
 def _run_spinner(context: PipelineContext, stop_event: threading.Event) -> None:
@@ -26,38 +26,99 @@ def _run_spinner(context: PipelineContext, stop_event: threading.Event) -> None:
     sys.stdout.flush()
 
 
-def main() -> int:
+def _build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(prog="rag-ready")
-    parser.add_argument("--file", required=True, help="外部文件路径")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", help="外部文件路径")
+    source.add_argument("--input-dir", default=None, help="批量模式：递归处理目录下的所有文件")
+    source.add_argument("--glob", default=None, help="批量模式：按 glob 模式匹配文件（支持 **）")
+    source.add_argument("--manifest", default=None, help="批量模式：清单文件，每行一个文件路径")
+    source.add_argument(
+        "--serve",
+        default=None,
+        choices=["stdin", "http"],
+        help="常驻模式：stdin 逐行读取 JSON 任务并逐行输出结果；http 在本地端口接收 POST /jobs",
+    )
+    parser.add_argument("--incremental", action="store_true", help="增量模式：跳过输入与配置均未变化的文件")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="批量模式的进程数")
+    parser.add_argument("--staged", action="store_true", help="批量模式按阶段流水执行：不同文档的解析、切片、图片描述、写出并行进行")
+    parser.add_argument(
+        "--stage",
+        action="append",
+        default=[],
+        metavar="NAME=WORKERS[:EXECUTOR]",
+        help="调整 --staged 某阶段的并发数与执行器（thread/process），可重复，如 parse=16、cut=4:process；"
+        "阶段为 prepare、parse、cut、enrich、write",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="--serve http 的监听地址")
+    parser.add_argument("--port", type=int, default=8765, help="--serve http 的监听端口，0 表示随机端口")
+    parser.add_argument("--jobs", type=int, default=4, help="常驻模式下同时处理的任务数")
+    parser.add_argument("--input-root", default=None, help="常驻模式：任务的 input_path 必须位于该目录下（相对路径以其为根），--serve http 必填")
+    parser.add_argument(
+        "--worker-token",
+        default=os.environ.get("RAG_READY_WORKER_TOKEN"),
+        help="--serve http 的访问令牌，请求需带 Authorization: Bearer <token>（默认读取 RAG_READY_WORKER_TOKEN）",
+    )
     parser.add_argument("--output-dir", default=os.path.join(".", "out"))
     parser.add_argument("--chunk-size", type=int, default=1024)
     parser.add_argument("--overlap", type=int, default=0)
     parser.add_argument("--parser", default=None)
-    parser.add_argument("--extractor", default=None, choices=["layout"])
+    parser.add_argument("--extractor", default=None, choices=["layout", "layout-replay"], help="layout 调用 Azure DI；layout-replay 从 --save-di-result 保存的结果离线重建")
     parser.add_argument("--chainsaw", default=None)
+    parser.add_argument("--chunk-unit", default="chars", choices=["chars", "tokens"], help="--chunk-size/--overlap 的计量单位：字符或 token")
+    parser.add_argument("--tokenizer", default=None, help="本地分词器文件（tokenizer.json 或以编码命名的 .tiktoken，如 o200k_base.tiktoken），--chunk-unit tokens 时必填")
+    parser.add_argument("--output-format", default="json", choices=["json", "jsonl"], help="切片输出格式：json 数组或逐行写入的 jsonl")
+    parser.add_argument("--jsonl-rollover", type=int, default=0, help="jsonl 模式下每 N 个切片切换到新文件，0 表示不切分")
+    parser.add_argument("--no-markdown", action="store_true", help="不生成 segments.md")
+    parser.add_argument("--streaming", action="store_true", help="流式处理：逐块解析、切片并写出，内存占用与文件大小无关")
+    parser.add_argument(
+        "--metrics",
+        nargs="+",
+        choices=list(METRICS_FORMATS),
+        default=None,
+        help="输出各步骤耗时、内存与计数指标：json（metrics.json）、prometheus（metrics.prom）、otlp（metrics.otlp.json）",
+    )
+    parser.add_argument("--trace-memory", action="store_true", help="指标中记录各步骤 tracemalloc 内存峰值（会降低速度）")
 
     parser.add_argument("--azure-di-endpoint", default=None)
     parser.add_argument("--azure-di-key", default=None)
     parser.add_argument("--azure-di-formulas", action="store_true")
     parser.add_argument("--no-proxy", action="store_true", help="禁用环境变量代理（HTTP_PROXY/HTTPS_PROXY）")
+    parser.add_argument("--figure-fetch-workers", type=int, default=8, help="并发下载 PDF 图片的线程数")
+    parser.add_argument(
+        "--figure-dedup",
+        choices=["document", "batch"],
+        default="document",
+        help="PDF 图片近似去重范围：document 仅在单个文档内，batch 在整个批次内共享",
+    )
+    parser.add_argument("--save-di-result", action="store_true", help="将 Azure DI 原始 AnalyzeResult JSON 与图片保存到输出目录的 di_result/")
+    parser.add_argument("--di-concurrency", type=int, default=0, help="批量 layout 模式下同时进行的 Azure DI 分析数，0 表示逐个同步分析")
+    parser.add_argument("--di-tps", type=float, default=15.0, help="Azure DI 每秒事务数上限（提交、轮询、图片下载都计入）")
+    parser.add_argument("--di-shard-pages", type=int, default=0, help="超过该页数的 PDF 按页范围拆分后并行分析，0 表示不拆分")
+    parser.add_argument("--di-result-dir", default=None, help="layout-replay 读取的结果目录，默认为输出目录下的 di_result/")
+
+    parser.add_argument("--parse-cache-dir", default=None, help="解析结果缓存目录，未变化的文件跳过解析")
+    parser.add_argument("--parse-cache-max-mb", type=int, default=0, help="解析缓存最大容量（MB），0 表示不限制")
+    parser.add_argument("--parse-cache-max-age-days", type=float, default=0.0, help="解析缓存最长未使用天数，0 表示不限制")
 
     parser.add_argument("--image-caption", action="store_true", help="对 Markdown 图片标签做视觉描述增强")
     parser.add_argument("--image-caption-limit", type=int, default=0, help="最多调用 AI 次数，0 表示不限制")
+    parser.add_argument("--image-caption-workers", type=int, default=4, help="并发调用 AI 生成图片描述的线程数")
+    parser.add_argument("--aoai-rpm", type=int, default=0, help="每分钟请求数上限，0 表示不限制")
+    parser.add_argument("--aoai-tpm", type=int, default=0, help="每分钟 token 数上限，0 表示不限制")
+    parser.add_argument("--caption-cache", default=None, help="图片描述持久缓存文件（SQLite），按图片感知哈希复用描述")
+    parser.add_argument("--caption-cache-distance", type=int, default=4, help="感知哈希允许的最大汉明距离")
+    parser.add_argument("--caption-cache-max-entries", type=int, default=0, help="图片描述缓存最大条数，0 表示不限制")
+    parser.add_argument("--caption-cache-max-age-days", type=float, default=0.0, help="图片描述缓存最长未使用天数，0 表示不限制")
     parser.add_argument("--aoai-endpoint", default=None)
     parser.add_argument("--aoai-key", default=None)
     parser.add_argument("--aoai-deployment", default=None)
     parser.add_argument("--aoai-api-version", default="2024-06-01")
     parser.add_argument("--aoai-temperature", type=float, default=0.0)
+    return parser
 
-    args = parser.parse_args()
-
-    input_path = os.path.abspath(args.file)
-    if not os.path.exists(input_path):
-        raise SystemExit(f"file_not_found: {input_path}")
-
-    output_dir = os.path.abspath(args.output_dir)
-    os.makedirs(output_dir, exist_ok=True)
 
+def _build_config(args: argparse.Namespace, output_dir: str) -> PipelineConfig:
     parser_kwargs: dict = {"output_dir": output_dir}
     if args.azure_di_endpoint:
         parser_kwargs["azure_di_endpoint"] = args.azure_di_endpoint
@@ -67,23 +128,53 @@ def main() -> int:
         parser_kwargs["formulas"] = True
     if args.no_proxy:
         parser_kwargs["no_proxy"] = True
+    if args.figure_fetch_workers:
+        parser_kwargs["figure_fetch_workers"] = int(args.figure_fetch_workers)
+    if args.figure_dedup == "batch":
+        from .parser.azure_di.di_tools import FIGURE_INDEX_FILE
+        from .utils.file_utils import batch_state_dir
 
-    context = PipelineContext(
-        input_path=input_path,
-        output_dir=output_dir,
-        config=PipelineConfig(
-            chunk_size=args.chunk_size,
-            overlap=args.overlap,
-            parser=args.parser,
-            extractor=args.extractor,
-            chainsaw=args.chainsaw,
-            parser_kwargs=parser_kwargs,
-        ),
+        parser_kwargs["figure_index_path"] = os.path.join(batch_state_dir(output_dir), FIGURE_INDEX_FILE)
+    if args.save_di_result:
+        parser_kwargs["save_di_result"] = True
+    if args.di_shard_pages:
+        parser_kwargs["di_shard_pages"] = int(args.di_shard_pages)
+    if args.di_result_dir:
+        parser_kwargs["di_result_dir"] = os.path.abspath(args.di_result_dir)
+
+    return PipelineConfig(
+        chunk_size=args.chunk_size,
+        overlap=args.overlap,
+        parser=args.parser,
+        extractor=args.extractor,
+        chainsaw=args.chainsaw,
+        chunk_unit=args.chunk_unit,
+        tokenizer_path=os.path.abspath(args.tokenizer) if args.tokenizer else None,
+        parser_kwargs=parser_kwargs,
+        parse_cache_dir=os.path.abspath(args.parse_cache_dir) if args.parse_cache_dir else None,
+        parse_cache_max_bytes=int(args.parse_cache_max_mb) * 1024 * 1024,
+        parse_cache_max_age_s=float(args.parse_cache_max_age_days) * 86400,
+        incremental=bool(args.incremental),
+        output_format=args.output_format,
+        jsonl_max_segments=max(0, int(args.jsonl_rollover)),
+        write_markdown=not args.no_markdown,
+        streaming=bool(args.streaming),
+        metrics_formats=list(args.metrics) if args.metrics else None,
+        trace_memory=bool(args.trace_memory),
     )
 
-    context.ai_settings = {
+
+def _build_ai_settings(args: argparse.Namespace) -> dict:
+    return {
         "enable_image_caption": bool(args.image_caption),
         "image_caption_limit": int(args.image_caption_limit),
+        "image_caption_workers": int(args.image_caption_workers),
+        "aoai_rpm": int(args.aoai_rpm),
+        "aoai_tpm": int(args.aoai_tpm),
+        "caption_cache_path": os.path.abspath(args.caption_cache) if args.caption_cache else None,
+        "caption_cache_distance": int(args.caption_cache_distance),
+        "caption_cache_max_entries": int(args.caption_cache_max_entries),
+        "caption_cache_max_age_s": float(args.caption_cache_max_age_days) * 86400,
         "aoai_endpoint": args.aoai_endpoint,
         "aoai_key": args.aoai_key,
         "aoai_deployment": args.aoai_deployment,
@@ -91,6 +182,144 @@ def main() -> int:
         "aoai_temperature": float(args.aoai_temperature),
     }
 
+
+def _run_batch(args: argparse.Namespace, output_dir: str) -> int:
+    from .batch import (
+        build_jobs,
+        collect_input_files,
+        run_batch,
+        run_batch_async_di,
+        run_batch_staged,
+        write_batch_summary,
+    )
+
+    input_dir = os.path.abspath(args.input_dir) if args.input_dir else None
+    if input_dir and not os.path.isdir(input_dir):
+        raise SystemExit(f"dir_not_found: {input_dir}")
+    if args.manifest and not os.path.exists(args.manifest):
+        raise SystemExit(f"file_not_found: {os.path.abspath(args.manifest)}")
+
+    files = collect_input_files(input_dir=input_dir, pattern=args.glob, manifest=args.manifest)
+    files = [p for p in files if not p.startswith(output_dir + os.sep)]
+    if not files:
+        raise SystemExit("no_input_files")
+
+    jobs = build_jobs(files, output_dir, base_dir=input_dir)
+    logger.info(f"batch_start: docs={len(jobs)} workers={args.workers}")
+    if args.figure_dedup == "batch":
+        from .parser.azure_di.di_tools import FIGURE_INDEX_FILE
+        from .utils.file_utils import batch_state_dir
+        from .utils.image_hash import SharedFigureIndex
+
+        # No worker is appending yet: drop entries of images deleted since the last run.
+        dropped = SharedFigureIndex(os.path.join(batch_state_dir(output_dir), FIGURE_INDEX_FILE)).compact()
+        if dropped:
+            logger.info(f"figure_index_compacted: dropped={dropped}")
+    if args.staged:
+        from .scheduler import configure_stages, default_stages
+
+        if args.di_concurrency > 0:
+            logger.warning(f"di_concurrency_ignored: di_concurrency={args.di_concurrency} reason=staged")
+
+        try:
+            stages = configure_stages(default_stages(max(1, int(args.workers))), args.stage)
+        except ValueError as e:
+            raise SystemExit(str(e))
+        _, summary = run_batch_staged(
+            jobs,
+            config=_build_config(args, output_dir),
+            ai_settings=_build_ai_settings(args),
+            stages=stages,
+            output_root=output_dir,
+        )
+    elif args.extractor == "layout" and args.di_concurrency > 0:
+        _, summary = run_batch_async_di(
+            jobs,
+            config=_build_config(args, output_dir),
+            ai_settings=_build_ai_settings(args),
+            workers=max(1, int(args.workers)),
+            output_root=output_dir,
+            di_concurrency=int(args.di_concurrency),
+            di_tps=float(args.di_tps),
+        )
+    else:
+        _, summary = run_batch(
+            jobs,
+            config=_build_config(args, output_dir),
+            ai_settings=_build_ai_settings(args),
+            workers=max(1, int(args.workers)),
+            output_root=output_dir,
+        )
+    summary_path = write_batch_summary(output_dir, summary)
+
+    print(
+        f"完成 {summary.succeeded}/{summary.total}，失败 {summary.failed}，"
+        f"{summary.docs_per_s:.2f} docs/s，{summary.mb_per_s:.2f} MB/s，汇总：{summary_path}"
+    )
+    if args.incremental:
+        print(
+            f"新增 {summary.added}，变更 {summary.changed}，删除 {summary.removed}，未变化 {summary.unchanged}"
+        )
+    for failure in summary.failures:
+        print(f"失败: {failure['input_path']} ({failure['error']})")
+    return 2 if summary.failed else 0
+
+
+def _serve(args: argparse.Namespace, output_dir: str) -> int:
+    from .worker import PipelineWorker, serve_http, serve_stdin
+
+    if args.serve == "http" and not args.input_root:
+        raise SystemExit("input_root_missing: --serve http 需要 --input-root 指定任务可读取的目录")
+    worker = PipelineWorker(
+        _build_config(args, output_dir),
+        ai_settings=_build_ai_settings(args),
+        output_root=output_dir,
+        max_jobs=int(args.jobs),
+        input_root=args.input_root,
+    )
+    worker.warm_up()
+    try:
+        if args.serve == "http":
+            return serve_http(worker, args.host, int(args.port), args.worker_token)
+        return serve_stdin(worker)
+    finally:
+        worker.close()
+
+
+def main() -> int:
+    args = _build_parser().parse_args()
+    if args.chunk_unit == "tokens" and not args.tokenizer:
+        raise SystemExit("tokenizer_missing: --chunk-unit tokens 需要 --tokenizer")
+
+    output_dir = os.path.abspath(args.output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    if args.serve:
+        return _serve(args, output_dir)
+    if not args.file:
+        return _run_batch(args, output_dir)
+
+    input_path = os.path.abspath(args.file)
+    if not os.path.exists(input_path):
+        raise SystemExit(f"file_not_found: {input_path}")
+
+    from .pipeline import RagPreprocessPipeline
+
+    context = PipelineContext(
+        input_path=input_path,
+        output_dir=output_dir,
+        config=_build_config(args, output_dir),
+    )
+
+    context.ai_settings = _build_ai_settings(args)
+
+    manifest = None
+    if args.incremental:
+        from .incremental import IncrementalManifest
+
+        manifest = IncrementalManifest.load(output_dir)
+        context.previous_state = manifest.get(input_path)
+
     logger.info("pipeline_start")
 
     ok = False
@@ -109,6 +338,11 @@ def main() -> int:
         if spinner_thread is not None:
             spinner_thread.join(timeout=1.0)
 
+    if manifest is not None and ok:
+        manifest.record(input_path, context.input_md5, context.config_fingerprint, context.output_md5, output_dir)
+        manifest.save()
+        logger.info(f"incremental_status: {context.change_status}")
+
     if sys.stdout.isatty():
         sys.stdout.write(("完成\n" if ok else "失败\n"))
         sys.stdout.flush()
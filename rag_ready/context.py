@@ -1,12 +1,14 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Any, TYPE_CHECKING
+from typing import Any, Iterator, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from .ai.azure_openai_vision_client import AzureOpenAIVisionClient
+    from .metrics import MetricsRecorder
     from .models.document_model import DocumentInfo, DocumentChunkInfo
     from .models.model import FileMessage
+    from .parser.base_parser import DocumentStream
 
 
 @dataclass
@@ -16,8 +18,25 @@ class PipelineConfig:
     parser: str | None = None
     extractor: str | None = None
     chainsaw: str | None = None
+    chunk_unit: str = "chars"
+    tokenizer_path: str | None = None
     parser_kwargs: dict | None = None
 
+    parse_cache_dir: str | None = None
+    parse_cache_max_bytes: int = 0
+    parse_cache_max_age_s: float = 0.0
+
+    incremental: bool = False
+
+    output_format: str = "json"
+    jsonl_max_segments: int = 0
+    write_markdown: bool = True
+
+    streaming: bool = False
+
+    metrics_formats: list[str] | None = None
+    trace_memory: bool = False
+
 
 @dataclass
 class PipelineContext:
@@ -30,10 +49,19 @@ class PipelineContext:
     should_continue: bool = True
 
     current_step: str | None = None
+    error: str | None = None
 
     file_mes: FileMessage | None = None
+    input_md5: str | None = None
+    config_fingerprint: str | None = None
+    previous_state: dict[str, Any] | None = None
+    change_status: str | None = None
+    output_md5: str | None = None
     doc_mes: DocumentInfo | None = None
     chunk_list: list[DocumentChunkInfo] | None = None
+    doc_stream: DocumentStream | None = None
+    chunk_stream: Iterator[DocumentChunkInfo] | None = None
     is_md: bool = False
     ai_settings: dict[str, Any] | None = None
     ai_client: AzureOpenAIVisionClient | None = None
+    metrics: MetricsRecorder | None = None
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import os
+from typing import Any
+
+from .cache.parse_cache import IGNORED_PARSER_KWARGS
+from .context import PipelineConfig, PipelineContext
+from .utils.file_utils import batch_state_dir
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+# PipelineConfig fields that never change the produced segments
+_FINGERPRINT_EXCLUDED_FIELDS = {
+    "parse_cache_dir",
+    "parse_cache_max_bytes",
+    "parse_cache_max_age_s",
+    "incremental",
+    "metrics_formats",
+    "trace_memory",
+}
+_FINGERPRINT_EXCLUDED_AI_SETTINGS = {
+    "aoai_endpoint",
+    "aoai_key",
+    "image_caption_workers",
+    "aoai_rpm",
+    "aoai_tpm",
+    "caption_cache_path",
+    "caption_cache_max_entries",
+    "caption_cache_max_age_s",
+}
+
+STATUS_ADDED = "added"
+STATUS_CHANGED = "changed"
+STATUS_UNCHANGED = "unchanged"
+STATUS_REMOVED = "removed"
+
+
+def config_fingerprint(config: PipelineConfig, ai_settings: dict[str, Any] | None = None) -> str:
+    fields = {
+        k: v
+        for k, v in dataclasses.asdict(config).items()
+        if k not in _FINGERPRINT_EXCLUDED_FIELDS
+    }
+    if fields.get("extractor") == "layout-replay":
+        # Replaying a saved analysis yields the same segments as the live layout call.
+        fields["extractor"] = "layout"
+    fields["parser_kwargs"] = {
+        k: v
+        for k, v in (config.parser_kwargs or {}).items()
+        if k not in IGNORED_PARSER_KWARGS
+    }
+    settings = ai_settings or {}
+    if settings.get("enable_image_caption"):
+        fields["ai_settings"] = {
+            k: v
+            for k, v in settings.items()
+            if k not in _FINGERPRINT_EXCLUDED_AI_SETTINGS
+        }
+    payload = json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class IncrementalManifest:
+    """Persisted record of input hash, config fingerprint and output hash per document."""
+
+    def __init__(self, path: str, documents: dict[str, dict[str, Any]] | None = None) -> None:
+        self.path = path
+        self.documents: dict[str, dict[str, Any]] = documents or {}
+
+    @classmethod
+    def load(cls, output_root: str) -> "IncrementalManifest":
+        path = os.path.join(batch_state_dir(output_root), MANIFEST_FILE)
+        legacy_path = os.path.join(output_root, MANIFEST_FILE)
+        source = path if os.path.exists(path) or not os.path.isfile(legacy_path) else legacy_path
+        try:
+            with open(source, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return cls(path)
+        if data.get("version") != MANIFEST_VERSION:
+            return cls(path)
+        return cls(path, documents=data.get("documents") or {})
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "documents": self.documents}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, input_path: str) -> dict[str, Any] | None:
+        return self.documents.get(input_path)
+
+    def record(
+        self,
+        input_path: str,
+        input_md5: str | None,
+        config_fingerprint: str | None,
+        output_md5: str | None,
+        output_dir: str,
+    ) -> None:
+        if not input_md5:
+            return
+        previous = self.documents.get(input_path) or {}
+        self.documents[input_path] = {
+            "input_md5": input_md5,
+            "config_fingerprint": config_fingerprint,
+            "output_md5": output_md5 or previous.get("output_md5"),
+            "output_dir": output_dir,
+        }
+
+    def remove_missing(self, input_paths: set[str]) -> list[dict[str, Any]]:
+        """Drop entries whose input file no longer exists.
+
+        Entries outside this run's job set whose file is still on disk were
+        just not selected (a narrower --glob or --input-dir) and are kept.
+        """
+        removed: list[dict[str, Any]] = []
+        for path in sorted(set(self.documents) - input_paths):
+            if os.path.exists(path):
+                continue
+            entry = self.documents.pop(path)
+            removed.append({"input_path": path, **entry})
+        return removed
+
+
+def classify(context: PipelineContext) -> str:
+    """Decide added/changed/unchanged from the previous manifest entry."""
+    previous = context.previous_state
+    if not previous:
+        return STATUS_ADDED
+    if (
+        previous.get("input_md5") == context.input_md5
+        and previous.get("config_fingerprint") == context.config_fingerprint
+        and previous.get("output_md5")
+        and has_outputs(context.output_dir)
+    ):
+        return STATUS_UNCHANGED
+    return STATUS_CHANGED
+
+
+def has_outputs(output_dir: str) -> bool:
+    for name in ("segments.json", "segments.jsonl", "segments-00000.jsonl"):
+        if os.path.exists(os.path.join(output_dir, name)):
+            return True
+    return False
@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+METRICS_JSON_FILE = "metrics.json"
+METRICS_PROMETHEUS_FILE = "metrics.prom"
+METRICS_OTLP_FILE = "metrics.otlp.json"
+
+METRICS_FORMATS = ("json", "prometheus", "otlp")
+
+
+def _peak_rss_bytes() -> int:
+    """Process high-water mark RSS, 0 where `resource` is unavailable (Windows)."""
+    try:
+        import resource
+    except Exception:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return int(peak if sys.platform == "darwin" else peak * 1024)
+
+
+class MetricsRecorder:
+    """Per-run step timings, memory high-water marks and domain counters.
+
+    `step` records wall time, process CPU time and peak RSS around a block, plus
+    the tracemalloc peak when `trace_memory` is on. Counters are thread-safe so
+    figure download and caption worker threads can bump them directly.
+    """
+
+    def __init__(self, run_id: str | None = None, trace_memory: bool = False) -> None:
+        self.run_id = run_id or uuid.uuid4().hex
+        self.trace_memory = trace_memory
+        self.steps: list[dict[str, Any]] = []
+        self.counters: dict[str, float] = {}
+        self.attributes: dict[str, Any] = {}
+        self.started_unix_ns = time.time_ns()
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Picklable so a context can be handed to a process-pool stage and back.
+        state = dict(self.__dict__)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextlib.contextmanager
+    def step(self, name: str) -> Iterator[dict[str, Any]]:
+        """Measure a block; the yielded entry may be updated, e.g. `entry["ok"] = False`."""
+        tracing = False
+        if self.trace_memory:
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            tracing = True
+
+        entry: dict[str, Any] = {"name": name, "ok": True, "start_unix_ns": time.time_ns()}
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        rss_start = _peak_rss_bytes()
+        try:
+            yield entry
+        except BaseException:
+            entry["ok"] = False
+            raise
+        finally:
+            entry["wall_s"] = time.perf_counter() - wall_start
+            entry["cpu_s"] = time.process_time() - cpu_start
+            entry["peak_rss_bytes"] = _peak_rss_bytes()
+            entry["peak_rss_growth_bytes"] = max(0, entry["peak_rss_bytes"] - rss_start)
+            if tracing:
+                import tracemalloc
+
+                entry["tracemalloc_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            with self._lock:
+                self.steps.append(entry)
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "run_id": self.run_id,
+                "started_unix_ns": self.started_unix_ns,
+                "wall_s": time.perf_counter() - self._started,
+                "attributes": dict(self.attributes),
+                "steps": [dict(s) for s in self.steps],
+                "counters": dict(self.counters),
+            }
+
+    def write(self, output_dir: str, formats: Iterable[str] = ("json",)) -> list[str]:
+        return write_metrics(self.to_dict(), output_dir, formats)
+
+
+def merge_metrics(runs: Iterable[dict[str, Any]], run_id: str | None = None) -> dict[str, Any]:
+    """Sum step timings and counters of several runs into one metrics dict (batch totals)."""
+    steps: dict[str, dict[str, Any]] = {}
+    counters: dict[str, float] = {}
+    started: list[int] = []
+    docs = 0
+    for run in runs:
+        docs += 1
+        if run.get("started_unix_ns"):
+            started.append(int(run["started_unix_ns"]))
+        for name, value in (run.get("counters") or {}).items():
+            counters[name] = counters.get(name, 0) + value
+        for s in run.get("steps") or []:
+            total = steps.setdefault(
+                s["name"],
+                {"name": s["name"], "ok": True, "count": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_rss_bytes": 0},
+            )
+            total["count"] += 1
+            total["ok"] = total["ok"] and bool(s.get("ok", True))
+            total["wall_s"] += float(s.get("wall_s", 0.0))
+            total["cpu_s"] += float(s.get("cpu_s", 0.0))
+            total["peak_rss_bytes"] = max(total["peak_rss_bytes"], int(s.get("peak_rss_bytes", 0)))
+            if "tracemalloc_peak_bytes" in s:
+                total["tracemalloc_peak_bytes"] = max(
+                    total.get("tracemalloc_peak_bytes", 0), int(s["tracemalloc_peak_bytes"])
+                )
+    return {
+        "run_id": run_id or uuid.uuid4().hex,
+        "started_unix_ns": min(started) if started else time.time_ns(),
+        "wall_s": sum(s["wall_s"] for s in steps.values()),
+        "attributes": {"documents": docs},
+        "steps": list(steps.values()),
+        "counters": counters,
+    }
+
+
+def write_metrics(metrics: dict[str, Any], output_dir: str, formats: Iterable[str] = ("json",)) -> list[str]:
+    os.makedirs(output_dir, exist_ok=True)
+    written: list[str] = []
+    for fmt in formats:
+        if fmt == "json":
+            path = os.path.join(output_dir, METRICS_JSON_FILE)
+            text = json.dumps(metrics, ensure_ascii=False, indent=2)
+        elif fmt == "prometheus":
+            path = os.path.join(output_dir, METRICS_PROMETHEUS_FILE)
+            text = to_prometheus(metrics)
+        elif fmt == "otlp":
+            path = os.path.join(output_dir, METRICS_OTLP_FILE)
+            text = json.dumps(to_otlp_spans(metrics), ensure_ascii=False)
+        else:
+            raise ValueError(f"unsupported_metrics_format: {fmt}")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+        written.append(path)
+    return written
+
+
+def _prom_name(name: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+
+def _prom_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def to_prometheus(metrics: dict[str, Any]) -> str:
+    """Prometheus text exposition format, for the node_exporter textfile collector."""
+    lines: list[str] = []
+    step_series = (
+        ("wall_s", "rag_ready_step_wall_seconds", "Wall time per pipeline step."),
+        ("cpu_s", "rag_ready_step_cpu_seconds", "Process CPU time per pipeline step."),
+        ("peak_rss_bytes", "rag_ready_step_peak_rss_bytes", "Process peak RSS after the step."),
+        ("tracemalloc_peak_bytes", "rag_ready_step_tracemalloc_peak_bytes", "Peak traced Python allocations."),
+    )
+    steps = metrics.get("steps") or []
+    for key, name, help_text in step_series:
+        samples = [s for s in steps if key in s]
+        if not samples:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for s in samples:
+            lines.append(f'{name}{{step="{_prom_label(s["name"])}"}} {s[key]}')
+    for counter, value in sorted((metrics.get("counters") or {}).items()):
+        name = f"rag_ready_{_prom_name(counter)}_total"
+        lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name} {value}")
+    lines.append("# TYPE rag_ready_run_wall_seconds gauge")
+    lines.append(f"rag_ready_run_wall_seconds {metrics.get('wall_s', 0.0)}")
+    return "\n".join(lines) + "\n"
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp_spans(metrics: dict[str, Any]) -> dict[str, Any]:
+    """OTLP/JSON trace export: one root span for the run, one child span per step."""
+    trace_id = uuid.uuid5(uuid.NAMESPACE_OID, str(metrics.get("run_id"))).hex
+    root_id = trace_id[:16]
+    start_ns = int(metrics.get("started_unix_ns") or 0)
+    spans: list[dict[str, Any]] = []
+    end_ns = start_ns
+    for i, s in enumerate(metrics.get("steps") or []):
+        step_start = int(s.get("start_unix_ns") or start_ns)
+        step_end = step_start + int(float(s.get("wall_s", 0.0)) * 1e9)
+        end_ns = max(end_ns, step_end)
+        attrs = {k: v for k, v in s.items() if k not in ("name", "ok", "start_unix_ns")}
+        spans.append(
+            {
+                "traceId": trace_id,
+                "spanId": f"{i + 1:016x}",
+                "parentSpanId": root_id,
+                "name": s["name"],
+                "kind": 1,
+                "startTimeUnixNano": str(step_start),
+                "endTimeUnixNano": str(step_end),
+                "attributes": [{"key": f"rag_ready.{k}", "value": _otlp_value(v)} for k, v in attrs.items()],
+                "status": {"code": 1 if s.get("ok", True) else 2},
+            }
+        )
+    root_attrs = dict(metrics.get("attributes") or {})
+    root_attrs.update({f"counter.{k}": v for k, v in (metrics.get("counters") or {}).items()})
+    spans.insert(
+        0,
+        {
+            "traceId": trace_id,
+            "spanId": root_id,
+            "name": "rag_ready.pipeline",
+            "kind": 1,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(max(end_ns, start_ns + int(float(metrics.get("wall_s", 0.0)) * 1e9))),
+            "attributes": [{"key": f"rag_ready.{k}", "value": _otlp_value(v)} for k, v in root_attrs.items()],
+            "status": {"code": 1},
+        },
+    )
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "rag_ready"}}]},
+                "scopeSpans": [{"scope": {"name": "rag_ready"}, "spans": spans}],
+            }
+        ]
+    }
+
+
+# Recorder of the pipeline running in the current thread / task. Deep helpers
+# (figure downloads, AI retries, caches) count through `incr` without threading
+# a context; thread pools inside a step hand it on with `bind`.
+_ACTIVE: contextvars.ContextVar[MetricsRecorder | None] = contextvars.ContextVar("rag_ready_metrics", default=None)
+
+
+@contextlib.contextmanager
+def activate(recorder: MetricsRecorder | None) -> Iterator[MetricsRecorder | None]:
+    token = _ACTIVE.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _ACTIVE.reset(token)
+
+
+def bind(fn: Callable[..., T]) -> Callable[..., T]:
+    """Wrap `fn` so worker threads count into the caller's active recorder."""
+    recorder = _ACTIVE.get()
+    if recorder is None:
+        return fn
+
+    def run(*args: Any, **kwargs: Any) -> T:
+        with activate(recorder):
+            return fn(*args, **kwargs)
+
+    return run
+
+
+def incr(name: str, value: float = 1) -> None:
+    """Bump a counter on the active recorder; a no-op when metrics are off."""
+    recorder = _ACTIVE.get()
+    if recorder is not None:
+        recorder.incr(name, value)
@@ -1,7 +1,18 @@
-from .base_parser import BaseParser
-from .parser_factory import ParserFactory
+from typing import TYPE_CHECKING
 
-__all__ = [
-    "BaseParser",
-    "ParserFactory",
-]
+from ..utils.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .base_parser import BaseParser, DocumentStream
+    from .parser_factory import PARSERS, ParserFactory
+
+_EXPORTS = {
+    "BaseParser": ".base_parser:BaseParser",
+    "DocumentStream": ".base_parser:DocumentStream",
+    "ParserFactory": ".parser_factory:ParserFactory",
+    "PARSERS": ".parser_factory:PARSERS",
+}
+
+__all__ = list(_EXPORTS)
+
+__getattr__ = lazy_exports(__name__, _EXPORTS)
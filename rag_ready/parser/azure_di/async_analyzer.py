@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from loguru import logger
+
+from ... import metrics
+from .di_tools import DI_FIGURES_DIR, AzureDIConfig, AzureDocumentIntelligenceTools
+from .shards import count_pdf_pages, page_ranges, stitch_results
+
+DEFAULT_DI_CONCURRENCY = 8
+# Azure DI S0 allows 15 transactions per second; every submit, poll and figure GET counts.
+DEFAULT_DI_TPS = 15.0
+POLL_INITIAL_S = 2.0
+POLL_MAX_S = 15.0
+POLL_GROWTH = 1.5
+MAX_RATE_LIMIT_RETRIES = 8
+
+
+class AsyncTokenBucket:
+    """asyncio token bucket shared by every request the analyzer sends."""
+
+    def __init__(self, rate_per_s: float) -> None:
+        self.rate_per_s = float(rate_per_s)
+        self.capacity = max(1.0, self.rate_per_s)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate_per_s <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_s)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate_per_s)
+
+
+@dataclass
+class AnalyzedDocument:
+    key: str
+    input_path: str
+    save_dir: str
+    result_id: str = ""
+    error: Optional[str] = None
+
+
+class AsyncLayoutAnalyzer:
+    """Submits many documents to prebuilt-layout and keeps `max_in_flight` analyses running.
+
+    One pooled aio client is shared by all documents. Operations are polled
+    by hand so the poll interval can grow while a document is still running
+    and honour Retry-After; submits, polls and figure downloads all draw from
+    one transactions-per-second bucket. Each finished analysis is saved in the
+    --save-di-result layout (AnalyzeResult JSON + figures) and handed to
+    `on_done` right away, while other analyses are still in flight. With
+    `shard_pages`, long PDFs are analyzed as page-range shards that each take
+    an in-flight slot and are stitched back before saving.
+    """
+
+    def __init__(
+        self,
+        config: AzureDIConfig,
+        max_in_flight: int = DEFAULT_DI_CONCURRENCY,
+        tps: float = DEFAULT_DI_TPS,
+        figures: bool = True,
+        client: Any = None,
+        shard_pages: int = 0,
+    ) -> None:
+        self.config = config
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.tps = float(tps)
+        self.figures = figures
+        self._client = client
+        self.shard_pages = max(0, int(shard_pages))
+        self._tools = AzureDocumentIntelligenceTools()
+
+    async def analyze_many(
+        self,
+        items: list[tuple[str, str, str]],
+        on_done: Callable[[AnalyzedDocument], Optional[Awaitable[None]]],
+    ) -> None:
+        """Analyze (key, input_path, save_dir) items, calling `on_done` as each one finishes."""
+        bucket = AsyncTokenBucket(self.tps)
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        async def run(client: Any, key: str, input_path: str, save_dir: str) -> None:
+            doc = AnalyzedDocument(key=key, input_path=input_path, save_dir=save_dir)
+            try:
+                result, doc.result_id, input_md5, sources = await self._analyze_document(
+                    client, bucket, semaphore, input_path
+                )
+                if self.figures:
+                    await self._fetch_figures(client, bucket, result, doc.result_id, save_dir, sources)
+                await asyncio.to_thread(self._tools._save_di_result, save_dir, result, doc.result_id, input_md5)
+            except Exception as e:
+                doc.error = f"azure_di_layout_failed: {e}"
+                logger.warning(f"azure_di_async_failed: file={input_path} err={e}")
+            done = on_done(doc)
+            if done is not None:
+                await done
+
+        if self._client is not None:
+            await asyncio.gather(*(run(self._client, *item) for item in items))
+            return
+
+        try:
+            from azure.ai.documentintelligence.aio import DocumentIntelligenceClient
+            from azure.core.credentials import AzureKeyCredential
+        except Exception as e:
+            raise Exception(f"azure_di_deps_missing: {e}")
+
+        async with DocumentIntelligenceClient(
+            endpoint=self.config.endpoint,
+            credential=AzureKeyCredential(self.config.key),
+        ) as client:
+            await asyncio.gather(*(run(client, *item) for item in items))
+
+    async def _analyze_document(
+        self,
+        client: Any,
+        bucket: AsyncTokenBucket,
+        semaphore: asyncio.Semaphore,
+        input_path: str,
+    ) -> tuple[Any, str, str, dict[str, tuple[str, str]]]:
+        """AnalyzeResult, result id, input md5 and per-figure download sources of one document."""
+        try:
+            from azure.ai.documentintelligence.models import AnalyzeResult
+        except Exception as e:
+            raise Exception(f"azure_di_deps_missing: {e}")
+
+        file_bytes = await asyncio.to_thread(_read_bytes, input_path)
+        input_md5 = hashlib.md5(file_bytes).hexdigest()
+        ranges = page_ranges(count_pdf_pages(file_bytes), self.shard_pages)
+        body = {"base64Source": base64.b64encode(file_bytes).decode("ascii")}
+        del file_bytes
+
+        if len(ranges) <= 1:
+            async with semaphore:
+                result, result_id = await self._analyze(client, bucket, body)
+            return AnalyzeResult(result), result_id, input_md5, {}
+
+        async def shard(r: tuple[int, int]) -> tuple[dict[str, Any], str]:
+            async with semaphore:
+                return await self._analyze(client, bucket, body, pages=f"{r[0]}-{r[1]}")
+
+        # Every shard re-uploads the whole file; they share the in-flight slots and TPS bucket.
+        shard_results = await asyncio.gather(*(shard(r) for r in ranges))
+        logger.info(f"azure_di_shards_done: file={input_path} shards={len(ranges)}")
+        stitched, sources = stitch_results([(r[0], rid, res) for r, (res, rid) in zip(ranges, shard_results)])
+        return AnalyzeResult(stitched), shard_results[0][1], input_md5, sources
+
+    async def _analyze(
+        self,
+        client: Any,
+        bucket: AsyncTokenBucket,
+        body: dict[str, str],
+        pages: Optional[str] = None,
+    ) -> tuple[dict[str, Any], str]:
+        try:
+            from azure.core.rest import HttpRequest
+        except Exception as e:
+            raise Exception(f"azure_di_deps_missing: {e}")
+
+        url = self._tools._build_analyze_url(self.config.endpoint, figures=self.figures, pages=pages)
+
+        # Submitted through send_request like the polls, so Operation-Location is read from a public response.
+        resp = await self._with_rate_limit(bucket, lambda: client.send_request(HttpRequest("POST", url, json=body)))
+        metrics.incr("di_analyses")
+        if resp.status_code not in (200, 202):
+            raise ValueError(f"analyze_submit_failed: status={resp.status_code}")
+        headers = resp.headers
+        operation_location = headers.get("Operation-Location", "")
+        if not operation_location:
+            raise ValueError("operation_location_missing")
+        result_id = operation_location.split("/")[-1].split("?")[0]
+
+        delay_s = _retry_after_s(headers) or POLL_INITIAL_S
+        while True:
+            await asyncio.sleep(delay_s)
+            resp = await self._with_rate_limit(bucket, lambda: client.send_request(HttpRequest("GET", operation_location)))
+            metrics.incr("di_polls")
+            poll = resp.json()
+            status = str(poll.get("status", "")).lower()
+            if status == "succeeded":
+                return poll.get("analyzeResult") or {}, result_id
+            if status in ("failed", "canceled"):
+                raise ValueError(f"analyze_{status}: {poll.get('error')}")
+            delay_s = _retry_after_s(resp.headers) or min(POLL_MAX_S, delay_s * POLL_GROWTH)
+
+    async def _fetch_figures(
+        self,
+        client: Any,
+        bucket: AsyncTokenBucket,
+        result: Any,
+        result_id: str,
+        save_dir: str,
+        sources: Optional[dict[str, tuple[str, str]]] = None,
+    ) -> None:
+        from azure.core.rest import HttpRequest
+
+        figures = [f for f in (getattr(result, "figures", None) or []) if getattr(f, "id", None)]
+        if not figures:
+            return
+        figures_dir = os.path.join(save_dir, DI_FIGURES_DIR)
+        os.makedirs(figures_dir, exist_ok=True)
+
+        async def fetch(figure: Any) -> None:
+            source_result_id, source_figure_id = (sources or {}).get(figure.id, (result_id, figure.id))
+            url = self._tools._build_figure_image_url(self.config.endpoint, source_result_id, source_figure_id)
+            try:
+                resp = await self._with_rate_limit(bucket, lambda: client.send_request(HttpRequest("GET", url)))
+            except Exception as e:
+                logger.warning(f"azure_di_fetch_image_failed: figure_id={figure.id} err={e}")
+                return
+            if resp.status_code != 200:
+                return
+            metrics.incr("di_figures_fetched")
+            path = os.path.join(figures_dir, self._tools._sanitize_image_name(figure.id))
+            await asyncio.to_thread(self._tools._save_bytes, path, resp.content)
+
+        await asyncio.gather(*(fetch(f) for f in figures))
+
+    async def _with_rate_limit(self, bucket: AsyncTokenBucket, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Run a request through the TPS bucket, backing off on 429 responses."""
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            await bucket.acquire()
+            try:
+                resp = await call()
+            except Exception as e:
+                status = getattr(getattr(e, "response", None), "status_code", None) or getattr(e, "status_code", None)
+                if status != 429 or attempt >= MAX_RATE_LIMIT_RETRIES:
+                    raise
+                headers = getattr(getattr(e, "response", None), "headers", None) or {}
+            else:
+                if getattr(resp, "status_code", 200) != 429 or attempt >= MAX_RATE_LIMIT_RETRIES:
+                    return resp
+                headers = resp.headers
+            delay_s = _retry_after_s(headers) or min(60.0, 2.0 * (2**attempt)) * (0.5 + random.random() / 2)
+            metrics.incr("di_retries")
+            logger.warning(f"azure_di_rate_limited: retry={attempt + 1} delay_s={delay_s:.1f}")
+            await asyncio.sleep(delay_s)
+        raise RuntimeError("azure_di_rate_limited")
+
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _retry_after_s(headers: Any) -> Optional[float]:
+    try:
+        value = (headers or {}).get("Retry-After") or (headers or {}).get("retry-after")
+        return float(value) if value else None
+    except (TypeError, ValueError):
+        return None
@@ -1,17 +1,26 @@
 from __future__ import annotations
 
+import functools
+import hashlib
 import html
 import io
+import json
 import os
 import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any, Iterator, Optional
+from typing import Any, Callable, Iterator, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
 from loguru import logger
 
+from ... import metrics
 from ...models.document_model import DocumentInfo, DocumentPageInfo
-from ...utils.file_utils import dhash, hamming_distance
+from ...utils.image_hash import BKTree, SharedFigureIndex, dhash_int, shared_figure_index
+from ...utils.text_utils import Replacement, apply_replacements, rebase_overlapping, split_overlapping
+from .shards import count_pdf_pages, page_ranges, stitch_results
 
 
 @dataclass(frozen=True)
@@ -21,11 +30,39 @@ class AzureDIConfig:
     no_proxy: bool = False
 
 
+DEFAULT_FIGURE_FETCH_WORKERS = 8
+# Shards analyzed at once by the synchronous path; every shard uploads the whole file.
+DEFAULT_DI_SHARD_WORKERS = 4
+
+PAGE_BREAK = "<!-- PageBreak -->"
+
+# Saved AnalyzeResult layout used by --save-di-result / --extractor layout-replay
+DI_RESULT_DIR = "di_result"
+DI_RESULT_FILE = "analyze_result.json"
+DI_RESULT_META = "meta.json"
+DI_FIGURES_DIR = "figures"
+
+# Figures whose dHash differs by at most this many bits are saved once
+FIGURE_DEDUP_DISTANCE = 5
+# Batch-wide figure index written under the output root by --figure-dedup batch
+FIGURE_INDEX_FILE = "figure_index.jsonl"
+
 # Pre-compile regex patterns for performance
 _RE_HTML_TAGS = re.compile(r"<[^>]+>")
 _RE_WHITESPACE = re.compile(r"\s+")
 
 
+@functools.lru_cache(maxsize=8)
+def _document_intelligence_client(endpoint: str, key: str) -> Any:
+    """Shared, thread-safe DI client per endpoint, so a resident worker keeps its connection pool warm."""
+    try:
+        from azure.ai.documentintelligence import DocumentIntelligenceClient
+        from azure.core.credentials import AzureKeyCredential
+    except Exception as e:
+        raise Exception(f"azure_di_deps_missing: {e}")
+    return DocumentIntelligenceClient(endpoint=endpoint, credential=AzureKeyCredential(key))
+
+
 class AzureDocumentIntelligenceTools:
     def layout_mode_load(
         self,
@@ -35,69 +72,211 @@ class AzureDocumentIntelligenceTools:
     ) -> DocumentInfo:
         config = self._resolve_config(**kwargs)
         output_dir = kwargs.get("output_dir")
+        fetch_workers = int(kwargs.get("figure_fetch_workers") or DEFAULT_FIGURE_FETCH_WORKERS)
 
         try:
-            from azure.ai.documentintelligence import DocumentIntelligenceClient
             from azure.ai.documentintelligence.models import AnalyzeDocumentRequest, DocumentContentFormat
-            from azure.core.credentials import AzureKeyCredential
         except Exception as e:
             raise Exception(f"azure_di_deps_missing: {e}")
 
         try:
-            client = DocumentIntelligenceClient(endpoint=config.endpoint, credential=AzureKeyCredential(config.key))
-            common_params: dict[str, Any] = {
-                "model_id": "prebuilt-layout",
-                "body": AnalyzeDocumentRequest(bytes_source=file_bytes),
-                "output_content_format": DocumentContentFormat.MARKDOWN,
-            }
-            if figures:
-                common_params["output"] = ["figures"]
-
-            poller = client.begin_analyze_document(**common_params)
-            operation_location = poller._polling_method._initial_response.http_response.headers.get("Operation-Location", "")
-            result_id = operation_location.split("/")[-1].split("?")[0] if operation_location else ""
-            result = poller.result()
-
-            merge_table_content = getattr(result, "content", "") or ""
-            if getattr(result, "tables", None) is not None:
-                try:
-                    from .merge_table import merge_tables
-
-                    merge_table_content = merge_tables(result)
-                except Exception as e:
-                    logger.warning(f"azure_di_merge_tables_failed: {e}")
-            pages_content = self._split_markdown(merge_table_content)
-
-            if figures:
-                try:
-                    self._extract_images(
-                        result=result,
-                        result_id=result_id,
-                        pages=pages_content,
-                        config=config,
-                        output_dir=output_dir,
-                    )
-                except Exception as e:
-                    logger.warning(f"azure_di_extract_images_failed: {e}")
-
-            doc_info = DocumentInfo()
-            doc_info.content = merge_table_content
-            doc_info.is_md = True
-
-            for item in pages_content:
-                page = DocumentPageInfo(
-                    content=item["content"],
-                    metadata={"page": int(item["page_number"])},
+            client = _document_intelligence_client(config.endpoint, config.key)
+
+            def analyze(pages: Optional[str] = None) -> tuple[Any, str]:
+                common_params: dict[str, Any] = {
+                    "model_id": "prebuilt-layout",
+                    "body": AnalyzeDocumentRequest(bytes_source=file_bytes),
+                    "output_content_format": DocumentContentFormat.MARKDOWN,
+                }
+                if figures:
+                    common_params["output"] = ["figures"]
+                if pages:
+                    common_params["pages"] = pages
+
+                metrics.incr("di_analyses")
+                poller = client.begin_analyze_document(**common_params)
+                operation_location = poller._polling_method._initial_response.http_response.headers.get(
+                    "Operation-Location", ""
                 )
-                doc_info.page_list.append(page)
+                result_id = operation_location.split("/")[-1].split("?")[0] if operation_location else ""
+                return poller.result(), result_id
+
+            # Large PDFs are analyzed as page-range shards in parallel and stitched back together.
+            # DI takes a `pages` filter, not a page subset, so each shard re-uploads the full file;
+            # the pool is bounded to keep that from becoming one concurrent upload per shard.
+            ranges = page_ranges(count_pdf_pages(file_bytes), int(kwargs.get("di_shard_pages") or 0))
+            figure_sources: dict[str, tuple[str, str]] = {}
+            if len(ranges) > 1:
+                from azure.ai.documentintelligence.models import AnalyzeResult
+
+                shard_workers = min(len(ranges), DEFAULT_DI_SHARD_WORKERS)
+                with ThreadPoolExecutor(max_workers=shard_workers) as executor:
+                    shard_results = list(executor.map(metrics.bind(lambda r: analyze(f"{r[0]}-{r[1]}")), ranges))
+                logger.info(f"azure_di_shards_done: shards={len(ranges)} workers={shard_workers}")
+                stitched, figure_sources = stitch_results(
+                    [(r[0], rid, res.as_dict()) for r, (res, rid) in zip(ranges, shard_results)]
+                )
+                result, result_id = AnalyzeResult(stitched), shard_results[0][1]
+            else:
+                result, result_id = analyze()
 
-            return doc_info
+            save_dir = self._di_result_dir(**kwargs) if kwargs.get("save_di_result") else None
+            if save_dir:
+                self._save_di_result(save_dir, result, result_id, hashlib.md5(file_bytes).hexdigest())
+
+            session, headers = self._create_image_fetch_session(config, pool_size=max(1, fetch_workers))
+
+            def fetch_figure(figure: Any) -> Optional[bytes]:
+                source_result_id, source_figure_id = figure_sources.get(figure.id, (result_id, figure.id))
+                resp = self._fetch_image_with_retries(
+                    session=session,
+                    image_url=self._build_figure_image_url(config.endpoint, source_result_id, source_figure_id),
+                    headers=headers,
+                    figure_id=figure.id,
+                )
+                if resp is None:
+                    return None
+                metrics.incr("di_figures_fetched")
+                if save_dir:
+                    figures_dir = os.path.join(save_dir, DI_FIGURES_DIR)
+                    os.makedirs(figures_dir, exist_ok=True)
+                    self._save_bytes(os.path.join(figures_dir, self._sanitize_image_name(figure.id)), resp.content)
+                return resp.content
+
+            with session:
+                return self._build_document(
+                    result, figures, output_dir, fetch_workers, fetch_figure, self._figure_index(**kwargs)
+                )
         except Exception as e:
             raise Exception(f"azure_di_layout_failed: {e}")
 
+    def layout_replay_load(self, input_md5: str, figures: bool = True, **kwargs) -> DocumentInfo:
+        """Rebuild DocumentInfo from an AnalyzeResult saved by --save-di-result, without network."""
+        output_dir = kwargs.get("output_dir")
+        fetch_workers = int(kwargs.get("figure_fetch_workers") or DEFAULT_FIGURE_FETCH_WORKERS)
+        save_dir = self._di_result_dir(**kwargs)
+        if not save_dir or not os.path.exists(os.path.join(save_dir, DI_RESULT_FILE)):
+            raise ValueError(f"di_result_missing: {save_dir}")
+
+        try:
+            from azure.ai.documentintelligence.models import AnalyzeResult
+        except Exception as e:
+            raise Exception(f"azure_di_deps_missing: {e}")
+
+        meta: dict[str, Any] = {}
+        if os.path.exists(os.path.join(save_dir, DI_RESULT_META)):
+            with open(os.path.join(save_dir, DI_RESULT_META), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        if meta.get("input_md5") and input_md5 and meta["input_md5"] != input_md5:
+            raise ValueError(f"di_result_mismatch: {save_dir}")
+
+        with open(os.path.join(save_dir, DI_RESULT_FILE), "r", encoding="utf-8") as f:
+            result = AnalyzeResult(json.load(f))
+
+        figures_dir = os.path.join(save_dir, DI_FIGURES_DIR)
+
+        def load_figure(figure: Any) -> Optional[bytes]:
+            path = os.path.join(figures_dir, self._sanitize_image_name(figure.id))
+            if not os.path.exists(path):
+                return None
+            with open(path, "rb") as f:
+                return f.read()
+
+        try:
+            return self._build_document(
+                result, figures, output_dir, fetch_workers, load_figure, self._figure_index(**kwargs)
+            )
+        except Exception as e:
+            raise Exception(f"azure_di_replay_failed: {e}")
+
+    def _build_document(
+        self,
+        result: Any,
+        figures: bool,
+        output_dir: str | None,
+        fetch_workers: int,
+        fetch_figure: Callable[[Any], Optional[bytes]],
+        figure_index: Optional[SharedFigureIndex] = None,
+    ) -> DocumentInfo:
+        content = getattr(result, "content", "") or ""
+        # Table merges and figure tags are both expressed as spans of result.content
+        # and applied in one pass; pages are split from the final buffer.
+        table_replacements: list[Replacement] = []
+        if getattr(result, "tables", None) is not None:
+            try:
+                from .merge_table import merge_table_replacements
+
+                table_replacements = merge_table_replacements(result)
+            except Exception as e:
+                logger.warning(f"azure_di_merge_tables_failed: {e}")
+
+        figure_replacements: list[Replacement] = []
+        appended_tags: list[tuple[int, str]] = []
+        if figures:
+            try:
+                figure_replacements, appended_tags = self._extract_images(
+                    result=result,
+                    output_dir=output_dir,
+                    fetch_figure=fetch_figure,
+                    fetch_workers=fetch_workers,
+                    figure_index=figure_index,
+                )
+            except Exception as e:
+                logger.warning(f"azure_di_extract_images_failed: {e}")
+
+        figure_replacements, overlapping = split_overlapping(table_replacements, figure_replacements)
+        # Figures between merged tables are kept in the run's remark text; tag them there.
+        table_replacements, overlapping = rebase_overlapping(content, table_replacements, overlapping)
+        for start, _, tag in overlapping:
+            appended_tags.append((self._page_of_offset(content, start), tag))
+
+        final_content = apply_replacements(content, table_replacements + figure_replacements)
+        pages_content = self._split_markdown(final_content)
+        pages_map = {p["page_number"]: p for p in pages_content}
+        for page_number, tag in appended_tags:
+            self._replace_or_append_image_tag(
+                pages_content,
+                page_number=page_number,
+                replace_content="",
+                image_tag=tag,
+                pages_map=pages_map,
+            )
+
+        doc_info = DocumentInfo()
+        doc_info.content = final_content
+        doc_info.is_md = True
+
+        for item in pages_content:
+            page = DocumentPageInfo(
+                content=item["content"],
+                metadata={"page": int(item["page_number"])},
+            )
+            doc_info.page_list.append(page)
+
+        return doc_info
+
+    def _figure_index(self, **kwargs) -> Optional[SharedFigureIndex]:
+        if kwargs.get("figure_index_path"):
+            return shared_figure_index(str(kwargs["figure_index_path"]))
+        return None
+
+    def _di_result_dir(self, **kwargs) -> Optional[str]:
+        if kwargs.get("di_result_dir"):
+            return str(kwargs["di_result_dir"])
+        if kwargs.get("output_dir"):
+            return os.path.join(str(kwargs["output_dir"]), DI_RESULT_DIR)
+        return None
+
+    def _save_di_result(self, save_dir: str, result: Any, result_id: str, input_md5: str) -> None:
+        os.makedirs(save_dir, exist_ok=True)
+        with open(os.path.join(save_dir, DI_RESULT_FILE), "w", encoding="utf-8") as f:
+            json.dump(result.as_dict(), f, ensure_ascii=False)
+        with open(os.path.join(save_dir, DI_RESULT_META), "w", encoding="utf-8") as f:
+            json.dump({"result_id": result_id, "input_md5": input_md5}, f, ensure_ascii=False, indent=2)
+
     def _split_markdown(self, markdown: str) -> list[dict[str, Any]]:
         pages_content: list[dict[str, Any]] = []
-        pages = markdown.split("<!-- PageBreak -->") if markdown else [""]
+        pages = markdown.split(PAGE_BREAK) if markdown else [""]
         for i, page in enumerate(pages):
             pages_content.append(
                 {
@@ -110,79 +289,94 @@ class AzureDocumentIntelligenceTools:
     def _extract_images(
         self,
         result: Any,
-        result_id: str,
-        pages: list[dict[str, Any]],
-        config: AzureDIConfig,
         output_dir: str | None,
-    ) -> None:
+        fetch_figure: Callable[[Any], Optional[bytes]],
+        fetch_workers: int = DEFAULT_FIGURE_FETCH_WORKERS,
+        figure_index: Optional[SharedFigureIndex] = None,
+    ) -> tuple[list[Replacement], list[tuple[int, str]]]:
+        """Load figure images via `fetch_figure` and return their image tags.
+
+        Near-duplicate images are saved once: per document through a BK-tree,
+        and across a batch when a shared `figure_index` is given.
+
+        Returns (replacements, appended): tags replacing the figure's span of
+        result.content, and (page_number, tag) pairs for figures without a span.
+        """
+        replacements: list[Replacement] = []
+        appended: list[tuple[int, str]] = []
         if getattr(result, "figures", None) is None:
-            return
+            return replacements, appended
         if not output_dir:
-            return
+            return replacements, appended
 
         try:
             from PIL import Image
         except Exception:
-            return
+            return replacements, appended
 
         images_dir = self._ensure_images_dir(output_dir)
-        session, headers = self._create_image_fetch_session(config)
-        processed_hash: dict[str, str] = {}
+        fetch_workers = max(1, int(fetch_workers))
+        processed: BKTree[str] = BKTree()
         markdown_content = getattr(result, "content", "") or ""
-        pages_map = {p["page_number"]: p for p in pages}
-
-        for figure in result.figures:
-            figure_id = getattr(figure, "id", None)
-            if not figure_id:
-                continue
-
-            page_number = self._figure_page_number(figure_id)
-            image_url = self._build_figure_image_url(
-                endpoint=config.endpoint,
-                result_id=result_id,
-                figure_id=figure_id,
-            )
-            resp = self._fetch_image_with_retries(
-                session=session,
-                image_url=image_url,
-                headers=headers,
-                figure_id=figure_id,
-            )
-            if resp is None:
-                continue
-
-            image_name = self._sanitize_image_name(figure_id)
-            image_path = os.path.join(images_dir, image_name)
-            current_hash, threshold = self._compute_image_hash(Image, resp.content, image_name)
-            dup_path = self._find_duplicate_image_path(processed_hash, current_hash, threshold)
-            if dup_path:
-                image_path = dup_path
-            else:
-                self._save_bytes(image_path, resp.content)
-                processed_hash[current_hash] = image_path
 
-            figure_content = self._extract_figure_content(figure, markdown_content)
-            caption = self._extract_figure_caption(figure)
-            caption_text = self._build_caption_text(caption, figure_content)
-            rel_path = os.path.relpath(image_path, output_dir).replace("\\", "/")
-            tag = self._make_md_image_tag(caption_text, rel_path)
-
-            self._replace_or_append_image_tag(
-                pages=pages,
-                pages_map=pages_map,
-                page_number=page_number,
-                replace_content=figure_content,
-                image_tag=tag,
-            )
+        figures = [figure for figure in result.figures if getattr(figure, "id", None)]
+
+        # Downloads run concurrently; results are consumed in figure order so
+        # dedup and tag placement stay deterministic.
+        with ThreadPoolExecutor(max_workers=fetch_workers) as executor:
+            for figure, image_bytes in zip(figures, executor.map(metrics.bind(fetch_figure), figures)):
+                if image_bytes is None:
+                    continue
+
+                figure_id = figure.id
+                page_number = self._figure_page_number(figure_id)
+                image_name = self._sanitize_image_name(figure_id)
+                image_path = os.path.join(images_dir, image_name)
+                current_hash = self._compute_image_hash(Image, image_bytes)
+                dup_path = self._find_duplicate_image_path(processed, figure_index, current_hash)
+                if dup_path and os.path.dirname(os.path.abspath(dup_path)) == os.path.abspath(images_dir):
+                    metrics.incr("di_figures_deduplicated")
+                    image_path = dup_path
+                else:
+                    # Another document's copy is hardlinked in, so every output folder stays self-contained.
+                    if dup_path and self._link_or_copy(dup_path, image_path):
+                        metrics.incr("di_figures_deduplicated")
+                    else:
+                        self._save_bytes(image_path, image_bytes)
+                    if current_hash is not None:
+                        processed.add(current_hash, image_path)
+                        if figure_index is not None:
+                            figure_index.add(current_hash, image_path)
+
+                span = self._figure_span(figure, len(markdown_content))
+                figure_content = markdown_content[span[0] : span[1]] if span else ""
+                caption = self._extract_figure_caption(figure)
+                caption_text = self._build_caption_text(caption, figure_content)
+                rel_path = os.path.relpath(image_path, output_dir).replace("\\", "/")
+                tag = self._make_md_image_tag(caption_text, rel_path)
+
+                if span and figure_content:
+                    replacements.append((span[0], span[1], tag))
+                else:
+                    appended.append((page_number, tag))
+
+        return replacements, appended
 
     def _ensure_images_dir(self, output_dir: str) -> str:
         images_dir = os.path.join(output_dir, "images")
         os.makedirs(images_dir, exist_ok=True)
         return images_dir
 
-    def _create_image_fetch_session(self, config: AzureDIConfig) -> tuple[requests.Session, dict[str, str]]:
+    def _create_image_fetch_session(
+        self,
+        config: AzureDIConfig,
+        pool_size: int = DEFAULT_FIGURE_FETCH_WORKERS,
+    ) -> tuple[requests.Session, dict[str, str]]:
         session = requests.Session()
         session.trust_env = not bool(config.no_proxy)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
         headers = {"Ocp-Apim-Subscription-Key": config.key}
         return session, headers
 
@@ -202,6 +396,15 @@ class AzureDocumentIntelligenceTools:
         )
         return f"{image_url}?api-version=2024-11-30"
 
+    def _build_analyze_url(self, endpoint: str, figures: bool = True, pages: Optional[str] = None) -> str:
+        url = "/".join([endpoint.rstrip("/"), "documentintelligence/documentModels/prebuilt-layout:analyze"])
+        query = "api-version=2024-11-30&outputContentFormat=markdown"
+        if figures:
+            query += "&output=figures"
+        if pages:
+            query += f"&pages={pages}"
+        return f"{url}?{query}"
+
     def _fetch_image_with_retries(
         self,
         session: requests.Session,
@@ -220,6 +423,7 @@ class AzureDocumentIntelligenceTools:
                 break
             except Exception as e:
                 last_err = e
+                metrics.incr("di_fetch_errors")
 
         if last_err is not None:
             logger.warning(f"azure_di_fetch_image_failed: figure_id={figure_id} err={last_err}")
@@ -231,30 +435,48 @@ class AzureDocumentIntelligenceTools:
     def _sanitize_image_name(self, figure_id: Any) -> str:
         return f"{figure_id}.png".replace("/", "_").replace("\\", "_")
 
-    def _compute_image_hash(self, Image: Any, image_bytes: bytes, fallback_name: str) -> tuple[str, int]:
+    def _compute_image_hash(self, Image: Any, image_bytes: bytes) -> Optional[int]:
         try:
-            img = Image.open(io.BytesIO(image_bytes))
-            current_hash = dhash(img)
-            threshold = 5
+            with Image.open(io.BytesIO(image_bytes)) as img:
+                return dhash_int(img)
         except Exception:
-            current_hash = fallback_name
-            threshold = 0
-        return current_hash, threshold
+            return None
 
     def _find_duplicate_image_path(
         self,
-        processed_hash: dict[str, str],
-        current_hash: str,
-        threshold: int,
+        processed: BKTree[str],
+        figure_index: Optional[SharedFigureIndex],
+        current_hash: Optional[int],
     ) -> Optional[str]:
-        for saved_hash, saved_path in processed_hash.items():
-            if hamming_distance(current_hash, saved_hash) <= threshold:
-                return saved_path
+        if current_hash is None:
+            return None
+        match = processed.find(current_hash, FIGURE_DEDUP_DISTANCE)
+        if match is not None:
+            return match[1]
+        if figure_index is not None:
+            return figure_index.find(current_hash, FIGURE_DEDUP_DISTANCE)
         return None
 
+    def _link_or_copy(self, src: str, dst: str) -> bool:
+        """Hardlink `src` to `dst` (same storage), copying when links are not supported."""
+        tmp_path = f"{dst}.tmp"
+        try:
+            try:
+                os.link(src, tmp_path)
+            except OSError:
+                shutil.copyfile(src, tmp_path)
+            os.replace(tmp_path, dst)
+            return True
+        except OSError as e:
+            logger.warning(f"azure_di_link_image_failed: src={src} err={e}")
+            return False
+
     def _save_bytes(self, path: str, data: bytes) -> None:
-        with open(path, "wb") as f:
+        # Written aside and renamed, so an image hardlinked from another document is replaced, not overwritten.
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
             f.write(data)
+        os.replace(tmp_path, path)
 
     def _extract_figure_caption(self, figure: Any) -> str:
         caption = ""
@@ -262,18 +484,20 @@ class AzureDocumentIntelligenceTools:
             caption = str(figure.caption.content)
         return caption
 
-    def _extract_figure_content(self, figure: Any, markdown_content: str) -> str:
+    def _figure_span(self, figure: Any, content_len: int) -> Optional[tuple[int, int]]:
         try:
             spans = getattr(figure, "spans", None) or []
             if spans:
-                span0 = spans[0]
-                start = int(getattr(span0, "offset", 0))
-                length = int(getattr(span0, "length", 0))
-                if length > 0 and start >= 0:
-                    return markdown_content[start : start + length]
+                start = int(getattr(spans[0], "offset", 0))
+                length = int(getattr(spans[0], "length", 0))
+                if length > 0 and 0 <= start and start + length <= content_len:
+                    return start, start + length
         except Exception:
-            return ""
-        return ""
+            return None
+        return None
+
+    def _page_of_offset(self, content: str, offset: int) -> int:
+        return content.count(PAGE_BREAK, 0, offset) + 1
 
     def _build_caption_text(self, caption: str, figure_content: str) -> str:
         caption_text = (caption or "").strip()
@@ -288,13 +512,15 @@ class AzureDocumentIntelligenceTools:
     def _replace_or_append_image_tag(
         self,
         pages: list[dict[str, Any]],
-        pages_map: dict[str, dict[str, Any]],
         page_number: int,
         replace_content: str,
         image_tag: str,
+        pages_map: Optional[dict[str, dict[str, Any]]] = None,
     ) -> bool:
+        """Fallback placement for figures without a usable span of result.content."""
         replace_content = replace_content or ""
-        # Optimization: O(1) lookup
+        if pages_map is None:
+            pages_map = {p["page_number"]: p for p in pages}
         matching_page = pages_map.get(str(page_number))
 
         if replace_content and matching_page and replace_content in (matching_page.get("content") or ""):
@@ -12,5 +12,6 @@ class AzureDocumentIntelligenceLayoutModeParser(BaseParser):
             figures=True,
             **kwargs,
         )
-        doc_info.use_chainsaw = False
+        # Pages are packed by the `layout` chainsaw; `--chainsaw page` keeps one chunk per page.
+        doc_info.use_chainsaw = True
         return doc_info
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import hashlib
+
+from ..base_parser import BaseParser
+from ...models.document_model import DocumentInfo
+from ...utils.file_utils import calculate_file_md5
+from .di_tools import AzureDocumentIntelligenceTools
+
+
+class AzureDocumentIntelligenceLayoutReplayParser(BaseParser):
+    """Layout mode rebuilt from a saved AnalyzeResult instead of calling Azure DI."""
+
+    def load(self, file_bytes: bytes, **kwargs) -> DocumentInfo:
+        return self._replay(hashlib.md5(file_bytes).hexdigest(), **kwargs)
+
+    def load_path(self, path: str, **kwargs) -> DocumentInfo:
+        return self._replay(calculate_file_md5(path), **kwargs)
+
+    def _replay(self, input_md5: str, **kwargs) -> DocumentInfo:
+        doc_info: DocumentInfo = AzureDocumentIntelligenceTools().layout_replay_load(
+            input_md5=input_md5,
+            figures=True,
+            **kwargs,
+        )
+        doc_info.use_chainsaw = True
+        return doc_info
@@ -1,12 +1,18 @@
 from __future__ import annotations
 
 import re
+from bisect import bisect_right
 from itertools import zip_longest
 
 from azure.ai.documentintelligence.models import AnalyzeResult, DocumentTable, DocumentTableCellKind
 
+from ...utils.text_utils import Replacement, apply_replacements
+
 BORDER_SYMBOL = "|"
 
+# Paragraph roles that do not block merging a table across a page break.
+_PAGE_FURNITURE_ROLES = {"pageHeader", "pageFooter", "pageNumber"}
+
 
 def _get_table_page_numbers(table):
     return [region.page_number for region in table.bounding_regions]
@@ -66,13 +72,21 @@ def _get_merge_table_candidates_and_table_integral_span(tables):
     return merge_tables_candidates, table_integral_span_list
 
 
-def _check_paragraph_presence(paragraphs, start, end):
-    for paragraph in paragraphs:
-        for span in paragraph.spans:
-            if span.offset > start and span.offset < end:
-                if paragraph.role is not None and paragraph.role not in ["pageHeader", "pageFooter", "pageNumber"]:
-                    return True
-    return False
+def _build_paragraph_index(paragraphs) -> list[int]:
+    """Sorted span offsets of paragraphs whose role can separate two tables."""
+    offsets = []
+    for paragraph in paragraphs or []:
+        if paragraph.role is None or paragraph.role in _PAGE_FURNITURE_ROLES:
+            continue
+        for span in paragraph.spans or []:
+            offsets.append(span.offset)
+    offsets.sort()
+    return offsets
+
+
+def _check_paragraph_presence(paragraph_offsets: list[int], start, end):
+    i = bisect_right(paragraph_offsets, start)
+    return i < len(paragraph_offsets) and paragraph_offsets[i] < end
 
 
 def _check_tables_are_horizontal_distribution(result, pre_table_idx):
@@ -221,14 +235,21 @@ def _is_table_top_banner(result: AnalyzeResult, table_idx: int) -> bool:
 
 
 def merge_tables(result: AnalyzeResult) -> str:
+    return apply_replacements(result.content, merge_table_replacements(result))
+
+
+def merge_table_replacements(result: AnalyzeResult) -> list[Replacement]:
+    """(start, end, merged_markdown) spans of result.content for every merged table run."""
     merge_tables_candidates, table_integral_span_list = _get_merge_table_candidates_and_table_integral_span(result.tables)
 
+    paragraph_offsets = _build_paragraph_index(result.paragraphs)
+
     merged_table_list = []
     for merged_table in merge_tables_candidates:
         pre_table_idx = merged_table["pre_table_idx"]
         start = merged_table["start"]
         end = merged_table["end"]
-        has_paragraph = _check_paragraph_presence(result.paragraphs, start, end)
+        has_paragraph = _check_paragraph_presence(paragraph_offsets, start, end)
 
         is_banner_pre = _is_table_top_banner(result, pre_table_idx)
         is_banner_nxt = _is_table_top_banner(result, pre_table_idx + 1)
@@ -292,19 +313,11 @@ def merge_tables(result: AnalyzeResult) -> str:
         else:
             continue
 
-    optimized_content = ""
-    if merged_table_list:
-        start_idx = 0
-        for merged_table in merged_table_list:
-            optimized_content += (
-                result.content[start_idx : merged_table["offset"]["min_offset"]]
-                + merged_table["content"]
-                + merged_table["remark"]
-            )
-            start_idx = merged_table["offset"]["max_offset"]
-
-        optimized_content += result.content[start_idx:]
-    else:
-        optimized_content = result.content
-
-    return optimized_content
+    return [
+        (
+            merged_table["offset"]["min_offset"],
+            merged_table["offset"]["max_offset"],
+            merged_table["content"] + merged_table["remark"],
+        )
+        for merged_table in merged_table_list
+    ]
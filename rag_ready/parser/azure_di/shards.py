@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import io
+import re
+from typing import Any
+
+SHARD_SEPARATOR = "\n<!-- PageBreak -->\n"
+
+_RE_PDF_PAGE = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+_RE_ELEMENT_REF = re.compile(r"^/(\w+)/(\d+)(.*)$")
+
+
+def count_pdf_pages(file_bytes: bytes) -> int:
+    """Page count of a PDF, 0 if it cannot be determined (or the input is not a PDF)."""
+    if not file_bytes.startswith(b"%PDF"):
+        return 0
+    try:
+        from pypdf import PdfReader
+
+        return len(PdfReader(io.BytesIO(file_bytes)).pages)
+    except Exception:
+        pass
+    # Fallback: page objects in uncompressed object tables; undercounts with object streams.
+    return len(_RE_PDF_PAGE.findall(file_bytes))
+
+
+def page_ranges(page_count: int, shard_pages: int) -> list[tuple[int, int]]:
+    """1-based inclusive page ranges of at most `shard_pages` pages."""
+    if page_count <= 0 or shard_pages <= 0 or page_count <= shard_pages:
+        return []
+    return [(start, min(page_count, start + shard_pages - 1)) for start in range(1, page_count + 1, shard_pages)]
+
+
+def stitch_results(shards: list[tuple[int, str, dict[str, Any]]]) -> tuple[dict[str, Any], dict[str, tuple[str, str]]]:
+    """Join per-shard AnalyzeResult dicts into one, as if the PDF had been analyzed whole.
+
+    `shards` holds (first_page, result_id, analyze_result_dict) in page order.
+    Content is joined with page-break markers and every span offset, page
+    number and "/collection/index" element reference is shifted by what came
+    before. Returns the stitched dict and, per stitched figure id, the
+    (result_id, figure_id) needed to download its image.
+    """
+    stitched: dict[str, Any] = {}
+    figure_sources: dict[str, tuple[str, str]] = {}
+    contents: list[str] = []
+    offset = 0
+    bases: dict[str, int] = {}
+
+    for first_page, result_id, result in shards:
+        page_numbers = [p.get("pageNumber", first_page) for p in result.get("pages") or []]
+        page_delta = first_page - min(page_numbers) if page_numbers else 0
+
+        shifted = _shift(result, offset, page_delta, bases)
+        for figure, original in zip(shifted.get("figures") or [], result.get("figures") or []):
+            if figure.get("id"):
+                figure["id"] = _shift_figure_id(str(figure["id"]), page_delta)
+                figure_sources[figure["id"]] = (result_id, str(original["id"]))
+
+        for key, value in shifted.items():
+            if key == "content":
+                continue
+            if isinstance(value, list):
+                stitched.setdefault(key, []).extend(value)
+                bases[key] = bases.get(key, 0) + len(value)
+            else:
+                stitched.setdefault(key, value)
+
+        content = result.get("content") or ""
+        contents.append(content)
+        offset += len(content) + len(SHARD_SEPARATOR)
+
+    stitched["content"] = SHARD_SEPARATOR.join(contents)
+    return stitched, figure_sources
+
+
+def _shift(node: Any, offset: int, page_delta: int, bases: dict[str, int]) -> Any:
+    if isinstance(node, dict):
+        out: dict[str, Any] = {}
+        for key, value in node.items():
+            if key == "spans" and isinstance(value, list):
+                out[key] = [{**span, "offset": int(span.get("offset", 0)) + offset} for span in value]
+            elif key == "pageNumber" and isinstance(value, int):
+                out[key] = value + page_delta
+            else:
+                out[key] = _shift(value, offset, page_delta, bases)
+        return out
+    if isinstance(node, list):
+        return [_shift(item, offset, page_delta, bases) for item in node]
+    if isinstance(node, str) and node.startswith("/"):
+        m = _RE_ELEMENT_REF.match(node)
+        if m and m.group(1) in bases:
+            return f"/{m.group(1)}/{int(m.group(2)) + bases[m.group(1)]}{m.group(3)}"
+    return node
+
+
+def _shift_figure_id(figure_id: str, page_delta: int) -> str:
+    page, sep, rest = figure_id.partition(".")
+    if not page_delta or not sep or not page.isdigit():
+        return figure_id
+    return f"{int(page) + page_delta}.{rest}"
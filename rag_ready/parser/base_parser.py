@@ -1,12 +1,52 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import ClassVar, Iterator
 
-from ..models.document_model import DocumentInfo
+from ..models.document_model import DocumentInfo, DocumentPageInfo
+
+
+@dataclass
+class DocumentStream:
+    blocks: Iterator[DocumentPageInfo]
+    use_chainsaw: bool = True
+    is_md: bool = False
+
+    @classmethod
+    def from_document(cls, doc_info: DocumentInfo) -> "DocumentStream":
+        """A stream over an already parsed document, one block per page."""
+        if doc_info.page_list:
+            blocks = iter(doc_info.page_list)
+        else:
+            blocks = iter([DocumentPageInfo(content=doc_info.content or "")])
+        return cls(blocks=blocks, use_chainsaw=doc_info.use_chainsaw, is_md=doc_info.is_md)
 
 
 class BaseParser(ABC):
+    # Parsers keep no per-document state, so ParserFactory shares one instance.
+    reusable: ClassVar[bool] = True
+
     @abstractmethod
     def load(self, file_bytes: bytes, **kwargs) -> DocumentInfo:
         raise NotImplementedError
 
+    def load_path(self, path: str, **kwargs) -> DocumentInfo:
+        """Parse a file on disk; text parsers override this to decode without reading bytes first."""
+        with open(path, "rb") as f:
+            file_bytes = f.read()
+        return self.load(file_bytes=file_bytes, **kwargs)
+
+    @property
+    def streams_incrementally(self) -> bool:
+        """True when open_stream is overridden to decode the file block by block."""
+        return type(self).open_stream is not BaseParser.open_stream
+
+    def open_stream(self, path: str, **kwargs) -> DocumentStream:
+        """Stream the document as text blocks or pages.
+
+        The default reads the whole file and yields the parsed result, so every
+        parser works in streaming mode; parsers that can decode incrementally
+        override this to keep memory bounded.
+        """
+        return DocumentStream.from_document(self.load_path(path, **kwargs))
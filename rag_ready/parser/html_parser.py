@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from ..models.document_model import DocumentInfo
-from .base_parser import BaseParser
+from ..models.document_model import DocumentInfo, DocumentPageInfo
+from ..utils.file_utils import iter_text_blocks, read_text
+from .base_parser import BaseParser, DocumentStream
 
 
 class HtmlParser(BaseParser):
@@ -9,3 +10,9 @@ class HtmlParser(BaseParser):
         text = file_bytes.decode("utf-8", errors="ignore")
         return DocumentInfo(content=text, use_chainsaw=True, is_md=False)
 
+    def load_path(self, path: str, **kwargs) -> DocumentInfo:
+        return DocumentInfo(content=read_text(path), use_chainsaw=True, is_md=False)
+
+    def open_stream(self, path: str, **kwargs) -> DocumentStream:
+        blocks = (DocumentPageInfo(content=text) for text in iter_text_blocks(path))
+        return DocumentStream(blocks=blocks, use_chainsaw=True, is_md=False)
@@ -1,17 +1,11 @@
 from __future__ import annotations
 
-import json
+from .txt_parser import TxtParser
 
-from ..models.document_model import DocumentInfo
-from .base_parser import BaseParser
 
+class JsonParser(TxtParser):
+    """JSON and JSON Lines are passed through as text, streamed block by block.
 
-class JsonParser(BaseParser):
-    def load(self, file_bytes: bytes, **kwargs) -> DocumentInfo:
-        try:
-            obj = json.loads(file_bytes.decode("utf-8", errors="ignore"))
-            text = json.dumps(obj, ensure_ascii=False, indent=2)
-        except Exception:
-            text = file_bytes.decode("utf-8", errors="ignore")
-        return DocumentInfo(content=text, use_chainsaw=True, is_md=False)
-
+    Nothing is parsed into objects here; the `json` / `jsonl` chainsaws walk
+    the text incrementally and cut it along array elements and object members.
+    """
@@ -1,32 +1,45 @@
 from __future__ import annotations
 
-from typing import Dict, Type
+from typing import Dict
 
+from ..utils.registry import Registry
 from .base_parser import BaseParser
-from .html_parser import HtmlParser
-from .json_parser import JsonParser
-from .markdown_parser import MarkdownParser
-from .txt_parser import TxtParser
-
-FILE_TYPE_PAESER: Dict[str, Type[BaseParser]] = {
-    "txt": TxtParser,
-    "md": MarkdownParser,
-    "json": JsonParser,
-    "html": HtmlParser,
-    "htm": HtmlParser,
+
+PARSER_ENTRY_POINT_GROUP = "rag_ready.parsers"
+
+# "module:Class" specs, imported only when a file of that type is parsed
+FILE_TYPE_PAESER: Dict[str, str] = {
+    "txt": ".txt_parser:TxtParser",
+    "md": ".markdown_parser:MarkdownParser",
+    "json": ".json_parser:JsonParser",
+    "jsonl": ".json_parser:JsonParser",
+    "html": ".html_parser:HtmlParser",
+    "htm": ".html_parser:HtmlParser",
+}
+
+# `--extractor` parsers, used for every file type
+EXTRACTOR_PARSER: Dict[str, str] = {
+    "layout": ".azure_di.layout_mode:AzureDocumentIntelligenceLayoutModeParser",
+    "layout-replay": ".azure_di.layout_replay_mode:AzureDocumentIntelligenceLayoutReplayParser",
 }
 
+# Installed packages add or replace parsers through the `rag_ready.parsers`
+# entry point group, e.g. `pdf = "acme_parsers.pdf:FastPdfParser"`.
+PARSERS: Registry[BaseParser] = Registry(PARSER_ENTRY_POINT_GROUP, {**FILE_TYPE_PAESER, **EXTRACTOR_PARSER}, __package__)
+
 
 class ParserFactory:
     @staticmethod
     def get_parser(file_type: str, extractor: str = "", use_extractor: bool = False) -> BaseParser:
-        parser_key = f"{file_type}_{extractor}" if use_extractor else file_type
-        if use_extractor and extractor == "layout":
-            try:
-                from .azure_di.layout_mode import AzureDocumentIntelligenceLayoutModeParser
-            except Exception as e:
-                raise RuntimeError(f"azure_di_layout_parser_unavailable: {e}")
-            return AzureDocumentIntelligenceLayoutModeParser()
-
-        the_class = FILE_TYPE_PAESER.get(parser_key, FILE_TYPE_PAESER.get(file_type, TxtParser))
-        return the_class()
+        if use_extractor and extractor:
+            for key in (f"{file_type}_{extractor}", extractor):
+                if key not in PARSERS:
+                    continue
+                try:
+                    return PARSERS.instance(key)
+                except Exception as e:
+                    if PARSERS.spec(key) == EXTRACTOR_PARSER.get(key):
+                        raise RuntimeError(f"azure_di_layout_parser_unavailable: {e}")
+                    raise RuntimeError(f"parser_unavailable: {key}: {e}")
+
+        return PARSERS.instance(file_type if file_type in PARSERS else "txt")
@@ -1,41 +1,86 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from typing import Callable, ClassVar, Iterable
 
 from loguru import logger
 
 from .context import PipelineContext
-from .steps import (
-    EnrichImageCaptionsStep,
-    InputFileInfoStep,
-    ParserDocumentStep,
-    CuttingDocumentStep,
-    WriteOutputFilesStep,
-)
+from .metrics import MetricsRecorder, activate
+from .utils.lazy import load_object
+
+
+def _captions_enabled(context: PipelineContext) -> bool:
+    return bool((context.ai_settings or {}).get("enable_image_caption", False))
 
 
 @dataclass
 class RagPreprocessPipeline:
     context: PipelineContext
 
+    # "module:Class" specs; a step module is imported only when the step runs.
     STEPS = [
-        InputFileInfoStep,
-        ParserDocumentStep,
-        CuttingDocumentStep,
-        EnrichImageCaptionsStep,
-        WriteOutputFilesStep,
+        ".steps.input_file_info_step:InputFileInfoStep",
+        ".steps.incremental_check_step:IncrementalCheckStep",
+        ".steps.parser_document_step:ParserDocumentStep",
+        ".steps.cutting_document_step:CuttingDocumentStep",
+        ".steps.enrich_image_captions_step:EnrichImageCaptionsStep",
+        ".steps.write_output_files_step:WriteOutputFilesStep",
     ]
+    # Optional steps are skipped, without importing them, unless configured.
+    STEP_ENABLED: ClassVar[dict[str, Callable[[PipelineContext], bool]]] = {
+        "EnrichImageCaptionsStep": _captions_enabled,
+    }
 
     def run(self) -> bool:
-        for StepClass in self.STEPS:
-            step = StepClass(self.context)
-            step.run()
+        self.run_steps(self.STEPS)
+        return self.finish()
+
+    def run_steps(self, specs: Iterable[str]) -> bool:
+        """Run a slice of `STEPS`; False once the document has failed or stopped early.
 
-            if not self.context.should_continue:
-                break
-            if not self.context.success:
-                break
+        The staged scheduler calls this once per stage, so a document may pass
+        through several threads or processes before `finish`.
+        """
+        config = self.context.config
+        if config.metrics_formats and self.context.metrics is None:
+            self.context.metrics = MetricsRecorder(trace_memory=config.trace_memory)
 
+        with activate(self.context.metrics):
+            for spec in specs:
+                if not self.active:
+                    break
+                enabled = self.STEP_ENABLED.get(spec.rpartition(":")[2])
+                if enabled is not None and not enabled(self.context):
+                    continue
+                StepClass = load_object(spec, __package__)
+                step = StepClass(self.context)
+                step.run()
+        return self.active
+
+    @property
+    def active(self) -> bool:
+        return self.context.success and self.context.should_continue
+
+    def finish(self) -> bool:
         logger.info(f"done: success={self.context.success}")
+        self._write_metrics()
         return self.context.success
 
+    def _write_metrics(self) -> None:
+        metrics = self.context.metrics
+        formats = self.context.config.metrics_formats
+        if metrics is None or not formats:
+            return
+        metrics.attributes.update(
+            {
+                "input_path": self.context.input_path,
+                "success": self.context.success,
+                "change_status": self.context.change_status,
+            }
+        )
+        try:
+            metrics.write(self.context.output_dir, formats)
+        except Exception as e:
+            logger.warning(f"metrics_write_failed: {e}")
+
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import dataclasses
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+from loguru import logger
+
+from .batch import BatchJob, BatchResult, job_context, job_result
+from .context import PipelineConfig, PipelineContext
+from .pipeline import RagPreprocessPipeline
+
+STAGE_EXECUTORS = ("thread", "process")
+
+
+@dataclass(frozen=True)
+class Stage:
+    """A run of consecutive pipeline steps with its own workers and input queue.
+
+    `steps` are step class names from `RagPreprocessPipeline.STEPS`. The input
+    queue holds at most `queue_size` documents (default twice the workers), so
+    a slow stage blocks the stages feeding it instead of piling up parsed
+    documents in memory.
+    """
+
+    name: str
+    steps: tuple[str, ...]
+    workers: int = 1
+    executor: str = "thread"
+    queue_size: int = 0
+
+
+def default_stages(cpu_workers: int = 1) -> list[Stage]:
+    """Network-bound stages on threads, chunking on a process pool of `cpu_workers`."""
+    return [
+        Stage("prepare", ("InputFileInfoStep", "IncrementalCheckStep"), workers=2),
+        Stage("parse", ("ParserDocumentStep",), workers=4),
+        Stage("cut", ("CuttingDocumentStep",), workers=max(1, cpu_workers), executor="process"),
+        Stage("enrich", ("EnrichImageCaptionsStep",), workers=4),
+        Stage("write", ("WriteOutputFilesStep",), workers=2),
+    ]
+
+
+def configure_stages(stages: list[Stage], overrides: Iterable[str]) -> list[Stage]:
+    """Apply `name=workers[:executor]` overrides, e.g. `parse=16` or `cut=4:thread`."""
+    by_name = {stage.name: stage for stage in stages}
+    for item in overrides:
+        name, sep, value = item.partition("=")
+        workers, _, executor = value.partition(":")
+        if not sep or name not in by_name or not workers.isdigit() or int(workers) < 1:
+            raise ValueError(f"bad_stage_spec: {item}")
+        if executor and executor not in STAGE_EXECUTORS:
+            raise ValueError(f"bad_stage_executor: {item}")
+        by_name[name] = dataclasses.replace(by_name[name], workers=int(workers), executor=executor or by_name[name].executor)
+    return [by_name[stage.name] for stage in stages]
+
+
+def _stage_specs(stages: list[Stage]) -> list[list[str]]:
+    specs = {spec.rpartition(":")[2]: spec for spec in RagPreprocessPipeline.STEPS}
+    names = [name for stage in stages for name in stage.steps]
+    # Stages only regroup the pipeline; every step must appear once, in pipeline order.
+    if names != list(specs):
+        raise ValueError(f"stages_must_cover_steps: {', '.join(names)}")
+    return [[specs[name] for name in stage.steps] for stage in stages]
+
+
+def _run_stage(specs: list[str], context: PipelineContext) -> PipelineContext:
+    """Process-pool entry point: the context is pickled in and back out."""
+    RagPreprocessPipeline(context).run_steps(specs)
+    return context
+
+
+@dataclass
+class _Item:
+    job: BatchJob
+    previous_state: dict[str, Any] | None
+    context: PipelineContext | None = None
+    started: float = 0.0
+    queued: float = 0.0
+    error: str | None = None
+
+
+_DONE = object()
+
+
+class StagedScheduler:
+    """Run documents through stages connected by bounded queues.
+
+    Each stage has its own worker threads; a `process` stage's threads hand the
+    document context to a process pool of the same size. Document A can be
+    chunking while document B waits on Azure DI and document C is captioned,
+    and a full queue stalls upstream stages (backpressure).
+    """
+
+    def __init__(
+        self,
+        stages: list[Stage],
+        config: PipelineConfig,
+        ai_settings: dict[str, Any] | None = None,
+        ai_client: Any = None,
+        record_metrics: bool = False,
+    ) -> None:
+        self.stages = list(stages)
+        self.specs = _stage_specs(self.stages)
+        self.config = config
+        self.ai_settings = ai_settings
+        self.ai_client = ai_client
+        self.record_metrics = record_metrics
+
+    def run(
+        self,
+        jobs: Iterable[BatchJob],
+        previous_state: Callable[[BatchJob], dict[str, Any] | None] | None = None,
+        on_result: Callable[[BatchResult], None] | None = None,
+    ) -> list[BatchResult]:
+        stages = self.stages
+        queues: list[queue.Queue] = [queue.Queue(maxsize=s.queue_size or 2 * s.workers) for s in stages]
+        remaining = [s.workers for s in stages]
+        results: list[BatchResult] = []
+        lock = threading.Lock()
+
+        pools: dict[int, ProcessPoolExecutor] = {}
+        for i, stage in enumerate(stages):
+            if stage.executor != "process":
+                continue
+            if self.config.streaming:
+                # Streamed documents carry live generators, which cannot cross processes.
+                logger.warning(f"stage_executor_fallback: stage={stage.name} executor=thread reason=streaming")
+                continue
+            pools[i] = ProcessPoolExecutor(max_workers=stage.workers)
+            # With fork, all workers start on the first submit; do it before any stage thread exists.
+            pools[i].submit(int).result()
+
+        def finish(item: _Item) -> None:
+            context = item.context
+            ok = False
+            if context is not None and item.error is None:
+                try:
+                    ok = RagPreprocessPipeline(context).finish()
+                except Exception as e:
+                    item.error = f"{type(e).__name__}: {e}"
+            error = item.error or (None if ok else (context.error if context is not None else None) or "pipeline_failed")
+            result = job_result(item.job, context, ok, error, time.perf_counter() - item.started)
+            with lock:
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
+
+        def run_stage(i: int, item: _Item) -> bool:
+            if item.context is None:
+                item.started = time.perf_counter()
+                item.context = job_context(
+                    item.job, self.config, self.ai_settings, item.previous_state, self.ai_client, self.record_metrics
+                )
+            context = item.context
+            if context.metrics is not None and item.queued:
+                context.metrics.incr("queue_wait_s", time.perf_counter() - item.queued)
+            pool = pools.get(i)
+            if pool is None:
+                return RagPreprocessPipeline(context).run_steps(self.specs[i])
+            # Clients hold sockets and locks; the worker process does not need them for CPU stages.
+            shipped = dataclasses.replace(context, ai_client=None)
+            item.context = pool.submit(_run_stage, self.specs[i], shipped).result()
+            item.context.ai_client = context.ai_client
+            return RagPreprocessPipeline(item.context).active
+
+        def worker(i: int) -> None:
+            # Whatever happens to this thread, its stage must still hand _DONE downstream or join hangs.
+            try:
+                while True:
+                    item = queues[i].get()
+                    if item is _DONE:
+                        break
+                    try:
+                        active = run_stage(i, item)
+                    except Exception as e:
+                        item.error = f"{type(e).__name__}: {e}"
+                        active = False
+                    if active and i + 1 < len(stages):
+                        item.queued = time.perf_counter()
+                        queues[i + 1].put(item)
+                        continue
+                    try:
+                        finish(item)
+                    except Exception as e:
+                        logger.warning(f"staged_finish_failed: file={item.job.input_path} err={e}")
+            finally:
+                with lock:
+                    remaining[i] -= 1
+                    last = remaining[i] == 0
+                if last and i + 1 < len(stages):
+                    for _ in range(stages[i + 1].workers):
+                        queues[i + 1].put(_DONE)
+
+        logger.info("staged_start: " + " ".join(f"{s.name}={s.workers}:{s.executor}" for s in stages))
+        threads = [
+            threading.Thread(target=worker, args=(i,), name=f"stage-{stage.name}-{n}", daemon=True)
+            for i, stage in enumerate(stages)
+            for n in range(stage.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for job in jobs:
+                previous = previous_state(job) if previous_state is not None else None
+                queues[0].put(_Item(job=job, previous_state=previous))
+            for _ in range(stages[0].workers):
+                queues[0].put(_DONE)
+            for thread in threads:
+                thread.join()
+        finally:
+            for pool in pools.values():
+                pool.shutdown()
+        return results
@@ -1,15 +1,27 @@
-from .pipeline_base import PipelineStep
-from .enrich_image_captions_step import EnrichImageCaptionsStep
-from .input_file_info_step import InputFileInfoStep
-from .parser_document_step import ParserDocumentStep
-from .cutting_document_step import CuttingDocumentStep
-from .write_output_files_step import WriteOutputFilesStep
-
-__all__ = [
-    "PipelineStep",
-    "EnrichImageCaptionsStep",
-    "InputFileInfoStep",
-    "ParserDocumentStep",
-    "CuttingDocumentStep",
-    "WriteOutputFilesStep",
-]
+from typing import TYPE_CHECKING
+
+from ..utils.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .pipeline_base import PipelineStep
+    from .enrich_image_captions_step import EnrichImageCaptionsStep
+    from .input_file_info_step import InputFileInfoStep
+    from .incremental_check_step import IncrementalCheckStep
+    from .parser_document_step import ParserDocumentStep
+    from .cutting_document_step import CuttingDocumentStep
+    from .write_output_files_step import WriteOutputFilesStep
+
+# Steps are imported on first use, so a run only loads the steps it executes.
+_EXPORTS = {
+    "PipelineStep": ".pipeline_base:PipelineStep",
+    "EnrichImageCaptionsStep": ".enrich_image_captions_step:EnrichImageCaptionsStep",
+    "InputFileInfoStep": ".input_file_info_step:InputFileInfoStep",
+    "IncrementalCheckStep": ".incremental_check_step:IncrementalCheckStep",
+    "ParserDocumentStep": ".parser_document_step:ParserDocumentStep",
+    "CuttingDocumentStep": ".cutting_document_step:CuttingDocumentStep",
+    "WriteOutputFilesStep": ".write_output_files_step:WriteOutputFilesStep",
+}
+
+__all__ = list(_EXPORTS)
+
+__getattr__ = lazy_exports(__name__, _EXPORTS)
@@ -15,23 +15,31 @@ class CuttingDocumentStep(PipelineStep):
         doc_info = self.context.doc_mes
         config = self.context.config
 
+        if config.streaming:
+            self._execute_stream()
+            return
+
         if file_info is None or doc_info is None:
             raise ValueError("chainsaw_missing_context")
 
         chunk_size = config.chunk_size
         overlap = config.overlap
         file_type = getattr(file_info, "extension", "") or ""
-        chainsaw_name = config.chainsaw or "default"
+        chainsaw_name = self._chainsaw_name()
 
         texts: list[dict[str, Any]] = []
         if doc_info.use_chainsaw:
-            chainsaw = ChainsawFactory(chunk_size, overlap, file_info=file_info).get_chainsaw(
+            chainsaw = ChainsawFactory(
+                chunk_size,
+                overlap,
+                chunk_unit=config.chunk_unit,
+                tokenizer_path=config.tokenizer_path,
+            ).get_chainsaw(
                 chainsaw_name=chainsaw_name,
                 file_type=file_type,
             )
-            parts = chainsaw.split_text(doc_info)
-            for idx, text in enumerate(parts):
-                texts.append({"text": text, "metadata": {"part": idx}})
+            for chunk in chainsaw.split_chunks(doc_info):
+                texts.append({"text": chunk.text, "metadata": chunk.metadata})
         else:
             page_list = getattr(doc_info, "page_list", []) or []
             for page in page_list:
@@ -52,3 +60,33 @@ class CuttingDocumentStep(PipelineStep):
 
         logger.info(f"segments_ready: {len(segments)}")
 
+    def _execute_stream(self) -> None:
+        file_info = self.context.file_mes
+        stream = self.context.doc_stream
+        config = self.context.config
+
+        if file_info is None or stream is None:
+            raise ValueError("chainsaw_missing_context")
+
+        if stream.use_chainsaw:
+            chainsaw = ChainsawFactory(
+                config.chunk_size,
+                config.overlap,
+                chunk_unit=config.chunk_unit,
+                tokenizer_path=config.tokenizer_path,
+            ).get_chainsaw(
+                chainsaw_name=self._chainsaw_name(),
+                file_type=getattr(file_info, "extension", "") or "",
+            )
+            self.context.chunk_stream = chainsaw.iter_chunks(stream.blocks)
+        else:
+            self.context.chunk_stream = (
+                DocumentChunkInfo(text=page.content or "", metadata=page.metadata or {})
+                for page in stream.blocks
+            )
+        self.context.doc_stream = None
+
+    def _chainsaw_name(self) -> str:
+        # Extractors producing structured Markdown have a matching chainsaw (e.g. `layout`).
+        config = self.context.config
+        return config.chainsaw or config.extractor or "default"
@@ -2,20 +2,38 @@ from __future__ import annotations
 
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator
 
 from loguru import logger
 
-from ..ai.azure_openai_vision_client import AzureOpenAIVisionClient, AzureOpenAIVisionConfig
+from .. import metrics
+from ..ai.azure_openai_vision_client import PROMPT_VERSION, AzureOpenAIVisionClient
+from ..ai.rate_limiter import RateLimiter, call_with_backoff
+from ..cache.caption_cache import DEFAULT_MAX_DISTANCE, CaptionCache
+from ..models.document_model import DocumentChunkInfo
+from ..utils.file_utils import dhash
+from ..utils.image_hash import BKTree
 from .pipeline_base import PipelineStep
 
 
 IMAGE_PATTERN = re.compile(r"!\[([^\]]*)\]\(([^)]+)\)")
 
+DEFAULT_CAPTION_WORKERS = 4
+# Rough prompt + image + answer budget per call, used for the tokens/min bucket.
+DEFAULT_TOKENS_PER_IMAGE = 1000
+# Chunks captioned together when the pipeline runs in streaming mode.
+STREAM_CAPTION_WINDOW = 64
+
 
 class EnrichImageCaptionsStep(PipelineStep):
     def execute(self) -> None:
+        streaming = self.context.config.streaming
         segments = self.context.chunk_list
-        if not isinstance(segments, list) or not segments:
+        if streaming:
+            if self.context.chunk_stream is None:
+                return
+        elif not isinstance(segments, list) or not segments:
             return
 
         if not getattr(self.context, "is_md", False):
@@ -27,66 +45,232 @@ class EnrichImageCaptionsStep(PipelineStep):
 
         client = self.context.ai_client
         if client is None:
-            cfg = AzureOpenAIVisionConfig(
-                endpoint=settings.get("aoai_endpoint", ""),
-                key=settings.get("aoai_key", ""),
-                deployment=settings.get("aoai_deployment", ""),
-                api_version=settings.get("aoai_api_version", ""),
-                temperature=float(settings.get("aoai_temperature", 0.0)),
-            )
-            if not cfg.endpoint or not cfg.key or not cfg.deployment or not cfg.api_version:
-                raise ValueError("aoai_config_missing")
-            client = AzureOpenAIVisionClient(cfg)
+            client = AzureOpenAIVisionClient.from_settings(settings)
 
         limit = int(settings.get("image_caption_limit", 0) or 0)
-        processed: dict[str, str] = {}
-        changed = 0
-        called = 0
+        if streaming:
+            self.context.chunk_stream = self._enrich_stream(self.context.chunk_stream, client, settings, limit)
+            return
+
+        self._enrich(segments, client, settings, limit if limit > 0 else None)
+        self.context.chunk_list = segments
+
+    def _enrich_stream(
+        self,
+        stream: Iterator[DocumentChunkInfo],
+        client: Any,
+        settings: dict[str, Any],
+        limit: int,
+    ) -> Iterator[DocumentChunkInfo]:
+        """Caption a chunk stream window by window; `limit` and the caption cache are shared across windows."""
+        calls = 0
+        opened = False
+        cache: CaptionCache | None = None
+
+        def enrich(window: list[DocumentChunkInfo]) -> int:
+            nonlocal opened, cache
+            targets = self._collect_local_images(window)
+            if not targets:
+                return 0
+            if not opened:
+                cache, opened = self._open_caption_cache(settings), True
+            max_calls = max(0, limit - calls) if limit > 0 else None
+            return self._enrich_targets(window, targets, client, settings, max_calls, cache)
+
+        try:
+            window: list[DocumentChunkInfo] = []
+            for seg in stream:
+                window.append(seg)
+                if len(window) < STREAM_CAPTION_WINDOW:
+                    continue
+                calls += enrich(window)
+                yield from window
+                window = []
+            if window:
+                enrich(window)
+                yield from window
+        finally:
+            self._close_caption_cache(cache)
+
+    def _enrich(
+        self,
+        segments: list[DocumentChunkInfo],
+        client: Any,
+        settings: dict[str, Any],
+        max_calls: int | None = None,
+    ) -> int:
+        targets = self._collect_local_images(segments)
+        if not targets:
+            return 0
+
+        cache = self._open_caption_cache(settings)
+        try:
+            return self._enrich_targets(segments, targets, client, settings, max_calls, cache)
+        finally:
+            self._close_caption_cache(cache)
+
+    def _enrich_targets(
+        self,
+        segments: list[DocumentChunkInfo],
+        targets: dict[str, str],
+        client: Any,
+        settings: dict[str, Any],
+        max_calls: int | None,
+        cache: CaptionCache | None,
+    ) -> int:
+        model = settings.get("aoai_deployment") or getattr(getattr(client, "config", None), "deployment", "") or ""
+        captions, pending, hashes, duplicates = self._lookup_cached(cache, targets, model)
+
+        if max_calls is not None:
+            pending = dict(list(pending.items())[:max_calls])
+        if pending:
+            metrics.incr("ai_calls", len(pending))
+            new_captions = self._caption_images(client, pending, settings)
+            captions.update(new_captions)
+            if cache is not None:
+                for path, text in new_captions.items():
+                    if path in hashes:
+                        cache.store(hashes[path], model, PROMPT_VERSION, text)
+        for path, rep in duplicates.items():
+            if rep in captions:
+                captions[path] = captions[rep]
+
+        changed = self._apply_captions(segments, captions)
+        if changed:
+            logger.info(f"image_caption_enriched: images_updated={changed} ai_calls={len(pending)}")
+        return len(pending)
+
+    def _close_caption_cache(self, cache: CaptionCache | None) -> None:
+        if cache is not None:
+            logger.info(f"caption_cache: hits={cache.hits} misses={cache.misses}")
+            cache.close()
+
+    def _open_caption_cache(self, settings: dict[str, Any]) -> CaptionCache | None:
+        path = settings.get("caption_cache_path")
+        if not path:
+            return None
+        return CaptionCache(
+            path,
+            max_entries=int(settings.get("caption_cache_max_entries", 0) or 0),
+            max_age_s=float(settings.get("caption_cache_max_age_s", 0) or 0),
+            max_distance=int(settings.get("caption_cache_distance", DEFAULT_MAX_DISTANCE)),
+        )
 
+    def _image_hash(self, path: str) -> str | None:
+        try:
+            from PIL import Image
+
+            with Image.open(path) as img:
+                return dhash(img)
+        except Exception:
+            return None
+
+    def _lookup_cached(
+        self,
+        cache: CaptionCache | None,
+        targets: dict[str, str],
+        model: str,
+    ) -> tuple[dict[str, str], dict[str, str], dict[str, str], dict[str, str]]:
+        """Split targets into cached captions and images that still need an AI call.
+
+        Returns (captions, pending, hashes, duplicates). Near-identical images
+        within this run are recorded in `duplicates` against the first one, so
+        only that one is sent to the model.
+        """
+        if cache is None:
+            return {}, dict(targets), {}, {}
+
+        captions: dict[str, str] = {}
+        pending: dict[str, str] = {}
+        hashes: dict[str, str] = {}
+        duplicates: dict[str, str] = {}
+        pending_hashes: BKTree[str] = BKTree()
+        for path, hint in targets.items():
+            image_hash = self._image_hash(path)
+            if image_hash is None:
+                pending[path] = hint
+                continue
+            hashes[path] = image_hash
+            cached = cache.lookup(image_hash, model, PROMPT_VERSION)
+            if cached is not None:
+                captions[path] = cached
+                continue
+            value = int(image_hash, 16)
+            match = pending_hashes.find(value, cache.max_distance)
+            if match is None:
+                pending_hashes.add(value, path)
+                pending[path] = hint
+            else:
+                duplicates[path] = match[1]
+        return captions, pending, hashes, duplicates
+
+    def _local_path(self, url: str) -> str | None:
+        if url.startswith("http://") or url.startswith("https://") or url.startswith("data:"):
+            return None
+
+        local_path = url
+        if not os.path.isabs(local_path):
+            local_path = os.path.abspath(os.path.join(self.context.output_dir, local_path))
+        return local_path
+
+    def _collect_local_images(self, segments: list[DocumentChunkInfo]) -> dict[str, str]:
+        """Unique local image paths in document order, mapped to the first alt text seen."""
+        targets: dict[str, str] = {}
+        missing: set[str] = set()
         for seg in segments:
-            original = seg.text or ""
-            if "![" not in original:
+            text = seg.text or ""
+            if "![" not in text:
                 continue
+            for m in IMAGE_PATTERN.finditer(text):
+                local_path = self._local_path((m.group(2) or "").strip())
+                if local_path is None or local_path in targets or local_path in missing:
+                    continue
+                if not os.path.exists(local_path) or os.path.isdir(local_path):
+                    missing.add(local_path)
+                    continue
+                targets[local_path] = (m.group(1) or "").strip()
+        return targets
 
-            def repl(m: re.Match) -> str:
-                nonlocal changed, called
-                alt = (m.group(1) or "").strip()
-                url = (m.group(2) or "").strip()
+    def _caption_images(self, client: Any, targets: dict[str, str], settings: dict[str, Any]) -> dict[str, str]:
+        workers = max(1, int(settings.get("image_caption_workers", DEFAULT_CAPTION_WORKERS) or 1))
+        tokens_per_image = int(settings.get("aoai_tokens_per_image", DEFAULT_TOKENS_PER_IMAGE) or 0)
+        limiter = RateLimiter(
+            requests_per_min=float(settings.get("aoai_rpm", 0) or 0),
+            tokens_per_min=float(settings.get("aoai_tpm", 0) or 0),
+        )
 
-                if url.startswith("http://") or url.startswith("https://") or url.startswith("data:"):
-                    return m.group(0)
+        def describe(item: tuple[str, str]) -> str:
+            local_path, hint = item
+            with open(local_path, "rb") as f:
+                img_bytes = f.read()
+            text = call_with_backoff(
+                lambda: client.describe_image(img_bytes, hint=hint),
+                limiter,
+                tokens=tokens_per_image,
+            )
+            return (text or "").strip().replace("[", "\\[").replace("]", "\\]")
 
-                local_path = url
-                if not os.path.isabs(local_path):
-                    local_path = os.path.abspath(os.path.join(self.context.output_dir, local_path))
+        with ThreadPoolExecutor(max_workers=min(workers, len(targets))) as executor:
+            results = list(executor.map(metrics.bind(describe), targets.items()))
 
-                if not os.path.exists(local_path) or os.path.isdir(local_path):
-                    return m.group(0)
-
-                cache_key = local_path
-                if cache_key in processed:
-                    new_alt = processed[cache_key]
-                else:
-                    if limit > 0 and called >= limit:
-                        return m.group(0)
-                    with open(local_path, "rb") as f:
-                        img_bytes = f.read()
-                    new_alt = client.describe_image(img_bytes, hint=alt)
-                    new_alt = (new_alt or "").strip()
-                    if not new_alt:
-                        return m.group(0)
-                    new_alt = new_alt.replace("[", "\\[").replace("]", "\\]")
-                    processed[cache_key] = new_alt
-                    called += 1
-
-                if new_alt != alt:
-                    changed += 1
-                return f"![{new_alt}]({url})"
-
-            updated = IMAGE_PATTERN.sub(repl, original)
-            seg.text = updated
+        return {path: text for path, text in zip(targets, results) if text}
 
-        self.context.chunk_list = segments
-        if changed:
-            logger.info(f"image_caption_enriched: images_updated={changed} ai_calls={called}")
+    def _apply_captions(self, segments: list[DocumentChunkInfo], captions: dict[str, str]) -> int:
+        changed = 0
 
+        def repl(m: re.Match) -> str:
+            nonlocal changed
+            alt = (m.group(1) or "").strip()
+            url = (m.group(2) or "").strip()
+            local_path = self._local_path(url)
+            new_alt = captions.get(local_path) if local_path is not None else None
+            if new_alt is None:
+                return m.group(0)
+            if new_alt != alt:
+                changed += 1
+            return f"![{new_alt}]({url})"
+
+        for seg in segments:
+            if "![" in (seg.text or ""):
+                seg.text = IMAGE_PATTERN.sub(repl, seg.text)
+        return changed
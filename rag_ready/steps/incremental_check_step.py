@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from loguru import logger
+
+from ..incremental import STATUS_UNCHANGED, classify, config_fingerprint
+from ..utils.file_utils import calculate_file_md5
+from .pipeline_base import PipelineStep
+
+
+class IncrementalCheckStep(PipelineStep):
+    def execute(self) -> None:
+        if not self.context.config.incremental:
+            return
+
+        if not self.context.input_md5:
+            self.context.input_md5 = calculate_file_md5(self.context.input_path)
+        self.context.config_fingerprint = config_fingerprint(self.context.config, self.context.ai_settings)
+        self.context.change_status = classify(self.context)
+
+        if self.context.change_status == STATUS_UNCHANGED:
+            self.context.should_continue = False
+            logger.info(f"incremental_skip: {self.context.input_path}")
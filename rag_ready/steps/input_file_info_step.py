@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import os
 
+from rag_ready import metrics
 from rag_ready.models.model import FileMessage
 
 from .pipeline_base import PipelineStep
@@ -14,3 +15,4 @@ class InputFileInfoStep(PipelineStep):
             path=path,
         )
         self.context.file_mes = file_info
+        metrics.incr("bytes_read", os.path.getsize(path))
@@ -2,7 +2,12 @@ from __future__ import annotations
 
 from loguru import logger
 
+from .. import metrics
+from ..cache.parse_cache import ParseCache, open_parse_cache
+from ..models.document_model import DocumentInfo
+from ..parser.base_parser import DocumentStream
 from ..parser.parser_factory import ParserFactory
+from ..utils.file_utils import calculate_file_md5
 from .pipeline_base import PipelineStep
 
 
@@ -12,22 +17,59 @@ class ParserDocumentStep(PipelineStep):
         if file_info is None:
             raise ValueError("file_info_missing")
 
-        with open(self.context.input_path, "rb") as f:
-            file_bytes = f.read()
-
         config = self.context.config
         parser_name = config.parser or file_info.extension or "txt"
         extractor = config.extractor
         use_extractor = bool(extractor)
+        parser_kwargs = config.parser_kwargs or {}
+        output_dir = parser_kwargs.get("output_dir") or self.context.output_dir
+
+        parser = None
+        if config.streaming:
+            parser = ParserFactory.get_parser(parser_name, extractor=extractor, use_extractor=use_extractor)
+        if parser is not None and parser.streams_incrementally:
+            # Caching a block stream would load the whole file, so these parsers skip the parse cache.
+            if config.parse_cache_dir:
+                logger.info(f"parse_cache_skipped: parser={parser_name} reason=streaming")
+            self._set_stream(parser.open_stream(self.context.input_path, file_info=file_info, **parser_kwargs))
+            return
+
+        cache = open_parse_cache(config)
+        cache_key = None
+        if cache is not None:
+            if not self.context.input_md5:
+                self.context.input_md5 = calculate_file_md5(self.context.input_path)
+            cache_key = ParseCache.make_key(self.context.input_md5, parser_name, extractor, parser_kwargs)
+            doc_info = cache.get(cache_key, output_dir=output_dir)
+            if doc_info is not None:
+                metrics.incr("parse_cache_hits")
+                logger.info(f"parse_cache_hit: key={cache_key[:12]}")
+                self._set_document(doc_info)
+                return
 
-        parser = ParserFactory.get_parser(parser_name, extractor=extractor, use_extractor=use_extractor)
-        doc_info = parser.load(
-            file_bytes=file_bytes,
+            metrics.incr("parse_cache_misses")
+
+        if parser is None:
+            parser = ParserFactory.get_parser(parser_name, extractor=extractor, use_extractor=use_extractor)
+        doc_info = parser.load_path(
+            self.context.input_path,
             file_info=file_info,
-            **(config.parser_kwargs or {}),
+            **parser_kwargs,
         )
+        if cache is not None and cache_key is not None:
+            cache.put(cache_key, doc_info, output_dir=output_dir)
+        self._set_document(doc_info)
+
+    def _set_document(self, doc_info: DocumentInfo) -> None:
+        if self.context.config.streaming:
+            self._set_stream(DocumentStream.from_document(doc_info))
+            return
         self.context.doc_mes = doc_info
         self.context.is_md = bool(getattr(doc_info, "is_md", False))
 
         logger.info(f"document_parser: use_chainsaw={getattr(doc_info, 'use_chainsaw', True)}")
 
+    def _set_stream(self, stream: DocumentStream) -> None:
+        self.context.doc_stream = stream
+        self.context.is_md = stream.is_md
+        logger.info(f"document_stream: use_chainsaw={stream.use_chainsaw}")
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import contextlib
 from dataclasses import dataclass
 
 from loguru import logger
@@ -16,11 +17,16 @@ class PipelineStep:
 
     def run(self) -> None:
         self.context.current_step = self.__class__.__name__
-        try:
-            self.execute()
-        except Exception:
-            self.context.success = False
-            logger.exception("step_failed")
-        finally:
-            if self.context.current_step == self.__class__.__name__:
-                self.context.current_step = None
+        metrics = self.context.metrics
+        measure = metrics.step(self.__class__.__name__) if metrics is not None else contextlib.nullcontext({})
+        with measure as entry:
+            try:
+                self.execute()
+            except Exception as e:
+                entry["ok"] = False
+                self.context.success = False
+                self.context.error = f"{self.__class__.__name__}: {e}"
+                logger.exception("step_failed")
+            finally:
+                if self.context.current_step == self.__class__.__name__:
+                    self.context.current_step = None
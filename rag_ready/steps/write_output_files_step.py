@@ -1,31 +1,202 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import os
+import re
+from typing import Any, Callable, Iterable, TextIO
 
 from loguru import logger
 
+from .. import metrics
 from ..models.document_model import DocumentChunkInfo
+from ..utils.file_utils import calculate_file_md5
 from .pipeline_base import PipelineStep
 
 
+JSONL_NAME = "segments.jsonl"
+# Every file name WriteOutputFilesStep can produce, across all output formats.
+OUTPUT_NAME_PATTERN = re.compile(r"^segments(?:\.json|\.jsonl|\.md|-\d{5}\.jsonl)$")
+
+
+def _remove_stale_outputs(output_dir: str, kept: set[str]) -> None:
+    """Drop outputs of an earlier run whose format or part was not written this time."""
+    for name in os.listdir(output_dir):
+        if OUTPUT_NAME_PATTERN.match(name) and name not in kept:
+            os.remove(os.path.join(output_dir, name))
+            logger.debug(f"stale_output_removed: name={name}")
+
+
+def _replace_if_changed(tmp_path: str, path: str) -> tuple[str, bool]:
+    """Move `tmp_path` over `path` unless both already hold the same bytes."""
+    new_md5 = calculate_file_md5(tmp_path)
+    if os.path.exists(path) and calculate_file_md5(path) == new_md5:
+        os.remove(tmp_path)
+        return new_md5, False
+    os.replace(tmp_path, path)
+    return new_md5, True
+
+
+class _JsonArraySink:
+    """Writes the same bytes as json.dump(list, indent=2), one segment at a time."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.paths = [path]
+        self.f = open(f"{path}.tmp", "w", encoding="utf-8")
+        self.count = 0
+
+    def write(self, segment: DocumentChunkInfo) -> None:
+        item = json.dumps(segment.model_dump(), ensure_ascii=False, indent=2).replace("\n", "\n  ")
+        self.f.write(("[\n  " if self.count == 0 else ",\n  ") + item)
+        self.count += 1
+
+    def close(self) -> list[tuple[str, bool]]:
+        self.f.write("\n]" if self.count else "[]")
+        self.f.close()
+        return [_replace_if_changed(f"{self.path}.tmp", self.path)]
+
+    def abort(self) -> None:
+        self.f.close()
+        os.remove(f"{self.path}.tmp")
+
+
+class _JsonlSink:
+    """One compact JSON object per line, rolling over every `max_segments` segments."""
+
+    def __init__(self, output_dir: str, max_segments: int = 0) -> None:
+        self.output_dir = output_dir
+        self.max_segments = max_segments
+        self.part = 0
+        self.count = 0
+        self.written: list[tuple[str, bool]] = []
+        self.path = self._part_path()
+        self.paths = [self.path]
+        self.f = open(f"{self.path}.tmp", "w", encoding="utf-8")
+
+    def _part_path(self) -> str:
+        name = f"segments-{self.part:05d}.jsonl" if self.max_segments > 0 else JSONL_NAME
+        return os.path.join(self.output_dir, name)
+
+    def write(self, segment: DocumentChunkInfo) -> None:
+        if self.max_segments > 0 and self.count >= self.max_segments:
+            self.f.close()
+            self.written.append(_replace_if_changed(f"{self.path}.tmp", self.path))
+            self.part += 1
+            self.count = 0
+            self.path = self._part_path()
+            self.paths.append(self.path)
+            self.f = open(f"{self.path}.tmp", "w", encoding="utf-8")
+        self.f.write(json.dumps(segment.model_dump(), ensure_ascii=False))
+        self.f.write("\n")
+        self.count += 1
+
+    def close(self) -> list[tuple[str, bool]]:
+        self.f.close()
+        self.written.append(_replace_if_changed(f"{self.path}.tmp", self.path))
+        return self.written
+
+    def abort(self) -> None:
+        self.f.close()
+        os.remove(f"{self.path}.tmp")
+
+
+class _MarkdownStreamSink:
+    """segments.md for streaming mode: pages are written as contiguous runs in arrival order."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.paths = [path]
+        self.f = open(f"{path}.tmp", "w", encoding="utf-8")
+        self.page_num: int | None = None
+
+    def write(self, segment: DocumentChunkInfo) -> None:
+        try:
+            page_num = int(segment.metadata.get("page"))
+        except Exception:
+            page_num = self.page_num or 1
+        if page_num != self.page_num:
+            if self.page_num is not None:
+                self.f.write("<!-- PageBreak -->\n\n")
+            self.f.write(f'<!-- PageNumber="{page_num}" -->\n')
+            self.f.write(f"\n## Page {page_num}\n\n")
+            self.page_num = page_num
+        text = (segment.text or "").rstrip()
+        if text:
+            self.f.write(text)
+            self.f.write("\n\n")
+
+    def close(self) -> list[tuple[str, bool]]:
+        if self.page_num is not None:
+            self.f.write("<!-- PageBreak -->\n\n")
+        self.f.close()
+        return [_replace_if_changed(f"{self.path}.tmp", self.path)]
+
+    def abort(self) -> None:
+        self.f.close()
+        os.remove(f"{self.path}.tmp")
+
+
 class WriteOutputFilesStep(PipelineStep):
     def execute(self) -> None:
-        segments = self.context.chunk_list
-        if not isinstance(segments, list) or not segments:
-            raise ValueError("no_segments_to_write")
+        config = self.context.config
+        segments: Iterable[DocumentChunkInfo]
+        if config.streaming:
+            if self.context.chunk_stream is None:
+                raise ValueError("no_segments_to_write")
+            segments = self.context.chunk_stream
+        else:
+            segments = self.context.chunk_list
+            if not isinstance(segments, list) or not segments:
+                raise ValueError("no_segments_to_write")
 
         os.makedirs(self.context.output_dir, exist_ok=True)
+        md_path = os.path.join(self.context.output_dir, "segments.md")
 
-        json_path = os.path.join(self.context.output_dir, "segments.json")
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump([s.model_dump() for s in segments], f, ensure_ascii=False, indent=2)
+        sinks: list[Any] = []
+        try:
+            if config.output_format == "jsonl":
+                sinks.append(_JsonlSink(self.context.output_dir, config.jsonl_max_segments))
+            else:
+                sinks.append(_JsonArraySink(os.path.join(self.context.output_dir, "segments.json")))
+            if config.write_markdown and config.streaming:
+                sinks.append(_MarkdownStreamSink(md_path))
 
-        md_path = os.path.join(self.context.output_dir, "segments.md")
-        with open(md_path, "w", encoding="utf-8") as f:
-            self._write_segments_markdown(f, segments)
+            count = 0
+            for s in segments:
+                for sink in sinks:
+                    sink.write(s)
+                count += 1
+            if count == 0:
+                raise ValueError("no_segments_to_write")
+        except Exception:
+            for sink in sinks:
+                sink.abort()
+            raise
+        finally:
+            self.context.chunk_stream = None
+
+        written: list[tuple[str, bool]] = []
+        kept: set[str] = set()
+        for sink in sinks:
+            written.extend(sink.close())
+            kept.update(os.path.basename(path) for path in sink.paths)
+        if config.write_markdown and not config.streaming:
+            written.append(self._write_if_changed(md_path, lambda f: self._write_segments_markdown(f, segments)))
+            kept.add(os.path.basename(md_path))
+        _remove_stale_outputs(self.context.output_dir, kept)
+
+        metrics.incr("chunks_produced", count)
+        digest = ":".join(md5 for md5, _ in written)
+        self.context.output_md5 = hashlib.md5(digest.encode("ascii")).hexdigest()
+        logger.info(f"segments_written: {count} changed={any(changed for _, changed in written)}")
 
-        logger.info(f"segments_written: {len(segments)}")
+    def _write_if_changed(self, path: str, write: Callable[[TextIO], None]) -> tuple[str, bool]:
+        """Write via a temp file and only replace `path` when the content differs."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            write(f)
+        return _replace_if_changed(tmp_path, path)
 
     def _write_segments_markdown(self, f, segments: list[DocumentChunkInfo]) -> None:
         pages: dict[int, list[DocumentChunkInfo]] = {}
@@ -1,8 +1,18 @@
 from __future__ import annotations
 
+import codecs
 import hashlib
+import mmap
 import os
-from typing import Any
+from typing import Any, Iterator
+
+# Batch bookkeeping (manifest, summary, metrics, figure index) lives here, so no
+# document output folder under the same root can shadow it.
+BATCH_STATE_DIR = ".rag_ready"
+
+
+def batch_state_dir(output_root: str) -> str:
+    return os.path.join(output_root, BATCH_STATE_DIR)
 
 
 def get_file_extension(name: str) -> str:
@@ -21,30 +31,64 @@ def calculate_file_md5(path: str, chunk_size: int = 1024 * 1024) -> str:
 
 
 def dhash(image: Any, hash_size: int = 8) -> str:
-    resized = image.resize((hash_size + 1, hash_size)).convert("L")
-    pixels = list(resized.getdata())
-    rows = [pixels[i : i + hash_size + 1] for i in range(0, len(pixels), hash_size + 1)]
-    diff = []
-    for row in rows:
-        for col in range(hash_size):
-            diff.append(row[col] > row[col + 1])
-    decimal_value = 0
-    hex_string = []
-    for i, v in enumerate(diff):
-        if v:
-            decimal_value |= 1 << (i % 8)
-        if (i % 8) == 7:
-            hex_string.append(hex(decimal_value)[2:].rjust(2, "0"))
-            decimal_value = 0
-    return "".join(hex_string)
+    from .image_hash import dhash_int
+
+    return format(dhash_int(image, hash_size), f"0{hash_size * hash_size // 4}x")
 
 
 def hamming_distance(hash1: str, hash2: str) -> int:
+    """Bit distance between two hex dHash strings."""
     if len(hash1) != len(hash2):
-        return max(len(hash1), len(hash2))
-    distance = 0
-    for c1, c2 in zip(hash1, hash2):
-        if c1 != c2:
-            distance += 1
-    return distance
+        return max(len(hash1), len(hash2)) * 4
+    return (int(hash1, 16) ^ int(hash2, 16)).bit_count()
+
+
+def _map_file(f) -> mmap.mmap | None:
+    size = os.fstat(f.fileno()).st_size
+    if size == 0:
+        return None
+    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+        mm.madvise(mmap.MADV_SEQUENTIAL)
+    return mm
 
+
+def iter_text_blocks(
+    path: str,
+    block_size: int = 1024 * 1024,
+    encoding: str = "utf-8",
+    errors: str = "ignore",
+) -> Iterator[str]:
+    """Decode a file from a read-only mmap in `block_size` byte windows.
+
+    Multi-byte sequences cut at a window edge are carried over by the
+    incremental decoder, so only one window of bytes and text is live at a time.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors=errors)
+    with open(path, "rb") as f:
+        mm = _map_file(f)
+        if mm is None:
+            return
+        try:
+            for start in range(0, len(mm), block_size):
+                text = decoder.decode(mm[start : start + block_size])
+                if text:
+                    yield text
+        finally:
+            mm.close()
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+def read_text(path: str, encoding: str = "utf-8", errors: str = "ignore") -> str:
+    """Decode a whole file straight from an mmap, without an intermediate bytes copy."""
+    with open(path, "rb") as f:
+        mm = _map_file(f)
+        if mm is None:
+            return ""
+        try:
+            with memoryview(mm) as view:
+                return str(view, encoding, errors)
+        finally:
+            mm.close()
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from typing import Any, Generic, Iterator, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+def dhash_int(image: Any, hash_size: int = 8) -> int:
+    """Difference hash of a PIL image as an int of hash_size * hash_size bits.
+
+    Bits follow the legacy hex `dhash` layout (row-major, least significant bit
+    first within each byte), so `int(dhash(img), 16) == dhash_int(img)`.
+    """
+    try:
+        import numpy as np
+    except Exception as e:
+        raise Exception(f"numpy_deps_missing: {e}")
+
+    resized = image.resize((hash_size + 1, hash_size)).convert("L")
+    pixels = np.asarray(resized, dtype=np.int16)
+    bits = (pixels[:, :-1] > pixels[:, 1:]).ravel()
+    return int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class BKTree(Generic[V]):
+    """Burkhard-Keller tree over integer hashes under Hamming distance.
+
+    `find` only descends into children whose edge distance is within
+    `max_distance` of the query's distance to the node, so near-duplicate
+    lookups touch a small part of the tree instead of every stored hash.
+    """
+
+    def __init__(self) -> None:
+        # node: [hash, value, insertion_order, {edge_distance: child}]
+        self._root: Optional[list] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, value_hash: int, value: V) -> None:
+        node = [value_hash, value, self._size, {}]
+        self._size += 1
+        if self._root is None:
+            self._root = node
+            return
+        current = self._root
+        while True:
+            distance = hamming(value_hash, current[0])
+            child = current[3].get(distance)
+            if child is None:
+                current[3][distance] = node
+                return
+            current = child
+
+    def find(self, value_hash: int, max_distance: int) -> Optional[tuple[int, V]]:
+        """Nearest stored (distance, value) within `max_distance`, earliest added on ties."""
+        best: Optional[tuple[int, int, V]] = None
+        for distance, order, value in self._search(value_hash, max_distance):
+            if best is None or (distance, order) < best[:2]:
+                best = (distance, order, value)
+        return (best[0], best[2]) if best else None
+
+    def find_all(self, value_hash: int, max_distance: int) -> list[tuple[int, V]]:
+        """Every stored (distance, value) within `max_distance`, nearest and earliest first."""
+        found = sorted(self._search(value_hash, max_distance), key=lambda m: (m[0], m[1]))
+        return [(distance, value) for distance, _, value in found]
+
+    def _search(self, value_hash: int, max_distance: int) -> Iterator[tuple[int, int, V]]:
+        if self._root is None:
+            return
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming(value_hash, node[0])
+            if distance <= max_distance:
+                yield distance, node[2], node[1]
+            low, high = distance - max_distance, distance + max_distance
+            for edge, child in node[3].items():
+                if low <= edge <= high:
+                    stack.append(child)
+
+
+class SharedFigureIndex:
+    """BK-tree of saved figure images shared by every document of a batch.
+
+    Entries are appended to a JSONL file so worker processes see each other's
+    figures; each process replays only the lines added since its last refresh.
+    A lost race merely saves one extra copy of an image. Entries whose file
+    has been deleted are skipped by `find` and dropped by `compact`.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = os.path.abspath(path)
+        self.tree: BKTree[str] = BKTree()
+        self._paths: set[str] = set()
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def refresh(self) -> None:
+        with self._lock:
+            try:
+                with open(self.path, "rb") as f:
+                    f.seek(self._offset)
+                    data = f.read()
+            except FileNotFoundError:
+                return
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].splitlines():
+                try:
+                    entry = json.loads(line)
+                    value_hash, path = int(entry["hash"], 16), str(entry["path"])
+                except Exception:
+                    continue
+                if path not in self._paths:
+                    self._paths.add(path)
+                    self.tree.add(value_hash, path)
+            self._offset += end
+
+    def find(self, value_hash: int, max_distance: int) -> Optional[str]:
+        for _, path in self.tree.find_all(value_hash, max_distance):
+            if os.path.exists(path):
+                return path
+        return None
+
+    def compact(self) -> int:
+        """Rewrite the index file without duplicate or deleted entries; returns how many were dropped.
+
+        Only safe while no other process appends, e.g. before a batch starts.
+        """
+        with self._lock:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    lines = f.read().splitlines()
+            except FileNotFoundError:
+                return 0
+            kept: list[str] = []
+            seen: set[str] = set()
+            for line in lines:
+                try:
+                    path = str(json.loads(line)["path"])
+                except Exception:
+                    continue
+                if path not in seen and os.path.exists(path):
+                    seen.add(path)
+                    kept.append(line)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write("".join(f"{line}\n" for line in kept))
+            os.replace(tmp_path, self.path)
+            self.tree, self._paths, self._offset = BKTree(), set(), 0
+        self.refresh()
+        return len(lines) - len(kept)
+
+    def add(self, value_hash: int, path: str) -> None:
+        path = os.path.abspath(path)
+        with self._lock:
+            self._paths.add(path)
+            self.tree.add(value_hash, path)
+        line = json.dumps({"hash": f"{value_hash:x}", "path": path}, ensure_ascii=False) + "\n"
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        # One short O_APPEND write per entry keeps lines from concurrent processes intact.
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode("utf-8"))
+        finally:
+            os.close(fd)
+
+
+_SHARED_INDEXES: dict[str, SharedFigureIndex] = {}
+_SHARED_INDEXES_LOCK = threading.Lock()
+
+
+def shared_figure_index(path: str) -> SharedFigureIndex:
+    """Process-wide SharedFigureIndex for `path`, refreshed from disk."""
+    key = os.path.abspath(path)
+    with _SHARED_INDEXES_LOCK:
+        index = _SHARED_INDEXES.get(key)
+        if index is None:
+            index = _SHARED_INDEXES[key] = SharedFigureIndex(key)
+    index.refresh()
+    return index
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import importlib
+import sys
+from typing import Any, Callable
+
+
+def load_object(spec: str, package: str | None = None) -> Any:
+    """Import `module:attr`; a leading dot in `module` resolves against `package`."""
+    module_name, _, attr = spec.partition(":")
+    module = importlib.import_module(module_name, package)
+    return getattr(module, attr) if attr else module
+
+
+def lazy_exports(package: str, exports: dict[str, str]) -> Callable[[str], Any]:
+    """Module `__getattr__` (PEP 562) importing each exported name on first access."""
+
+    def __getattr__(name: str) -> Any:
+        spec = exports.get(name)
+        if spec is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = load_object(spec, package)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    return __getattr__
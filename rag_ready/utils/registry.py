@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Generic, TypeVar
+
+from loguru import logger
+
+from .lazy import load_object
+
+T = TypeVar("T")
+
+MAX_CACHED_INSTANCES = 32
+
+
+def _entry_points(group: str) -> list[Any]:
+    from importlib.metadata import entry_points
+
+    found = entry_points()
+    if hasattr(found, "select"):
+        return list(found.select(group=group))
+    return list(found.get(group, []))  # Python < 3.10
+
+
+class Registry(Generic[T]):
+    """Name -> "module:Class" specs, extendable by installed packages.
+
+    Built-in specs are overridden by entry points in `group` (discovered on
+    first lookup, imported only when used) and those by `register`. Classes
+    are resolved once; with `reusable = True` (the default) an instance is
+    cached per class and constructor arguments, shared across documents and threads.
+    """
+
+    def __init__(self, group: str, builtins: dict[str, str], package: str | None = None) -> None:
+        self.group = group
+        self.package = package
+        self._specs: dict[str, Any] = dict(builtins)
+        self._registered: dict[str, Any] = {}
+        self._classes: dict[str, type] = {}
+        self._instances: OrderedDict[tuple, T] = OrderedDict()
+        self._discovered = False
+        self._lock = threading.RLock()
+
+    def register(self, name: str, target: str | type) -> None:
+        """Add or replace `name` with a "module:Class" spec or a class."""
+        with self._lock:
+            self._registered[name] = target
+            self._forget(name)
+
+    def spec(self, name: str) -> Any:
+        self._discover()
+        return self._registered.get(name, self._specs.get(name))
+
+    def names(self) -> list[str]:
+        self._discover()
+        return sorted(set(self._specs) | set(self._registered))
+
+    def __contains__(self, name: str) -> bool:
+        return self.spec(name) is not None
+
+    def resolve(self, name: str) -> type:
+        cls = self._classes.get(name)
+        if cls is not None:
+            return cls
+        target = self.spec(name)
+        if target is None:
+            raise KeyError(f"{self.group}_not_found: {name}")
+        cls = load_object(target, self.package) if isinstance(target, str) else target
+        with self._lock:
+            self._classes[name] = cls
+        return cls
+
+    def instance(self, name: str, *args: Any, **kwargs: Any) -> T:
+        cls = self.resolve(name)
+        if not getattr(cls, "reusable", True):
+            return cls(*args, **kwargs)
+        # Keyed by class, so names sharing one implementation share the instance.
+        key = (cls, args, tuple(sorted(kwargs.items())))
+        with self._lock:
+            obj = self._instances.get(key)
+            if obj is not None:
+                self._instances.move_to_end(key)
+                return obj
+        obj = cls(*args, **kwargs)
+        with self._lock:
+            obj = self._instances.setdefault(key, obj)
+            while len(self._instances) > MAX_CACHED_INSTANCES:
+                self._instances.popitem(last=False)
+        return obj
+
+    def _forget(self, name: str) -> None:
+        self._classes.pop(name, None)
+
+    def _discover(self) -> None:
+        if self._discovered:
+            return
+        with self._lock:
+            if self._discovered:
+                return
+            try:
+                eps = _entry_points(self.group)
+            except Exception as e:
+                logger.warning(f"entry_points_failed: group={self.group} error={e}")
+                eps = []
+            for ep in eps:
+                spec = f"{ep.module}:{ep.attr}" if getattr(ep, "attr", None) else ep.value
+                logger.info(f"plugin_registered: group={self.group} name={ep.name} spec={spec}")
+                self._specs[ep.name] = spec
+                self._forget(ep.name)
+            self._discovered = True
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from typing import Iterable
+
+Replacement = tuple[int, int, str]
+
+
+def apply_replacements(text: str, replacements: Iterable[Replacement]) -> str:
+    """Rebuild `text` once with every (start, end, new_text) substitution applied.
+
+    Offsets refer to the original text. Replacements must not overlap.
+    """
+    parts: list[str] = []
+    pos = 0
+    for start, end, new_text in sorted(replacements, key=lambda r: (r[0], r[1])):
+        if start < pos:
+            raise ValueError(f"overlapping_replacement: {start} < {pos}")
+        parts.append(text[pos:start])
+        parts.append(new_text)
+        pos = end
+    if not parts:
+        return text
+    parts.append(text[pos:])
+    return "".join(parts)
+
+
+def split_overlapping(
+    fixed: list[Replacement],
+    candidates: list[Replacement],
+) -> tuple[list[Replacement], list[Replacement]]:
+    """Split `candidates` into those that fit between the `fixed` replacements and those that overlap them.
+
+    Candidates are also checked against each other; the earlier one wins.
+    """
+    fixed = sorted(fixed, key=lambda r: r[0])
+    starts = [r[0] for r in fixed]
+    accepted: list[Replacement] = []
+    rejected: list[Replacement] = []
+    last_end = -1
+    for cand in sorted(candidates, key=lambda r: (r[0], r[1])):
+        start, end, _ = cand
+        i = bisect_right(starts, start) - 1
+        hits_prev = i >= 0 and fixed[i][1] > start
+        hits_next = i + 1 < len(fixed) and fixed[i + 1][0] < end
+        if hits_prev or hits_next or start < last_end:
+            rejected.append(cand)
+            continue
+        accepted.append(cand)
+        last_end = end
+    return accepted, rejected
+
+
+def rebase_overlapping(
+    text: str,
+    fixed: list[Replacement],
+    overlapping: list[Replacement],
+) -> tuple[list[Replacement], list[Replacement]]:
+    """Apply `overlapping` candidates inside the `fixed` replacement that contains them.
+
+    A candidate whose original text (`text[start:end]`) is carried over into
+    the containing replacement's new text is substituted there, first
+    occurrence. Returns (fixed, leftover); leftover candidates could not be placed.
+    """
+    fixed = sorted(fixed, key=lambda r: r[0])
+    starts = [r[0] for r in fixed]
+    leftover: list[Replacement] = []
+    for start, end, new_text in sorted(overlapping, key=lambda r: (r[0], r[1])):
+        i = bisect_right(starts, start) - 1
+        old = text[start:end]
+        if i < 0 or fixed[i][1] < end or not old or old not in fixed[i][2]:
+            leftover.append((start, end, new_text))
+            continue
+        f_start, f_end, f_text = fixed[i]
+        fixed[i] = (f_start, f_end, f_text.replace(old, new_text, 1))
+    return fixed, leftover
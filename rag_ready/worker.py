@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import dataclasses
+import hmac
+import json
+import os
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, TextIO
+
+from loguru import logger
+
+from .batch import BatchJob, run_job
+from .context import PipelineConfig
+from .pipeline import RagPreprocessPipeline
+from .utils.lazy import load_object
+
+DEFAULT_WORKER_JOBS = 4
+DEFAULT_WORKER_HOST = "127.0.0.1"
+DEFAULT_WORKER_PORT = 8765
+MAX_REQUEST_BYTES = 1024 * 1024
+
+# PipelineConfig fields a job may override; everything else is fixed by the worker's flags.
+JOB_OPTIONS = {
+    "chunk_size",
+    "overlap",
+    "parser",
+    "extractor",
+    "chainsaw",
+    "chunk_unit",
+    "tokenizer_path",
+    "output_format",
+    "jsonl_max_segments",
+    "write_markdown",
+    "streaming",
+    "metrics_formats",
+}
+
+
+class PipelineWorker:
+    """Resident job runner that keeps imports, parsers and AI clients warm between documents.
+
+    Jobs run on a thread pool of `max_jobs`; each gets its own PipelineContext
+    and metrics recorder, while the vision client is created once and shared.
+    With `input_root`, job inputs are resolved against it and may not leave it.
+    """
+
+    def __init__(
+        self,
+        config: PipelineConfig,
+        ai_settings: dict[str, Any] | None = None,
+        output_root: str | None = None,
+        max_jobs: int = DEFAULT_WORKER_JOBS,
+        input_root: str | None = None,
+    ) -> None:
+        self.config = config
+        self.ai_settings = dict(ai_settings) if ai_settings else None
+        self.output_root = os.path.abspath(output_root) if output_root else None
+        self.input_root = os.path.abspath(input_root) if input_root else None
+        self.max_jobs = max(1, int(max_jobs))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_jobs, thread_name_prefix="rag-ready-job")
+        self._ai_client: Any = None
+        self._ai_lock = threading.Lock()
+        self._active = 0
+        self._done = 0
+        self._stats_lock = threading.Lock()
+
+    def warm_up(self) -> None:
+        """Import the steps, parsers and chainsaws the configured pipeline will use."""
+        from .chainsaw.chainsaw_factory import CHAINSAWS
+        from .parser.parser_factory import FILE_TYPE_PAESER, PARSERS, ParserFactory
+
+        for spec in RagPreprocessPipeline.STEPS:
+            name = spec.rpartition(":")[2]
+            if name == "EnrichImageCaptionsStep" and not (self.ai_settings or {}).get("enable_image_caption"):
+                continue
+            load_object(spec, "rag_ready")
+        for name in FILE_TYPE_PAESER:
+            PARSERS.resolve(name)
+        for name in ("default", self.config.chainsaw or self.config.extractor or "default"):
+            CHAINSAWS.resolve(name if name in CHAINSAWS else "default")
+        if self.config.extractor:
+            try:
+                ParserFactory.get_parser("pdf", extractor=self.config.extractor, use_extractor=True)
+            except Exception as e:
+                logger.warning(f"worker_warm_up_failed: extractor={self.config.extractor} error={e}")
+        if (self.ai_settings or {}).get("enable_image_caption"):
+            self._vision_client()
+        logger.info(f"worker_ready: max_jobs={self.max_jobs}")
+
+    def submit(self, request: dict[str, Any]) -> Future:
+        return self._executor.submit(self.run, request)
+
+    def run(self, request: dict[str, Any]) -> dict[str, Any]:
+        """Run one job request and return its response; never raises."""
+        job_id = request.get("id")
+        with self._stats_lock:
+            self._active += 1
+        try:
+            job, config = self._job_from_request(request)
+            client = self._vision_client() if (self.ai_settings or {}).get("enable_image_caption") else None
+            result = run_job(job, config, self.ai_settings, ai_client=client, record_metrics=True)
+            response = {"id": job_id, **dataclasses.asdict(result)}
+        except Exception as e:
+            response = {"id": job_id, "ok": False, "error": f"{type(e).__name__}: {e}"}
+        finally:
+            with self._stats_lock:
+                self._active -= 1
+                self._done += 1
+        return response
+
+    def stats(self) -> dict[str, Any]:
+        with self._stats_lock:
+            return {"ok": True, "max_jobs": self.max_jobs, "active": self._active, "done": self._done}
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def _vision_client(self) -> Any:
+        with self._ai_lock:
+            if self._ai_client is None:
+                from .ai.azure_openai_vision_client import AzureOpenAIVisionClient
+
+                self._ai_client = AzureOpenAIVisionClient.from_settings(self.ai_settings or {})
+            return self._ai_client
+
+    def _job_from_request(self, request: dict[str, Any]) -> tuple[BatchJob, PipelineConfig]:
+        input_path = request.get("input_path")
+        if not input_path:
+            raise ValueError("input_path_missing")
+        if self.input_root is None:
+            input_path = os.path.abspath(str(input_path))
+        else:
+            input_path = _confine(self.input_root, str(input_path), "input_path_outside_root")
+        if not os.path.exists(input_path):
+            raise ValueError(f"file_not_found: {input_path}")
+
+        output_dir = request.get("output_dir")
+        if not output_dir:
+            if self.output_root is None:
+                raise ValueError("output_dir_missing")
+            output_dir = str(request.get("id") or os.path.basename(input_path))
+        if self.output_root is None:
+            output_dir = os.path.abspath(str(output_dir))
+        else:
+            output_dir = _confine(self.output_root, str(output_dir), "output_dir_outside_root")
+
+        options = dict(request.get("options") or {})
+        unknown = sorted(set(options) - JOB_OPTIONS)
+        if unknown:
+            raise ValueError(f"unknown_job_option: {', '.join(unknown)}")
+        config = dataclasses.replace(self.config, **options) if options else self.config
+        return BatchJob(input_path=input_path, output_dir=output_dir), config
+
+
+def _confine(root: str, path: str, error: str) -> str:
+    """Resolve `path` against `root` (symlinks included); relative paths land under it, nothing may escape it."""
+    root = os.path.realpath(root)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if not resolved.startswith(root + os.sep):
+        raise ValueError(f"{error}: {resolved}")
+    return resolved
+
+
+def serve_stdin(worker: PipelineWorker, stdin: TextIO | None = None, stdout: TextIO | None = None) -> int:
+    """JSON-lines protocol: one job request per input line, one response per output line.
+
+    Responses are written as jobs finish, so they may come back out of order;
+    match them by `id`. Returns after EOF once every job has been answered.
+    """
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    write_lock = threading.Lock()
+
+    def reply(response: dict[str, Any]) -> None:
+        line = json.dumps(response, ensure_ascii=False, default=str)
+        with write_lock:
+            stdout.write(line + "\n")
+            stdout.flush()
+
+    # Stop reading ahead once max_jobs jobs are running and as many again are queued.
+    # Slots are released once a response is written, so no finished job is kept around.
+    max_pending = worker.max_jobs * 2
+    slots = threading.BoundedSemaphore(max_pending)
+
+    def done(future: Future) -> None:
+        try:
+            reply(future.result())
+        finally:
+            slots.release()
+
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("job_must_be_object")
+        except Exception as e:
+            reply({"id": None, "ok": False, "error": f"bad_request: {e}"})
+            continue
+        slots.acquire()
+        future = worker.submit(request)
+        future.add_done_callback(done)
+
+    # Every slot back means every job has been answered.
+    for _ in range(max_pending):
+        slots.acquire()
+    return 0
+
+
+def serve_http(
+    worker: PipelineWorker,
+    host: str = DEFAULT_WORKER_HOST,
+    port: int = DEFAULT_WORKER_PORT,
+    token: str | None = None,
+) -> int:
+    """Local HTTP API: POST /jobs runs a job and answers with its result; GET /health reports load."""
+    server = make_http_server(worker, host, port, token)
+    logger.info(f"worker_http_listening: {host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def make_http_server(worker: PipelineWorker, host: str, port: int, token: str | None = None) -> ThreadingHTTPServer:
+    """Job requests must be `application/json`, which a browser cannot send cross-origin
+    without a preflight this server never grants; with `token`, they must also carry
+    `Authorization: Bearer <token>`."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, payload: dict[str, Any]) -> None:
+            body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            if self.path.rstrip("/") == "/health":
+                self._send(200, worker.stats())
+            else:
+                self._send(404, {"ok": False, "error": "not_found"})
+
+        def do_POST(self) -> None:
+            if self.path.rstrip("/") != "/jobs":
+                self._send(404, {"ok": False, "error": "not_found"})
+                return
+            if token and not hmac.compare_digest(self.headers.get("Authorization") or "", f"Bearer {token}"):
+                self._send(401, {"ok": False, "error": "unauthorized"})
+                return
+            content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+            if content_type != "application/json":
+                self._send(415, {"ok": False, "error": "unsupported_media_type: application/json required"})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            if length <= 0 or length > MAX_REQUEST_BYTES:
+                self._send(400, {"ok": False, "error": "bad_request: body_size"})
+                return
+            try:
+                request = json.loads(self.rfile.read(length))
+                if not isinstance(request, dict):
+                    raise ValueError("job_must_be_object")
+            except Exception as e:
+                self._send(400, {"ok": False, "error": f"bad_request: {e}"})
+                return
+            # The handler thread waits; concurrency is bounded by the worker's job pool.
+            response = worker.submit(request).result()
+            self._send(200 if response.get("ok") else 422, response)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            logger.debug(f"worker_http: {format % args}")
+
+    return ThreadingHTTPServer((host, port), Handler)
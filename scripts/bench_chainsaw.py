@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+scripts_dir = os.path.dirname(os.path.abspath(__file__))
+if scripts_dir not in sys.path:
+    sys.path.insert(0, scripts_dir)
+
+from bench_fixtures import make_text
+from rag_ready.chainsaw import LangChainRecursiveCharacterText, RecursiveCharacterText
+from rag_ready.models.document_model import DocumentInfo
+
+
+def bench(chainsaw_cls, text: str, chunk_size: int, overlap: int) -> tuple[float, int]:
+    started = time.perf_counter()
+    chunks = chainsaw_cls(chunk_size, overlap).split_text(DocumentInfo(content=text))
+    return time.perf_counter() - started, len(chunks)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="对比内置递归切片与 LangChain 切片的吞吐")
+    parser.add_argument("--size-mb", type=float, nargs="+", default=[10.0])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--overlap", type=int, default=100)
+    parser.add_argument("--skip-langchain", action="store_true")
+    args = parser.parse_args()
+
+    candidates = [("native", RecursiveCharacterText)]
+    if not args.skip_langchain:
+        candidates.append(("langchain", LangChainRecursiveCharacterText))
+
+    for size_mb in args.size_mb:
+        text = make_text(size_mb)
+        for name, cls in candidates:
+            elapsed, count = bench(cls, text, args.chunk_size, args.overlap)
+            print(f"{name:<10} size_mb={size_mb:<8g} chunks={count:<8} elapsed_s={elapsed:.2f} mb_per_s={size_mb / elapsed:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import json
+import os
+import random
+from types import SimpleNamespace
+from typing import Any, Callable
+
+CORPUS_KINDS = ("txt", "md", "json", "html")
+
+
+def _vocabulary(rng: random.Random, size: int = 2000) -> list[str]:
+    return ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 12))) for _ in range(size)]
+
+
+def _sentence(rng: random.Random, words: list[str], low: int = 5, high: int = 20) -> str:
+    return " ".join(rng.choice(words) for _ in range(rng.randint(low, high)))
+
+
+def _repeat_to(block: str, target: int) -> str:
+    return (block * (target // max(1, len(block)) + 1))[:target]
+
+
+def make_text(size_mb: float, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    words = _vocabulary(rng)
+    paragraphs = []
+    for _ in range(200):
+        lines = [_sentence(rng, words) for _ in range(rng.randint(1, 8))]
+        paragraphs.append("\n".join(lines))
+    return _repeat_to("\n\n".join(paragraphs) + "\n\n", int(size_mb * 1024 * 1024))
+
+
+def make_markdown(size_mb: float, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    words = _vocabulary(rng)
+    sections = []
+    for i in range(100):
+        parts = [f"{'#' * rng.randint(1, 3)} {_sentence(rng, words, 2, 6)}"]
+        for _ in range(rng.randint(1, 4)):
+            parts.append(_sentence(rng, words, 20, 80))
+        if i % 3 == 0:
+            parts.append("\n".join(f"- {_sentence(rng, words, 3, 10)}" for _ in range(rng.randint(2, 6))))
+        if i % 4 == 0:
+            rows = ["| name | value | note |", "| --- | --- | --- |"]
+            rows += [f"| {rng.choice(words)} | {rng.randint(0, 9999)} | {_sentence(rng, words, 1, 4)} |" for _ in range(10)]
+            parts.append("\n".join(rows))
+        sections.append("\n\n".join(parts))
+    # Whole sections only, so headings and tables are never cut mid-line.
+    block = "\n\n".join(sections) + "\n\n"
+    target = int(size_mb * 1024 * 1024)
+    return block * max(1, round(target / len(block)))
+
+
+def make_json(size_mb: float, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    words = _vocabulary(rng)
+    target = int(size_mb * 1024 * 1024)
+    records = []
+    size = 2
+    while size < target:
+        record = {
+            "id": len(records),
+            "title": _sentence(rng, words, 2, 6),
+            "body": _sentence(rng, words, 30, 120),
+            "tags": [rng.choice(words) for _ in range(rng.randint(1, 5))],
+            "score": rng.random(),
+        }
+        size += len(json.dumps(record, ensure_ascii=False)) + 2
+        records.append(record)
+    return json.dumps(records, ensure_ascii=False)
+
+
+def make_html(size_mb: float, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    words = _vocabulary(rng)
+    sections = []
+    for i in range(100):
+        parts = [f"<h2>{_sentence(rng, words, 2, 6)}</h2>"]
+        parts += [f"<p>{_sentence(rng, words, 20, 80)}</p>" for _ in range(rng.randint(1, 4))]
+        if i % 3 == 0:
+            items = "".join(f"<li>{_sentence(rng, words, 3, 10)}</li>" for _ in range(rng.randint(2, 6)))
+            parts.append(f"<ul>{items}</ul>")
+        if i % 4 == 0:
+            rows = "".join(f"<tr><td>{rng.choice(words)}</td><td>{rng.randint(0, 9999)}</td></tr>" for _ in range(10))
+            parts.append(f"<table><tr><th>name</th><th>value</th></tr>{rows}</table>")
+        sections.append("<section>" + "\n".join(parts) + "</section>")
+    block = "\n".join(sections) + "\n"
+    target = int(size_mb * 1024 * 1024)
+    body = block * max(1, round(target / len(block)))
+    return f"<!DOCTYPE html>\n<html><head><title>bench</title></head><body>\n{body}</body></html>\n"
+
+
+CORPUS_GENERATORS: dict[str, Callable[[float, int], str]] = {
+    "txt": make_text,
+    "md": make_markdown,
+    "json": make_json,
+    "html": make_html,
+}
+
+
+def write_corpus(directory: str, kinds: list[str], size_mb: float, seed: int = 0) -> list[str]:
+    """Write one synthetic document per kind (`bench.<kind>`, about `size_mb` each) and return the paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for kind in kinds:
+        path = os.path.join(directory, f"bench.{kind}")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(CORPUS_GENERATORS[kind](size_mb, seed))
+        paths.append(path)
+    return paths
+
+
+def _span(offset: int, length: int) -> Any:
+    return SimpleNamespace(offset=offset, length=length)
+
+
+def make_analyze_result(pages: int, tables_per_page: int = 1, paragraphs_per_page: int = 20, seed: int = 0) -> Any:
+    """Synthetic layout AnalyzeResult with tables continuing across page breaks.
+
+    Only the attributes read by merge_table/di_tools are populated. Every
+    page's last table continues on the next page with the same header, so
+    merge candidates scale with the page count.
+    """
+    rng = random.Random(seed)
+    parts: list[str] = []
+    offset = 0
+    paragraphs: list[Any] = []
+    tables: list[Any] = []
+    result_pages: list[Any] = []
+
+    def add(text: str) -> int:
+        nonlocal offset
+        start = offset
+        parts.append(text)
+        offset += len(text)
+        return start
+
+    for page_no in range(1, pages + 1):
+        result_pages.append(SimpleNamespace(page_number=page_no, width=8.5, height=11.0))
+        start = add('<!-- PageHeader="Report" -->\n\n')
+        paragraphs.append(SimpleNamespace(role="pageHeader", spans=[_span(start, 26)], content="Report"))
+        for i in range(paragraphs_per_page):
+            text = " ".join(rng.choice(["revenue", "cost", "net", "total", "q1", "q2"]) for _ in range(12))
+            start = add(text + "\n\n")
+            role = "sectionHeading" if i == 0 and page_no % 10 == 0 else None
+            paragraphs.append(SimpleNamespace(role=role, spans=[_span(start, len(text))], content=text))
+
+        for t in range(tables_per_page):
+            rows = [["item", "value"]] + [[f"r{page_no}_{t}_{r}", str(rng.randint(0, 999))] for r in range(8)]
+            md = "\n".join("| " + " | ".join(r) + " |" for r in rows[:1]) + "\n| --- | --- |\n"
+            md += "\n".join("| " + " | ".join(r) + " |" for r in rows[1:]) + "\n"
+            start = add(md)
+            add("\n")
+            cells = [
+                SimpleNamespace(kind="columnHeader" if r == 0 else "content", row_index=r, column_index=c, content=v)
+                for r, row in enumerate(rows)
+                for c, v in enumerate(row)
+            ]
+            y = 1.0 if t == 0 else 6.0
+            tables.append(
+                SimpleNamespace(
+                    row_count=len(rows),
+                    column_count=2,
+                    cells=cells,
+                    spans=[_span(start, len(md))],
+                    bounding_regions=[
+                        SimpleNamespace(page_number=page_no, polygon=[1.0, y + 2, 7.0, y + 2, 7.0, y + 4, 1.0, y + 4])
+                    ],
+                )
+            )
+
+        start = add(f'<!-- PageFooter="{page_no}" -->\n')
+        paragraphs.append(SimpleNamespace(role="pageFooter", spans=[_span(start, 20)], content=str(page_no)))
+        if page_no < pages:
+            add("<!-- PageBreak -->\n")
+
+    return SimpleNamespace(
+        content="".join(parts),
+        pages=result_pages,
+        paragraphs=paragraphs,
+        tables=tables,
+        figures=[],
+    )
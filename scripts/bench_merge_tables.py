@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+scripts_dir = os.path.dirname(os.path.abspath(__file__))
+if scripts_dir not in sys.path:
+    sys.path.insert(0, scripts_dir)
+
+from bench_fixtures import make_analyze_result
+from rag_ready.parser.azure_di import merge_table
+
+
+def _legacy_check_paragraph_presence(paragraphs, start, end):
+    for paragraph in paragraphs:
+        for span in paragraph.spans:
+            if span.offset > start and span.offset < end:
+                if paragraph.role is not None and paragraph.role not in ["pageHeader", "pageFooter", "pageNumber"]:
+                    return True
+    return False
+
+
+def _legacy_presence_scan(result) -> float:
+    candidates, _ = merge_table._get_merge_table_candidates_and_table_integral_span(result.tables)
+    started = time.perf_counter()
+    for c in candidates:
+        _legacy_check_paragraph_presence(result.paragraphs, c["start"], c["end"])
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="合并表格的性能基准（合成 AnalyzeResult）")
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--tables-per-page", type=int, default=2)
+    parser.add_argument("--paragraphs-per-page", type=int, default=40)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    for pages in args.pages:
+        result = make_analyze_result(pages, args.tables_per_page, args.paragraphs_per_page)
+        started = time.perf_counter()
+        replacements = merge_table.merge_table_replacements(result)
+        merge_table.merge_tables(result)
+        elapsed = time.perf_counter() - started
+        line = (
+            f"pages={pages:<6} tables={len(result.tables):<6} paragraphs={len(result.paragraphs):<7} "
+            f"merged_runs={len(replacements):<5} merge_s={elapsed:.3f}"
+        )
+        if not args.skip_legacy:
+            line += f" legacy_presence_scan_s={_legacy_presence_scan(result):.3f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+scripts_dir = os.path.dirname(os.path.abspath(__file__))
+if scripts_dir not in sys.path:
+    sys.path.insert(0, scripts_dir)
+
+from loguru import logger
+
+from bench_fixtures import CORPUS_KINDS, make_analyze_result, write_corpus
+from rag_ready.context import PipelineConfig, PipelineContext
+from rag_ready.metrics import MetricsRecorder
+from rag_ready.parser.azure_di import merge_table
+from rag_ready.parser.azure_di.di_tools import AzureDocumentIntelligenceTools
+from rag_ready.pipeline import RagPreprocessPipeline
+
+BENCH_VERSION = 1
+PIPELINE_STAGES = ("ParserDocumentStep", "CuttingDocumentStep", "WriteOutputFilesStep")
+# Stages shorter than this are too noisy to flag as regressions.
+MIN_COMPARABLE_S = 0.005
+
+
+def _run_pipeline(input_path: str, output_dir: str, config: PipelineConfig, trace_memory: bool) -> dict[str, Any]:
+    context = PipelineContext(input_path=input_path, output_dir=output_dir, config=config)
+    context.metrics = MetricsRecorder(trace_memory=trace_memory)
+    if not RagPreprocessPipeline(context).run():
+        raise RuntimeError(f"pipeline_failed: {context.error}")
+    return {s["name"]: s for s in context.metrics.steps}
+
+
+def bench_document(path: str, output_dir: str, config: PipelineConfig, repeat: int) -> dict[str, dict[str, Any]]:
+    """Best-of-`repeat` wall time per stage, then one tracemalloc pass for peak memory."""
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    best: dict[str, float] = {}
+    for _ in range(repeat):
+        for name, step in _run_pipeline(path, output_dir, config, trace_memory=False).items():
+            best[name] = min(best.get(name, float("inf")), step["wall_s"])
+    traced = _run_pipeline(path, output_dir, config, trace_memory=True)
+    tracemalloc.stop()
+
+    stages = {}
+    for name in PIPELINE_STAGES:
+        stages[name] = {
+            "wall_s": best[name],
+            "mb_per_s": size_mb / best[name] if best[name] > 0 else 0.0,
+            "tracemalloc_peak_bytes": traced[name].get("tracemalloc_peak_bytes", 0),
+            "peak_rss_bytes": traced[name].get("peak_rss_bytes", 0),
+        }
+    return stages
+
+
+def _measure(fn: Callable[[], Any], repeat: int, size_mb: float) -> dict[str, Any]:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"wall_s": best, "mb_per_s": size_mb / best if best > 0 else 0.0, "tracemalloc_peak_bytes": peak}
+
+
+def bench_layout(pages: int, repeat: int) -> dict[str, dict[str, Any]]:
+    result = make_analyze_result(pages, tables_per_page=2, paragraphs_per_page=40)
+    size_mb = len(result.content.encode("utf-8")) / (1024 * 1024)
+    tools = AzureDocumentIntelligenceTools()
+    return {
+        "merge_tables": _measure(lambda: merge_table.merge_tables(result), repeat, size_mb),
+        "layout_build_document": _measure(
+            lambda: tools._build_document(result, False, None, 1, lambda figure: None), repeat, size_mb
+        ),
+    }
+
+
+def run_suite(args: argparse.Namespace) -> dict[str, Any]:
+    cases: dict[str, dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory() as td:
+        paths = write_corpus(os.path.join(td, "corpus"), args.kinds, args.size_mb, seed=args.seed)
+        for path in paths:
+            kind = os.path.splitext(path)[1].lstrip(".")
+            config = PipelineConfig(
+                chunk_size=args.chunk_size,
+                overlap=args.overlap,
+                streaming=args.streaming,
+                parser_kwargs={"output_dir": os.path.join(td, "out", kind)},
+            )
+            case = f"{kind}_{args.size_mb:g}mb" + ("_streaming" if args.streaming else "")
+            cases[case] = bench_document(path, os.path.join(td, "out", kind), config, args.repeat)
+            print(_format_case(case, cases[case]))
+
+    for pages in args.layout_pages:
+        case = f"layout_{pages}p"
+        cases[case] = bench_layout(pages, args.repeat)
+        print(_format_case(case, cases[case]))
+
+    return {
+        "version": BENCH_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "kinds": args.kinds,
+            "size_mb": args.size_mb,
+            "layout_pages": args.layout_pages,
+            "chunk_size": args.chunk_size,
+            "overlap": args.overlap,
+            "streaming": args.streaming,
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "cases": cases,
+    }
+
+
+def _format_case(case: str, stages: dict[str, dict[str, Any]]) -> str:
+    parts = [
+        f"{name}={s['wall_s']:.3f}s/{s['mb_per_s']:.1f}MBps/{s['tracemalloc_peak_bytes'] / (1024 * 1024):.1f}MiB"
+        for name, s in stages.items()
+    ]
+    return f"{case:<24} " + " ".join(parts)
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], threshold: float) -> list[str]:
+    """Stages whose wall time grew by more than `threshold` (0.1 = 10%) over the baseline."""
+    regressions = []
+    for case, stages in current["cases"].items():
+        for name, s in stages.items():
+            base = (baseline.get("cases", {}).get(case) or {}).get(name)
+            if not base:
+                continue
+            before, after = float(base["wall_s"]), float(s["wall_s"])
+            ratio = after / before if before > 0 else 1.0
+            mark = ""
+            if max(before, after) >= MIN_COMPARABLE_S and ratio > 1.0 + threshold:
+                mark = "  REGRESSION"
+                regressions.append(f"{case}/{name}")
+            print(f"{case:<24} {name:<24} {before:.3f}s -> {after:.3f}s  x{ratio:.2f}{mark}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="流水线各阶段性能基准（合成语料 + 合成 AnalyzeResult），支持与基线对比")
+    parser.add_argument("--kinds", nargs="+", choices=list(CORPUS_KINDS), default=list(CORPUS_KINDS))
+    parser.add_argument("--size-mb", type=float, default=5.0, help="每种语料的大小（MB）")
+    parser.add_argument("--layout-pages", type=int, nargs="*", default=[200], help="合成 AnalyzeResult 的页数，可多个")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--overlap", type=int, default=100)
+    parser.add_argument("--streaming", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="每个阶段取最快的一次")
+    parser.add_argument("--output", default=None, help="结果写入 JSON 文件，可作为之后的基线")
+    parser.add_argument("--baseline", default=None, help="与之前保存的结果对比")
+    parser.add_argument("--threshold", type=float, default=0.15, help="耗时超过基线该比例视为回归")
+    args = parser.parse_args()
+
+    # Per-step INFO logs would dominate the output and the timings.
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    results = run_suite(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("params") != results["params"]:
+        print("警告：基线参数与本次不同，对比结果仅供参考")
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"性能回归: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
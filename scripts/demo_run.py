@@ -3,13 +3,12 @@ from __future__ import annotations
 import os
 import sys
 import tempfile
-import time
 
 root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if root_dir not in sys.path:
     sys.path.insert(0, root_dir)
 
-from rag_ready.context import PipelineContext
+from rag_ready.context import PipelineConfig, PipelineContext
 from rag_ready.pipeline import RagPreprocessPipeline
 
 
@@ -18,13 +17,17 @@ def run() -> None:
         input_path = os.path.join(td, "demo.txt")
         output_dir = os.path.join(td, "out")
         with open(input_path, "w", encoding="utf-8") as f:
-            f.write("hello\\n" * 2000)
-
-        file_id = int(time.time_ns() // 1_000_000)
-        ctx = PipelineContext(input_path=input_path, output_dir=output_dir)
-        ok = RagPreprocessPipeline(context=ctx, chunk_size=200, overlap=20, parser_kwargs={"output_dir": output_dir}).run()
+            f.write("hello\n" * 2000)
+
+        ctx = PipelineContext(
+            input_path=input_path,
+            output_dir=output_dir,
+            config=PipelineConfig(chunk_size=200, overlap=20, parser_kwargs={"output_dir": output_dir}),
+        )
+        ok = RagPreprocessPipeline(ctx).run()
         assert ok is True
         assert os.path.exists(os.path.join(output_dir, "segments.json"))
+        print("ok")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from rag_ready.batch import build_jobs, run_batch_async_di
+from rag_ready.cache.parse_cache import ParseCache
+from rag_ready.context import PipelineConfig
+from rag_ready.models.document_model import DocumentInfo
+from rag_ready.parser.azure_di import async_analyzer
+from rag_ready.parser.azure_di.async_analyzer import AsyncLayoutAnalyzer
+from rag_ready.parser.azure_di.di_tools import AzureDIConfig
+from rag_ready.utils.file_utils import calculate_file_md5
+
+
+class _FakeResponse:
+    def __init__(self, status_code: int = 200, body: dict | None = None, content: bytes = b"", headers: dict | None = None):
+        self.status_code = status_code
+        self._body = body or {}
+        self.content = content
+        self.headers = headers or {}
+
+    def json(self) -> dict:
+        return self._body
+
+
+class _FakeClient:
+    """Each operation reports `running` twice before succeeding; one 429 is injected."""
+
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.polls: dict[str, int] = {}
+        self.throttled = False
+        self.pages: dict[str, str] = {}
+        self.figure_urls: list[str] = []
+
+    async def send_request(self, request):
+        url = request.url
+        if request.method == "POST":
+            assert url.startswith("https://di/documentintelligence/documentModels/prebuilt-layout:analyze?")
+            assert json.loads(request.content)["base64Source"]
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            op = f"https://di/documentModels/prebuilt-layout/analyzeResults/op{len(self.polls)}?api-version=x"
+            self.polls[op] = 0
+            if "&pages=" in url:
+                self.pages[op] = url.split("&pages=")[1]
+            return _FakeResponse(status_code=202, headers={"Operation-Location": op})
+        if "/figures/" in url:
+            self.figure_urls.append(url)
+            return _FakeResponse(content=b"png-bytes")
+        if not self.throttled:
+            self.throttled = True
+            return _FakeResponse(status_code=429, headers={"Retry-After": "0.01"})
+        self.polls[url] += 1
+        if self.polls[url] < 3:
+            return _FakeResponse(body={"status": "running"})
+        self.in_flight -= 1
+        result = {"content": f"doc {url}", "figures": [{"id": "1.1", "spans": [{"offset": 0, "length": 3}]}]}
+        if url in self.pages:
+            first = int(self.pages[url].split("-")[0])
+            result["pages"] = [{"pageNumber": first}]
+            result["figures"][0]["id"] = f"{first}.1"
+        return _FakeResponse(body={"status": "succeeded", "analyzeResult": result})
+
+
+def test_analyzer_bounds_in_flight_and_saves_results() -> None:
+    poll_initial_s = async_analyzer.POLL_INITIAL_S
+    async_analyzer.POLL_INITIAL_S = 0.01
+    try:
+        _run_analyzer()
+    finally:
+        async_analyzer.POLL_INITIAL_S = poll_initial_s
+
+
+def _run_analyzer() -> None:
+    client = _FakeClient()
+    done: list[str] = []
+    with tempfile.TemporaryDirectory() as td:
+        items = []
+        for i in range(6):
+            path = os.path.join(td, f"d{i}.pdf")
+            with open(path, "wb") as f:
+                f.write(f"pdf {i}".encode())
+            items.append((path, path, os.path.join(td, f"out{i}", "di_result")))
+
+        analyzer = AsyncLayoutAnalyzer(AzureDIConfig(endpoint="https://di", key="k"), max_in_flight=2, tps=0, client=client)
+        asyncio.run(analyzer.analyze_many(items, lambda doc: done.append(doc.key) if not doc.error else None))
+
+        assert sorted(done) == sorted(p for p, _, _ in items)
+        assert client.max_in_flight <= 2
+        save_dir = items[0][2]
+        with open(os.path.join(save_dir, "analyze_result.json"), encoding="utf-8") as f:
+            assert json.load(f)["content"].startswith("doc ")
+        with open(os.path.join(save_dir, "figures", "1.1.png"), "rb") as f:
+            assert f.read() == b"png-bytes"
+
+
+def test_analyzer_shards_long_pdfs() -> None:
+    poll_initial_s = async_analyzer.POLL_INITIAL_S
+    async_analyzer.POLL_INITIAL_S = 0.01
+    try:
+        _run_sharded_analyzer()
+    finally:
+        async_analyzer.POLL_INITIAL_S = poll_initial_s
+
+
+def _run_sharded_analyzer() -> None:
+    client = _FakeClient()
+    done: list[str] = []
+    with tempfile.TemporaryDirectory() as td:
+        path = os.path.join(td, "long.pdf")
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.4\n" + b"1 0 obj << /Type /Page >> endobj\n" * 5)
+        save_dir = os.path.join(td, "out", "di_result")
+
+        analyzer = AsyncLayoutAnalyzer(
+            AzureDIConfig(endpoint="https://di", key="k"), max_in_flight=2, tps=0, client=client, shard_pages=2
+        )
+        asyncio.run(analyzer.analyze_many([(path, path, save_dir)], lambda doc: done.append(doc.error or "")))
+
+        assert done == [""]
+        assert sorted(client.pages.values()) == ["1-2", "3-4", "5-5"]
+        assert client.max_in_flight <= 2
+        with open(os.path.join(save_dir, "analyze_result.json"), encoding="utf-8") as f:
+            saved = json.load(f)
+        assert saved["content"].count("<!-- PageBreak -->") == 2
+        assert sorted(fig["id"] for fig in saved["figures"]) == ["1.1", "3.1", "5.1"]
+        # Each stitched figure is downloaded from the shard operation that produced it.
+        shard_of = {pages.split("-")[0]: op.split("/")[-1].split("?")[0] for op, pages in client.pages.items()}
+        assert sorted(u.split("analyzeResults/")[1].split("?")[0] for u in client.figure_urls) == sorted(
+            f"{shard_of[p]}/figures/{p}.1" for p in ("1", "3", "5")
+        )
+        assert sorted(os.listdir(os.path.join(save_dir, "figures"))) == ["1.1.png", "3.1.png", "5.1.png"]
+
+
+def test_parse_cache_hits_skip_analysis() -> None:
+    submitted: list[str] = []
+
+    async def analyze_many(self, items, on_done) -> None:
+        submitted.extend(key for key, _, _ in items)
+
+    with tempfile.TemporaryDirectory() as td:
+        in_dir = os.path.join(td, "in")
+        os.makedirs(in_dir)
+        path = os.path.join(in_dir, "a.pdf")
+        with open(path, "wb") as f:
+            f.write(b"pdf a")
+        parser_kwargs = {"azure_di_endpoint": "https://di", "azure_di_key": "k"}
+        config = PipelineConfig(extractor="layout", parse_cache_dir=os.path.join(td, "cache"), parser_kwargs=parser_kwargs)
+        # Written by an earlier live layout run; a layout-replay run stores under the same key.
+        key = ParseCache.make_key(calculate_file_md5(path), "pdf", "layout", parser_kwargs)
+        assert key == ParseCache.make_key(calculate_file_md5(path), "pdf", "layout-replay", parser_kwargs)
+        ParseCache(config.parse_cache_dir).put(key, DocumentInfo(content="cached layout text"))
+
+        original = AsyncLayoutAnalyzer.analyze_many
+        AsyncLayoutAnalyzer.analyze_many = analyze_many
+        try:
+            out_dir = os.path.join(td, "out")
+            _, summary = run_batch_async_di(build_jobs([path], out_dir, base_dir=in_dir), config, output_root=out_dir)
+        finally:
+            AsyncLayoutAnalyzer.analyze_many = original
+
+        assert submitted == []
+        assert summary.succeeded == 1
+        with open(os.path.join(out_dir, "a.pdf", "segments.json"), encoding="utf-8") as f:
+            assert json.load(f)[0]["text"] == "cached layout text"
+
+
+if __name__ == "__main__":
+    test_analyzer_bounds_in_flight_and_saves_results()
+    test_analyzer_shards_long_pdfs()
+    test_parse_cache_hits_skip_analysis()
+    print("ok")
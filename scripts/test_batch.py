@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from rag_ready.batch import build_jobs, collect_input_files, run_batch
+from rag_ready.context import PipelineConfig
+
+
+def _write(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_collect_and_build_jobs() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        in_dir = os.path.join(td, "in")
+        _write(os.path.join(in_dir, "a.txt"), "a")
+        _write(os.path.join(in_dir, "sub", "b.md"), "b")
+        _write(os.path.join(in_dir, ".hidden"), "x")
+        manifest = os.path.join(td, "list.txt")
+        _write(manifest, "# comment\nin/a.txt\n\nin/sub/b.md\n")
+
+        files = collect_input_files(input_dir=in_dir)
+        assert files == [os.path.join(in_dir, "a.txt"), os.path.join(in_dir, "sub", "b.md")]
+        assert collect_input_files(manifest=manifest) == files
+        assert collect_input_files(pattern=os.path.join(in_dir, "**", "*.md")) == files[1:]
+
+        jobs = build_jobs(files, os.path.join(td, "out"), base_dir=in_dir)
+        assert [j.output_dir for j in jobs] == [
+            os.path.join(td, "out", "a.txt"),
+            os.path.join(td, "out", "sub", "b.md"),
+        ]
+
+
+def test_run_batch_reports_failures() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        good = os.path.join(td, "in", "good.txt")
+        _write(good, "hello world\n" * 100)
+        missing = os.path.join(td, "in", "missing.txt")
+
+        jobs = build_jobs([good, missing], os.path.join(td, "out"))
+        results, summary = run_batch(jobs, config=PipelineConfig(chunk_size=200), workers=1)
+
+        assert [r.ok for r in results] == [True, False]
+        assert os.path.exists(os.path.join(td, "out", "good.txt", "segments.json"))
+        assert summary.total == 2 and summary.succeeded == 1 and summary.failed == 1
+        assert summary.failures[0]["input_path"] == missing
+
+
+if __name__ == "__main__":
+    test_collect_and_build_jobs()
+    test_run_batch_reports_failures()
+    print("ok")
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+scripts_dir = os.path.dirname(os.path.abspath(__file__))
+if scripts_dir not in sys.path:
+    sys.path.insert(0, scripts_dir)
+
+from bench_fixtures import CORPUS_KINDS, write_corpus
+from bench_pipeline import PIPELINE_STAGES, bench_document, compare
+from rag_ready.context import PipelineConfig
+
+
+def test_corpus_kinds_run_through_pipeline() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        paths = write_corpus(os.path.join(td, "corpus"), list(CORPUS_KINDS), 0.05, seed=1)
+        again = write_corpus(os.path.join(td, "again"), list(CORPUS_KINDS), 0.05, seed=1)
+        for path, other in zip(paths, again):
+            with open(path, "rb") as f1, open(other, "rb") as f2:
+                assert f1.read() == f2.read()
+        with open(paths[CORPUS_KINDS.index("json")], "r", encoding="utf-8") as f:
+            assert isinstance(json.load(f), list)
+
+        out_dir = os.path.join(td, "out")
+        config = PipelineConfig(chunk_size=500, parser_kwargs={"output_dir": out_dir})
+        stages = bench_document(paths[0], out_dir, config, repeat=1)
+        assert set(stages) == set(PIPELINE_STAGES)
+        assert all(s["wall_s"] > 0 and s["tracemalloc_peak_bytes"] > 0 for s in stages.values())
+
+
+def test_compare_flags_only_meaningful_slowdowns() -> None:
+    baseline = {"cases": {"txt": {"cut": {"wall_s": 0.1}, "tiny": {"wall_s": 0.0001}}}}
+    current = {"cases": {"txt": {"cut": {"wall_s": 0.2}, "tiny": {"wall_s": 0.001}}, "new": {"cut": {"wall_s": 1.0}}}}
+    assert compare(current, baseline, threshold=0.15) == ["txt/cut"]
+    assert compare(current, baseline, threshold=1.5) == []
+
+
+if __name__ == "__main__":
+    test_corpus_kinds_run_through_pipeline()
+    test_compare_flags_only_meaningful_slowdowns()
+    print("ok")
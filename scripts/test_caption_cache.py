@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from PIL import Image
+
+from rag_ready.cache.caption_cache import CaptionCache
+from rag_ready.context import PipelineConfig, PipelineContext
+from rag_ready.models.document_model import DocumentChunkInfo
+from rag_ready.steps.enrich_image_captions_step import STREAM_CAPTION_WINDOW, EnrichImageCaptionsStep
+
+
+class CountingVisionClient:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def describe_image(self, image_bytes: bytes, hint: str = "") -> str:
+        self.calls += 1
+        return f"描述{self.calls}"
+
+
+def _gradient(path: str, shift: int = 0) -> None:
+    img = Image.new("L", (64, 64))
+    img.putdata([(x * 4 + shift) % 256 for y in range(64) for x in range(64)])
+    img.save(path)
+
+
+def test_lookup_tolerates_small_distance() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        cache = CaptionCache(os.path.join(td, "captions.db"), max_distance=2)
+        cache.store("ff00", "gpt-4o", "1", "logo")
+        assert cache.lookup("ff01", "gpt-4o", "1") == "logo"
+        assert cache.lookup("0f00", "gpt-4o", "1") is None
+        assert cache.lookup("ff00", "gpt-4o", "2") is None
+        assert (cache.hits, cache.misses) == (1, 2)
+        cache.close()
+
+
+def test_prune_keeps_most_recent() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        cache = CaptionCache(os.path.join(td, "captions.db"), max_entries=1)
+        cache.store("0000", "m", "1", "old")
+        cache.store("ffff", "m", "1", "new")
+        cache._conn.execute("UPDATE captions SET last_used = 0 WHERE image_hash = '0000'")
+        cache.prune()
+        assert cache.lookup("ffff", "m", "1") == "new"
+        assert cache.lookup("0000", "m", "1") is None
+        cache.close()
+
+
+def test_step_reuses_captions_across_documents() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        client = CountingVisionClient()
+        settings = {
+            "enable_image_caption": True,
+            "aoai_deployment": "gpt-4o",
+            "caption_cache_path": os.path.join(td, "captions.db"),
+        }
+        for doc in ["a", "b"]:
+            out_dir = os.path.join(td, doc)
+            os.makedirs(os.path.join(out_dir, "images"))
+            _gradient(os.path.join(out_dir, "images", "1.png"))
+            _gradient(os.path.join(out_dir, "images", "2.png"), shift=1)
+
+            ctx = PipelineContext(input_path="x", output_dir=out_dir)
+            ctx.is_md = True
+            ctx.ai_settings = settings
+            ctx.ai_client = client
+            ctx.chunk_list = [DocumentChunkInfo(text="![](images/1.png) ![](images/2.png)")]
+            EnrichImageCaptionsStep(ctx).run()
+            assert ctx.success
+            assert ctx.chunk_list[0].text == "![描述1](images/1.png) ![描述1](images/2.png)"
+
+        assert client.calls == 1
+
+
+def test_streaming_opens_cache_once() -> None:
+    opened: list[CaptionCache] = []
+    original_init = CaptionCache.__init__
+
+    def counting_init(self: CaptionCache, *args, **kwargs) -> None:
+        original_init(self, *args, **kwargs)
+        opened.append(self)
+
+    with tempfile.TemporaryDirectory() as td:
+        out_dir = os.path.join(td, "out")
+        os.makedirs(os.path.join(out_dir, "images"))
+        _gradient(os.path.join(out_dir, "images", "1.png"))
+
+        client = CountingVisionClient()
+        ctx = PipelineContext(input_path="x", output_dir=out_dir, config=PipelineConfig(streaming=True))
+        ctx.is_md = True
+        ctx.ai_settings = {"enable_image_caption": True, "caption_cache_path": os.path.join(td, "captions.db")}
+        ctx.ai_client = client
+        n = STREAM_CAPTION_WINDOW * 3 + 1
+        ctx.chunk_stream = iter([DocumentChunkInfo(text=f"{i} ![](images/1.png)") for i in range(n)])
+
+        CaptionCache.__init__ = counting_init
+        try:
+            EnrichImageCaptionsStep(ctx).run()
+            chunks = list(ctx.chunk_stream)
+        finally:
+            CaptionCache.__init__ = original_init
+
+        assert [c.text for c in chunks] == [f"{i} ![描述1](images/1.png)" for i in range(n)]
+        assert client.calls == 1
+        assert len(opened) == 1 and opened[0].hits == 3
+
+
+if __name__ == "__main__":
+    test_lookup_tolerates_small_distance()
+    test_prune_keeps_most_recent()
+    test_step_reuses_captions_across_documents()
+    test_streaming_opens_cache_once()
+    print("ok")
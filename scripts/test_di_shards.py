@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import os
+import sys
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from azure.ai.documentintelligence.models import AnalyzeResult
+
+from rag_ready.parser.azure_di.merge_table import merge_tables
+from rag_ready.parser.azure_di.shards import count_pdf_pages, page_ranges, stitch_results
+
+
+def _table(content: str, md: str, page: int, y: float) -> dict:
+    offset = content.index(md)
+    cells = [
+        {"kind": "columnHeader", "rowIndex": 0, "columnIndex": 0, "content": "item"},
+        {"kind": "columnHeader", "rowIndex": 0, "columnIndex": 1, "content": "value"},
+    ]
+    return {
+        "rowCount": 2,
+        "columnCount": 2,
+        "cells": cells,
+        "spans": [{"offset": offset, "length": len(md)}],
+        "boundingRegions": [{"pageNumber": page, "polygon": [1, y, 7, y, 7, y + 2, 1, y + 2]}],
+    }
+
+
+def _shard(first_page: int, relative_pages: bool, text: str, table_md: str, table_page: int, y: float) -> dict:
+    content = f"{text}\n\n{table_md}"
+    base = 1 if relative_pages else first_page
+    tp = table_page - first_page + base
+    fig_offset = content.index(text)
+    return {
+        "apiVersion": "2024-11-30",
+        "modelId": "prebuilt-layout",
+        "content": content,
+        "pages": [{"pageNumber": base, "width": 8.5, "height": 11}, {"pageNumber": base + 1, "width": 8.5, "height": 11}],
+        "paragraphs": [{"content": text, "spans": [{"offset": fig_offset, "length": len(text)}]}],
+        "tables": [_table(content, table_md, tp, y)],
+        "figures": [{"id": f"{base}.1", "spans": [{"offset": fig_offset, "length": 4}], "elements": ["/paragraphs/0"]}],
+    }
+
+
+def test_page_ranges() -> None:
+    assert page_ranges(10, 0) == []
+    assert page_ranges(10, 20) == []
+    assert page_ranges(10, 4) == [(1, 4), (5, 8), (9, 10)]
+    assert count_pdf_pages(b"%PDF-1.4 /Type /Pages /Type /Page /Type/Page") == 2
+    assert count_pdf_pages(b"not a pdf") == 0
+
+
+def test_stitch_remaps_offsets_pages_and_figures() -> None:
+    md1 = "| item | value |\n| --- | --- |\n| a | 1 |\n"
+    md2 = "| item | value |\n| --- | --- |\n| b | 2 |\n"
+    shards = [
+        (1, "rid-1", _shard(1, False, "first shard text", md1, 2, 8.0)),
+        (3, "rid-2", _shard(3, True, "second shard text", md2, 3, 3.0)),
+    ]
+    stitched, sources = stitch_results(shards)
+    content = stitched["content"]
+
+    assert [p["pageNumber"] for p in stitched["pages"]] == [1, 2, 3, 4]
+    for para in stitched["paragraphs"]:
+        span = para["spans"][0]
+        assert content[span["offset"] : span["offset"] + span["length"]] == para["content"]
+    assert [f["id"] for f in stitched["figures"]] == ["1.1", "3.1"]
+    assert stitched["figures"][1]["elements"] == ["/paragraphs/1"]
+    assert sources["3.1"] == ("rid-2", "1.1")
+
+    merged = merge_tables(AnalyzeResult(stitched))
+    # the table continuing in the second shard is merged into the first one
+    assert merged.count("| --- | --- |") == 1
+    assert merged.index("| b | 2 |") < merged.index("<!-- PageBreak -->")
+
+
+if __name__ == "__main__":
+    test_page_ranges()
+    test_stitch_remaps_offsets_pages_and_figures()
+    print("ok")
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+from types import SimpleNamespace
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from PIL import Image
+
+from rag_ready.parser.azure_di.di_tools import AzureDocumentIntelligenceTools
+from rag_ready.utils.file_utils import dhash, hamming_distance
+from rag_ready.utils.image_hash import BKTree, SharedFigureIndex, dhash_int
+
+
+def _legacy_dhash(image, hash_size: int = 8) -> str:
+    resized = image.resize((hash_size + 1, hash_size)).convert("L")
+    pixels = [resized.getpixel((x, y)) for y in range(hash_size) for x in range(hash_size + 1)]
+    out = []
+    value = 0
+    for i in range(hash_size * hash_size):
+        row, col = divmod(i, hash_size)
+        if pixels[row * (hash_size + 1) + col] > pixels[row * (hash_size + 1) + col + 1]:
+            value |= 1 << (i % 8)
+        if i % 8 == 7:
+            out.append(f"{value:02x}")
+            value = 0
+    return "".join(out)
+
+
+def _noise_image(seed: int, size: tuple[int, int] = (64, 48)) -> Image.Image:
+    rng = random.Random(seed)
+    img = Image.new("L", size)
+    img.putdata([rng.randrange(256) for _ in range(size[0] * size[1])])
+    return img
+
+
+def _png(img: Image.Image) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_dhash_matches_legacy_bits():
+    for seed in range(10):
+        img = _noise_image(seed)
+        assert dhash(img) == _legacy_dhash(img)
+        assert dhash(img, 16) == _legacy_dhash(img, 16)
+        assert dhash_int(img) == int(dhash(img), 16)
+    assert hamming_distance("0f", "f0") == 8
+    assert hamming_distance("0001", "0003") == 1
+
+
+def test_bk_tree_matches_linear_scan():
+    rng = random.Random(7)
+    hashes = [rng.getrandbits(64) for _ in range(500)]
+    # Near copies so some queries have several candidates within range.
+    hashes += [h ^ (1 << rng.randrange(64)) for h in hashes[:100]]
+    tree: BKTree[int] = BKTree()
+    for i, h in enumerate(hashes):
+        tree.add(h, i)
+    assert len(tree) == len(hashes)
+
+    for q in hashes[:50] + [rng.getrandbits(64) for _ in range(50)]:
+        for max_distance in (0, 3, 10):
+            expected = None
+            for i, h in enumerate(hashes):
+                d = (h ^ q).bit_count()
+                if d <= max_distance and (expected is None or d < expected[0]):
+                    expected = (d, i)
+            assert tree.find(q, max_distance) == expected
+
+
+def test_figures_deduplicated_per_document_and_batch():
+    tools = AzureDocumentIntelligenceTools()
+    logo = _png(_noise_image(1))
+    other = _png(_noise_image(2))
+    images = {"1.1": logo, "1.2": other, "2.1": logo}
+    result = SimpleNamespace(content="", figures=[SimpleNamespace(id=k, spans=[], caption=None) for k in images])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = SharedFigureIndex(os.path.join(tmp, "figure_index.jsonl"))
+        doc_a = os.path.join(tmp, "a")
+        _, appended = tools._extract_images(result, doc_a, lambda f: images[f.id], figure_index=index)
+        assert sorted(os.listdir(os.path.join(doc_a, "images"))) == ["1.1.png", "1.2.png"]
+        assert appended[2][1].endswith("(images/1.1.png)")
+
+        # A second process replaying the index file links document a's images into its own folder.
+        doc_b = os.path.join(tmp, "b")
+        reloaded = SharedFigureIndex(index.path)
+        reloaded.refresh()
+        _, appended = tools._extract_images(result, doc_b, lambda f: images[f.id], figure_index=reloaded)
+        assert sorted(os.listdir(os.path.join(doc_b, "images"))) == ["1.1.png", "1.2.png"]
+        assert [tag for _, tag in appended if "../" in tag] == []
+        assert appended[0][1].endswith("(images/1.1.png)")
+        b_logo = os.path.join(doc_b, "images", "1.1.png")
+        assert os.path.samefile(b_logo, os.path.join(doc_a, "images", "1.1.png"))
+
+        # Deleting document a leaves b intact; the index skips and then compacts a's entries.
+        shutil.rmtree(doc_a)
+        with open(b_logo, "rb") as f:
+            assert f.read() == logo
+        assert reloaded.find(dhash_int(_noise_image(1)), 5) == os.path.abspath(b_logo)
+        assert index.compact() == 2
+        with open(index.path, encoding="utf-8") as f:
+            assert all("/b/images/" in line for line in f)
+
+
+def test_out_of_order_fetches_keep_figure_order():
+    tools = AzureDocumentIntelligenceTools()
+    logo = _png(_noise_image(1))
+    images = {"1.1": logo, "1.2": _png(_noise_image(2)), "1.3": None, "2.1": logo, "2.2": _png(_noise_image(3))}
+    result = SimpleNamespace(content="", figures=[SimpleNamespace(id=k, spans=[], caption=None) for k in images])
+    ids = list(images)
+    finished = {k: threading.Event() for k in ids}
+    completed: list[str] = []
+
+    def fetch(figure):
+        # Each fetch waits for the next figure's, so they complete in reverse figure order.
+        i = ids.index(figure.id)
+        if i + 1 < len(ids):
+            assert finished[ids[i + 1]].wait(timeout=10)
+        completed.append(figure.id)
+        finished[figure.id].set()
+        return images[figure.id]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _, appended = tools._extract_images(result, tmp, fetch, fetch_workers=len(images))
+
+        assert completed == list(reversed(ids))
+        assert [page for page, _ in appended] == [1, 1, 2, 2]
+        # 2.1 finished before 1.1 but is still the duplicate: the first figure keeps the image.
+        assert [tag.rsplit("(", 1)[1] for _, tag in appended] == [
+            "images/1.1.png)",
+            "images/1.2.png)",
+            "images/1.1.png)",
+            "images/2.2.png)",
+        ]
+        assert sorted(os.listdir(os.path.join(tmp, "images"))) == ["1.1.png", "1.2.png", "2.2.png"]
+
+
+if __name__ == "__main__":
+    test_dhash_matches_legacy_bits()
+    test_bk_tree_matches_linear_scan()
+    test_figures_deduplicated_per_document_and_batch()
+    test_out_of_order_fetches_keep_figure_order()
+    print("ok")
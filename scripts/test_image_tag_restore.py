@@ -1,13 +1,21 @@
 from __future__ import annotations
 
+import io
 import os
 import sys
+import tempfile
+from types import SimpleNamespace
 
 root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if root_dir not in sys.path:
     sys.path.insert(0, root_dir)
+scripts_dir = os.path.dirname(os.path.abspath(__file__))
+if scripts_dir not in sys.path:
+    sys.path.insert(0, scripts_dir)
 
+from bench_fixtures import make_analyze_result
 from rag_ready.parser.azure_di.di_tools import AzureDocumentIntelligenceTools
+from rag_ready.utils.text_utils import apply_replacements, split_overlapping
 
 
 def test_replace_by_span_content() -> None:
@@ -28,7 +36,59 @@ def test_append_when_not_found() -> None:
     assert "![x](images/1.png)" in pages[0]["content"]
 
 
+def test_figure_spans_applied_in_one_pass() -> None:
+    content = "p1 <figure>A</figure> x\n<!-- PageBreak -->\n| t |\n<!-- PageBreak -->\n| t2 | <figure>B</figure>"
+    fig_a = content.index("<figure>A")
+    fig_b = content.index("<figure>B")
+    table = (content.index("| t |"), len(content), "| t |\n| t2 |\n<!-- PageBreak -->")
+    figures = [
+        (fig_a, fig_a + len("<figure>A</figure>"), "![a](images/1.1.png)"),
+        (fig_b, fig_b + len("<figure>B</figure>"), "![b](images/3.1.png)"),
+    ]
+
+    accepted, overlapping = split_overlapping([table], figures)
+    assert [r[2] for r in accepted] == ["![a](images/1.1.png)"]
+    assert [r[2] for r in overlapping] == ["![b](images/3.1.png)"]
+
+    out = apply_replacements(content, [table] + accepted)
+    assert out.startswith("p1 ![a](images/1.1.png) x\n")
+    assert out.count("<!-- PageBreak -->") == 2
+
+
+def _png() -> bytes:
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.new("RGB", (16, 16), (200, 30, 30)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_figure_between_merged_tables_tagged_in_place() -> None:
+    result = make_analyze_result(2, tables_per_page=1, paragraphs_per_page=0)
+    # Put a figure in the remark between the two tables, shifting every later span.
+    figure_md = "<figure>Chart</figure>\n"
+    at = result.content.index('<!-- PageFooter="1" -->')
+    result.content = result.content[:at] + figure_md + result.content[at:]
+    for item in list(result.tables) + list(result.paragraphs):
+        for span in item.spans:
+            if span.offset >= at:
+                span.offset += len(figure_md)
+    span = SimpleNamespace(offset=at, length=len(figure_md) - 1)
+    result.figures = [SimpleNamespace(id="1.1", spans=[span], caption=None)]
+
+    with tempfile.TemporaryDirectory() as td:
+        doc = AzureDocumentIntelligenceTools()._build_document(result, True, td, 2, lambda figure: _png())
+
+    assert doc.content.count("| --- | --- |") == 1
+    assert "<figure>" not in doc.content
+    assert doc.content.count("![Chart](images/1.1.png)") == 1
+    assert "![Chart](images/1.1.png)" in doc.page_list[0].content
+    assert "images/1.1.png" not in doc.page_list[-1].content
+
+
 if __name__ == "__main__":
     test_replace_by_span_content()
     test_append_when_not_found()
+    test_figure_spans_applied_in_one_pass()
+    test_figure_between_merged_tables_tagged_in_place()
     print("ok")
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+# Self time of rag_ready's own modules when importing the CLI. Generous on
+# purpose: it catches an eager heavy import, not scheduler noise.
+IMPORT_BUDGET_MS = float(os.environ.get("RAG_READY_IMPORT_BUDGET_MS", "50"))
+
+# Never needed to start the CLI.
+CLI_FORBIDDEN = (
+    "pydantic",
+    "requests",
+    "openai",
+    "azure",
+    "langchain",
+    "langchain_text_splitters",
+    "PIL",
+    "numpy",
+    "sqlite3",
+    "rag_ready.ai",
+    "rag_ready.steps.cutting_document_step",
+    "rag_ready.chainsaw.recursive_character_text",
+    "rag_ready.parser.azure_di",
+    "rag_ready.cache.caption_cache",
+)
+
+# Not needed for a plain txt file without captions.
+TXT_JOB_FORBIDDEN = (
+    "requests",
+    "openai",
+    "azure",
+    "langchain",
+    "langchain_text_splitters",
+    "PIL",
+    "numpy",
+    "sqlite3",
+    "rag_ready.ai",
+    "rag_ready.steps.enrich_image_captions_step",
+    "rag_ready.chainsaw.langchain_character_text",
+    "rag_ready.chainsaw.token_character_text",
+    "rag_ready.chainsaw.markdown_layout",
+    "rag_ready.parser.azure_di",
+    "rag_ready.parser.html_parser",
+    "rag_ready.cache.caption_cache",
+)
+
+_TXT_JOB = """
+import json, sys
+from loguru import logger
+logger.remove()
+from rag_ready.context import PipelineConfig, PipelineContext
+from rag_ready.pipeline import RagPreprocessPipeline
+ctx = PipelineContext(input_path=sys.argv[1], output_dir=sys.argv[2], config=PipelineConfig(parser_kwargs={"output_dir": sys.argv[2]}))
+assert RagPreprocessPipeline(ctx).run()
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+def _loaded(modules: list[str], forbidden: tuple[str, ...]) -> list[str]:
+    return sorted({m for m in modules for f in forbidden if m == f or m.startswith(f + ".")})
+
+
+def _python(*args: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=root_dir)
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, env=env, cwd=root_dir, check=True)
+
+
+def test_cli_import_is_lazy() -> None:
+    proc = _python("-X", "importtime", "-c", "import rag_ready.cli")
+    self_us: dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:") :].split("|")
+        if parts[0].strip().isdigit():
+            self_us[parts[2].strip()] = int(parts[0])
+
+    assert "rag_ready.cli" in self_us
+    assert _loaded(list(self_us), CLI_FORBIDDEN) == []
+    own_ms = sum(us for name, us in self_us.items() if name.split(".")[0] == "rag_ready") / 1000
+    assert own_ms < IMPORT_BUDGET_MS, f"rag_ready import self time {own_ms:.1f}ms > {IMPORT_BUDGET_MS}ms"
+
+
+def test_small_txt_job_loads_only_what_it_uses() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        input_path = os.path.join(td, "small.txt")
+        with open(input_path, "w", encoding="utf-8") as f:
+            f.write("hello world\n" * 100)
+        proc = _python("-c", _TXT_JOB, input_path, os.path.join(td, "out"))
+        modules = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    assert "rag_ready.steps.write_output_files_step" in modules
+    assert _loaded(modules, TXT_JOB_FORBIDDEN) == []
+
+
+if __name__ == "__main__":
+    test_cli_import_is_lazy()
+    test_small_txt_job_loads_only_what_it_uses()
+    print("ok")
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from rag_ready.batch import build_jobs, run_batch, write_batch_summary
+from rag_ready.context import PipelineConfig
+from rag_ready.utils.file_utils import batch_state_dir
+
+
+def _write(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _run(in_dir: str, out_dir: str, chunk_size: int = 200, files: list[str] | None = None):
+    if files is None:
+        files = sorted(os.path.join(in_dir, n) for n in os.listdir(in_dir))
+    jobs = build_jobs(files, out_dir, base_dir=in_dir)
+    config = PipelineConfig(chunk_size=chunk_size, incremental=True)
+    _, summary = run_batch(jobs, config=config, workers=1, output_root=out_dir)
+    return summary
+
+
+def test_incremental_counts() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        in_dir = os.path.join(td, "in")
+        out_dir = os.path.join(td, "out")
+        for name in ["a.txt", "b.txt", "c.txt"]:
+            _write(os.path.join(in_dir, name), f"{name}\n" * 50)
+
+        s = _run(in_dir, out_dir)
+        assert (s.added, s.changed, s.removed, s.unchanged) == (3, 0, 0, 0)
+
+        json_path = os.path.join(out_dir, "a.txt", "segments.json")
+        mtime = os.path.getmtime(json_path)
+        s = _run(in_dir, out_dir)
+        assert (s.added, s.changed, s.removed, s.unchanged) == (0, 0, 0, 3)
+        assert os.path.getmtime(json_path) == mtime
+
+        _write(os.path.join(in_dir, "b.txt"), "changed\n")
+        os.remove(os.path.join(in_dir, "c.txt"))
+        s = _run(in_dir, out_dir)
+        assert (s.added, s.changed, s.removed, s.unchanged) == (0, 1, 1, 1)
+        assert not os.path.exists(os.path.join(out_dir, "c.txt"))
+
+        s = _run(in_dir, out_dir, chunk_size=100)
+        assert (s.added, s.changed, s.removed, s.unchanged) == (0, 2, 0, 0)
+
+
+def test_narrower_run_keeps_other_outputs() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        in_dir = os.path.join(td, "in")
+        out_dir = os.path.join(td, "out")
+        for name in ["a.txt", "sub/b.txt", "sub/c.txt"]:
+            _write(os.path.join(in_dir, name), f"{name}\n" * 50)
+        every = [os.path.join(in_dir, n) for n in ["a.txt", "sub/b.txt", "sub/c.txt"]]
+
+        s = _run(in_dir, out_dir, files=every)
+        assert s.added == 3
+
+        # Like --glob "sub/*.txt": a.txt is not selected but still exists.
+        s = _run(in_dir, out_dir, files=every[1:])
+        assert (s.removed, s.unchanged) == (0, 2)
+        assert os.path.exists(os.path.join(out_dir, "a.txt", "segments.json"))
+
+        os.remove(every[0])
+        s = _run(in_dir, out_dir, files=every[1:])
+        assert s.removed == 1
+        assert not os.path.exists(os.path.join(out_dir, "a.txt"))
+
+
+def test_inputs_named_like_bookkeeping_files() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        in_dir = os.path.join(td, "in")
+        out_dir = os.path.join(td, "out")
+        names = ["manifest.json", "batch_summary.json", "metrics.json"]
+        for name in names:
+            _write(os.path.join(in_dir, name), f"{name}\n" * 50)
+
+        s = _run(in_dir, out_dir)
+        assert s.added == 3
+        write_batch_summary(out_dir, s)
+        s = _run(in_dir, out_dir)
+        assert s.unchanged == 3
+        for name in names:
+            assert os.path.exists(os.path.join(out_dir, name, "segments.json"))
+        assert sorted(os.listdir(batch_state_dir(out_dir))) == ["batch_summary.json", "manifest.json"]
+
+
+if __name__ == "__main__":
+    test_incremental_counts()
+    test_narrower_run_keeps_other_outputs()
+    test_inputs_named_like_bookkeeping_files()
+    print("ok")
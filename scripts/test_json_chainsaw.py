@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from rag_ready.chainsaw import ChainsawFactory, JsonLinesChainsaw, JsonRecordChainsaw
+from rag_ready.context import PipelineConfig, PipelineContext
+from rag_ready.models.document_model import DocumentInfo, DocumentPageInfo
+from rag_ready.pipeline import RagPreprocessPipeline
+
+DOC = {
+    "meta": {"name": "export", "version": 2},
+    "items": [{"id": i, "text": "中文 " * i} for i in range(8)],
+    "odd key": [1, 2, 3],
+    "quote": 'a"b\\',
+}
+
+
+def _blocks(text: str, size: int) -> list[DocumentPageInfo]:
+    return [DocumentPageInfo(content=text[i : i + size]) for i in range(0, len(text), size)]
+
+
+def test_records_follow_structure() -> None:
+    text = json.dumps(DOC, indent=2)
+    chunks = JsonRecordChainsaw(80, 0).split_chunks(DocumentInfo(content=text))
+
+    assert all(len(c.text) <= 80 for c in chunks)
+    parsed = [json.loads(c.text) for c in chunks]
+    assert parsed[0] == {"meta": DOC["meta"]}
+    assert chunks[0].metadata == {"part": 0, "json_path": "$.meta"}
+    items = [item for c, p in zip(chunks, parsed) if c.metadata["json_path"].startswith("$.items") for item in p]
+    assert items == DOC["items"]
+    assert "中文" in chunks[1].text
+    assert chunks[-1].metadata == {"part": len(chunks) - 1, "json_path": '$["odd key"]', "json_path_end": "$.quote"}
+
+    # Block boundaries anywhere (inside strings, escapes, numbers) give the same chunks.
+    streamed = list(JsonRecordChainsaw(80, 0).iter_chunks(_blocks(text, 3)))
+    assert [(c.text, c.metadata) for c in streamed] == [(c.text, c.metadata) for c in chunks]
+
+    small = JsonRecordChainsaw(4000, 0).split_chunks(DocumentInfo(content=text))
+    assert len(small) == 1 and json.loads(small[0].text) == DOC and small[0].metadata["json_path"] == "$"
+
+
+def test_oversized_values_and_invalid_json() -> None:
+    text = json.dumps({"a": [1, 2], "long": "word " * 100, "b": True})
+    chunks = JsonRecordChainsaw(60, 0).split_chunks(DocumentInfo(content=text))
+    long_parts = [c for c in chunks if c.metadata["json_path"] == "$.long"]
+    assert len(long_parts) > 1 and all(len(c.text) <= 60 for c in long_parts)
+    assert json.loads(chunks[-1].text) == {"b": True}
+
+    broken = '[{"a": 1}, {"b": 2}, {"c": oops, then plain text}]'
+    chunks = JsonRecordChainsaw(40, 0).split_chunks(DocumentInfo(content=broken))
+    assert json.loads(chunks[0].text) == [{"a": 1}, {"b": 2}]
+    assert "oops, then plain text" in "".join(c.text for c in chunks[1:])
+    assert [c.metadata["part"] for c in chunks] == list(range(len(chunks)))
+
+
+def test_json_lines_and_bounded_memory() -> None:
+    lines = "\n".join(json.dumps({"row": i, "body": "x" * 30}) for i in range(10))
+    chunks = JsonLinesChainsaw(120, 0).split_chunks(DocumentInfo(content=lines))
+    assert chunks[0].metadata == {"part": 0, "json_path": "$[0]", "json_path_end": "$[1]"}
+    assert [json.loads(line)["row"] for c in chunks for line in c.text.splitlines()] == list(range(10))
+
+    def export(rows: int):
+        yield DocumentPageInfo(content='{"rows": [')
+        for i in range(rows):
+            yield DocumentPageInfo(content=("," if i else "") + json.dumps({"id": i, "body": "lorem " * 40}))
+        yield DocumentPageInfo(content="]}")
+
+    tracemalloc.start()
+    try:
+        count = sum(1 for _ in JsonRecordChainsaw(1000, 0).iter_chunks(export(5000)))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert 5000 // 4 <= count <= 5000 // 2
+    assert peak < 2 * 1024 * 1024
+
+
+def test_chunk_size_in_tokens() -> None:
+    def count_words(texts: list[str]) -> list[int]:
+        return [len(t.split()) for t in texts]
+
+    text = json.dumps(DOC)
+    chunks = JsonRecordChainsaw(12, 0, count_tokens=count_words).split_chunks(DocumentInfo(content=text))
+    assert all(len(c.text.split()) <= 12 for c in chunks)
+    assert max(len(c.text) for c in chunks) > 3 * 12
+    whole = [json.loads(c.text) for c in chunks if c.metadata["json_path"].startswith("$.items[") and c.text[0] == "["]
+    assert [item for part in whole for item in part] == DOC["items"][:7]
+
+    # --chunk-unit tokens reaches the JSON chainsaw: it loads the tokenizer instead of counting characters.
+    try:
+        ChainsawFactory(100, 0, chunk_unit="tokens", tokenizer_path="missing.json").get_chainsaw("default", "json")
+        raise AssertionError("expected tokenizer_missing")
+    except ValueError as e:
+        assert "tokenizer_missing" in str(e)
+
+
+def test_pipeline_uses_json_chainsaw() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        path = os.path.join(td, "export.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(json.dumps({"id": i, "text": "hello " * 20}) for i in range(20)))
+
+        results = []
+        for streaming in (False, True):
+            out = os.path.join(td, f"out_{streaming}")
+            config = PipelineConfig(chunk_size=300, streaming=streaming, parser_kwargs={"output_dir": out})
+            assert RagPreprocessPipeline(PipelineContext(input_path=path, output_dir=out, config=config)).run()
+            with open(os.path.join(out, "segments.json"), "r", encoding="utf-8") as f:
+                results.append(json.load(f))
+        assert results[0] == results[1]
+        assert results[0][0]["metadata"]["json_path"] == "$[0]"
+
+
+if __name__ == "__main__":
+    test_records_follow_structure()
+    test_oversized_values_and_invalid_json()
+    test_json_lines_and_bounded_memory()
+    test_chunk_size_in_tokens()
+    test_pipeline_uses_json_chainsaw()
+    print("ok")
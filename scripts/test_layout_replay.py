@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import sys
+import tempfile
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from PIL import Image
+
+from rag_ready.context import PipelineConfig, PipelineContext
+from rag_ready.pipeline import RagPreprocessPipeline
+
+
+def _save_result(save_dir: str, input_md5: str) -> None:
+    content = "# Report\n\nintro text\n\n<figure>\nchart\n</figure>\n\nmore\n<!-- PageBreak -->\npage two"
+    start = content.index("<figure>")
+    length = content.index("</figure>") + len("</figure>") - start
+    result = {
+        "apiVersion": "2024-11-30",
+        "modelId": "prebuilt-layout",
+        "content": content,
+        "pages": [{"pageNumber": 1, "width": 8.5, "height": 11}, {"pageNumber": 2, "width": 8.5, "height": 11}],
+        "paragraphs": [],
+        "figures": [{"id": "1.1", "spans": [{"offset": start, "length": length}], "caption": {"content": "Sales"}}],
+    }
+    os.makedirs(os.path.join(save_dir, "figures"))
+    with open(os.path.join(save_dir, "analyze_result.json"), "w", encoding="utf-8") as f:
+        json.dump(result, f)
+    with open(os.path.join(save_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"result_id": "r1", "input_md5": input_md5}, f)
+    buf = io.BytesIO()
+    Image.new("RGB", (16, 16), (200, 10, 10)).save(buf, format="PNG")
+    with open(os.path.join(save_dir, "figures", "1.1.png"), "wb") as f:
+        f.write(buf.getvalue())
+
+
+def test_replay_rebuilds_document_offline() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        input_path = os.path.join(td, "doc.pdf")
+        with open(input_path, "wb") as f:
+            f.write(b"%PDF-1.4 fake")
+        output_dir = os.path.join(td, "out")
+        _save_result(os.path.join(output_dir, "di_result"), hashlib.md5(b"%PDF-1.4 fake").hexdigest())
+
+        config = PipelineConfig(
+            chunk_size=1000,
+            extractor="layout-replay",
+            parser_kwargs={"output_dir": output_dir},
+        )
+        ctx = PipelineContext(input_path=input_path, output_dir=output_dir, config=config)
+        assert RagPreprocessPipeline(ctx).run(), ctx.error
+
+        with open(os.path.join(output_dir, "segments.json"), encoding="utf-8") as f:
+            segments = json.load(f)
+        assert len(segments) == 1
+        assert "![Sales chart](images/1.1.png)" in segments[0]["text"]
+        assert segments[0]["metadata"]["page_end"] == 2
+        assert os.path.exists(os.path.join(output_dir, "images", "1.1.png"))
+
+
+def test_replay_rejects_other_input() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        input_path = os.path.join(td, "doc.pdf")
+        with open(input_path, "wb") as f:
+            f.write(b"other")
+        output_dir = os.path.join(td, "out")
+        _save_result(os.path.join(output_dir, "di_result"), "0" * 32)
+
+        config = PipelineConfig(extractor="layout-replay", parser_kwargs={"output_dir": output_dir})
+        ctx = PipelineContext(input_path=input_path, output_dir=output_dir, config=config)
+        assert not RagPreprocessPipeline(ctx).run()
+        assert "di_result_mismatch" in (ctx.error or "")
+
+
+if __name__ == "__main__":
+    test_replay_rebuilds_document_offline()
+    test_replay_rejects_other_input()
+    print("ok")
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import os
+import sys
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from rag_ready.chainsaw import ChainsawFactory, MarkdownLayoutChainsaw, PageChainsaw
+from rag_ready.models.document_model import DocumentInfo, DocumentPageInfo
+
+
+def _doc(pages: list[str]) -> DocumentInfo:
+    return DocumentInfo(
+        page_list=[DocumentPageInfo(content=c, metadata={"page": i + 1}) for i, c in enumerate(pages)],
+        is_md=True,
+    )
+
+
+def test_sparse_pages_are_packed_with_page_range() -> None:
+    doc = _doc(["# Title\n\nshort intro", "<!-- PageNumber=\"2\" -->\n\nmore text", "tail"])
+    chunks = MarkdownLayoutChainsaw(1000, 0).split_chunks(doc)
+    assert len(chunks) == 1
+    assert chunks[0].metadata["page_start"] == 1
+    assert chunks[0].metadata["page_end"] == 3
+    assert chunks[0].text.startswith("# Title")
+
+
+def test_heading_is_not_left_at_chunk_end() -> None:
+    doc = _doc(["a" * 60 + "\n\n## Section\n\n" + "b" * 60])
+    chunks = MarkdownLayoutChainsaw(80, 0).split_chunks(doc)
+    assert [c.text for c in chunks] == ["a" * 60, "## Section\n\n" + "b" * 60]
+
+
+def test_large_table_split_between_rows() -> None:
+    header = "| h1 | h2 |\n| --- | --- |"
+    rows = [f"| r{i} | {'x' * 20} |" for i in range(30)]
+    doc = _doc(["intro\n\n" + header + "\n" + "\n".join(rows) + "\n\nafter"])
+    chunks = MarkdownLayoutChainsaw(200, 0).split_chunks(doc)
+
+    seen: list[str] = []
+    for c in chunks:
+        for line in c.text.split("\n"):
+            if line.startswith("| r"):
+                assert line in rows
+                seen.append(line)
+        if "| r" in c.text:
+            assert "| h1 | h2 |" in c.text
+    assert seen == rows
+
+
+def test_html_table_split_keeps_rows_whole() -> None:
+    rows = [f"<tr><td>r{i}</td><td>{'y' * 30}</td></tr>" for i in range(20)]
+    table = "<table>\n<tr><th>a</th><th>b</th></tr>\n" + "\n".join(rows) + "\n</table>"
+    chunks = MarkdownLayoutChainsaw(300, 0).split_chunks(_doc([table]))
+    assert len(chunks) > 1
+    for c in chunks:
+        assert c.text.startswith("<table>") and c.text.endswith("</table>")
+        assert "<th>a</th>" in c.text
+    assert sum(c.text.count("<td>r") for c in chunks) == 20
+
+
+def test_layout_chainsaw_selected_for_layout_extractor() -> None:
+    factory = ChainsawFactory(100, 0)
+    assert isinstance(factory.get_chainsaw("layout", "pdf"), MarkdownLayoutChainsaw)
+    assert isinstance(factory.get_chainsaw("page", "pdf"), PageChainsaw)
+
+
+def test_chunk_size_in_tokens() -> None:
+    def count_words(texts: list[str]) -> list[int]:
+        return [len(t.split()) for t in texts]
+
+    header = "| h1 | h2 |\n| --- | --- |"
+    rows = [f"| r{i} | {'word ' * 5}|" for i in range(20)]
+    doc = _doc(["# Title\n\n" + "lorem ipsum " * 30, header + "\n" + "\n".join(rows)])
+    chunks = MarkdownLayoutChainsaw(40, 0, count_tokens=count_words).split_chunks(doc)
+    assert all(len(c.text.split()) <= 40 for c in chunks)
+    assert max(len(c.text) for c in chunks) > 3 * 40
+    assert sum(c.text.count("| r") for c in chunks) == 20
+
+    try:
+        ChainsawFactory(100, 0, chunk_unit="tokens", tokenizer_path="missing.json").get_chainsaw("layout", "pdf")
+        raise AssertionError("expected tokenizer_missing")
+    except ValueError as e:
+        assert "tokenizer_missing" in str(e)
+
+
+if __name__ == "__main__":
+    test_sparse_pages_are_packed_with_page_range()
+    test_heading_is_not_left_at_chunk_end()
+    test_large_table_split_between_rows()
+    test_html_table_split_keeps_rows_whole()
+    test_layout_chainsaw_selected_for_layout_extractor()
+    test_chunk_size_in_tokens()
+    print("ok")
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import os
+import sys
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+scripts_dir = os.path.dirname(os.path.abspath(__file__))
+if scripts_dir not in sys.path:
+    sys.path.insert(0, scripts_dir)
+
+from bench_fixtures import make_analyze_result
+from bench_merge_tables import _legacy_check_paragraph_presence
+from rag_ready.parser.azure_di import merge_table
+
+
+def test_paragraph_index_matches_linear_scan() -> None:
+    result = make_analyze_result(30, tables_per_page=2, paragraphs_per_page=5)
+    offsets = merge_table._build_paragraph_index(result.paragraphs)
+    candidates, _ = merge_table._get_merge_table_candidates_and_table_integral_span(result.tables)
+    assert candidates
+    for c in candidates:
+        expected = _legacy_check_paragraph_presence(result.paragraphs, c["start"], c["end"])
+        assert merge_table._check_paragraph_presence(offsets, c["start"], c["end"]) == expected
+
+
+def test_tables_across_pages_merged_before_first_break() -> None:
+    result = make_analyze_result(3, tables_per_page=1, paragraphs_per_page=0)
+    merged = merge_table.merge_tables(result)
+    assert merged.count("<!-- PageBreak -->") == 2
+    assert merged.count("| --- | --- |") == 1
+    first_page = merged.split("<!-- PageBreak -->")[0]
+    for page in range(1, 4):
+        assert f"| r{page}_0_7 |" in first_page
+
+
+if __name__ == "__main__":
+    test_paragraph_index_matches_linear_scan()
+    test_tables_across_pages_merged_before_first_break()
+    print("ok")
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from rag_ready import metrics
+from rag_ready.batch import build_jobs, run_batch
+from rag_ready.context import PipelineConfig
+from rag_ready.metrics import MetricsRecorder
+from rag_ready.utils.file_utils import batch_state_dir
+
+
+def _write(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_counters_follow_active_recorder() -> None:
+    recorder = MetricsRecorder()
+    metrics.incr("ignored")
+    with metrics.activate(recorder):
+        with recorder.step("work"):
+            metrics.incr("items", 2)
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                list(executor.map(metrics.bind(lambda _: metrics.incr("threaded")), range(4)))
+                # Unbound workers do not see the caller's recorder.
+                list(executor.map(lambda _: metrics.incr("lost"), range(4)))
+    metrics.incr("ignored")
+
+    data = recorder.to_dict()
+    assert data["counters"] == {"items": 2, "threaded": 4}
+    assert [s["name"] for s in data["steps"]] == ["work"]
+    assert data["steps"][0]["ok"] and data["steps"][0]["wall_s"] >= 0
+
+
+def test_batch_writes_per_document_and_total_metrics() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        in_dir = os.path.join(td, "in")
+        _write(os.path.join(in_dir, "a.txt"), "alpha " * 50)
+        _write(os.path.join(in_dir, "b.txt"), "beta " * 50)
+        out_dir = os.path.join(td, "out")
+        jobs = build_jobs([os.path.join(in_dir, n) for n in ("a.txt", "b.txt")], out_dir, base_dir=in_dir)
+        config = PipelineConfig(chunk_size=64, metrics_formats=["json", "prometheus", "otlp"])
+
+        _, summary = run_batch(jobs, config, workers=1, output_root=out_dir)
+        assert summary.succeeded == 2
+
+        with open(os.path.join(out_dir, "a.txt", "metrics.json"), "r", encoding="utf-8") as f:
+            doc = json.load(f)
+        assert [s["name"] for s in doc["steps"]][:3] == ["InputFileInfoStep", "IncrementalCheckStep", "ParserDocumentStep"]
+        assert doc["counters"]["bytes_read"] == 300
+        assert doc["counters"]["chunks_produced"] > 1
+
+        state_dir = batch_state_dir(out_dir)
+        with open(os.path.join(state_dir, "metrics.json"), "r", encoding="utf-8") as f:
+            total = json.load(f)
+        assert total["attributes"]["documents"] == 2
+        assert total["counters"]["bytes_read"] == 300 + 250
+        write_step = next(s for s in total["steps"] if s["name"] == "WriteOutputFilesStep")
+        assert write_step["count"] == 2
+
+        with open(os.path.join(state_dir, "metrics.prom"), "r", encoding="utf-8") as f:
+            prom = f.read()
+        assert 'rag_ready_step_wall_seconds{step="CuttingDocumentStep"}' in prom
+        assert "rag_ready_bytes_read_total 550" in prom
+
+        with open(os.path.join(state_dir, "metrics.otlp.json"), "r", encoding="utf-8") as f:
+            spans = json.load(f)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert spans[0]["name"] == "rag_ready.pipeline"
+        assert all(s["parentSpanId"] == spans[0]["spanId"] for s in spans[1:])
+
+
+if __name__ == "__main__":
+    test_counters_follow_active_recorder()
+    test_batch_writes_per_document_and_total_metrics()
+    print("ok")
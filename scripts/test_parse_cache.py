@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from rag_ready.cache.parse_cache import ParseCache
+from rag_ready.context import PipelineConfig, PipelineContext
+from rag_ready.models.document_model import DocumentInfo, DocumentPageInfo
+from rag_ready.steps.parser_document_step import ParserDocumentStep
+from rag_ready.models.model import FileMessage
+from rag_ready.parser.base_parser import BaseParser
+from rag_ready.parser.parser_factory import PARSERS
+
+
+class CountingPageParser(BaseParser):
+    """Whole-document parser, like the Azure DI ones: streams through the default open_stream."""
+
+    loads = 0
+
+    def load(self, file_bytes: bytes, **kwargs) -> DocumentInfo:
+        CountingPageParser.loads += 1
+        text = file_bytes.decode("utf-8")
+        return DocumentInfo(content=text, page_list=[DocumentPageInfo(content=text, metadata={"page": 1})])
+
+
+def test_key_ignores_paths_and_secrets() -> None:
+    k1 = ParseCache.make_key("abc", "pdf", "layout", {"output_dir": "/a", "azure_di_key": "k1", "formulas": True})
+    k2 = ParseCache.make_key("abc", "pdf", "layout", {"output_dir": "/b", "azure_di_key": "k2", "formulas": True})
+    k3 = ParseCache.make_key("abc", "pdf", "layout", {"output_dir": "/b"})
+    assert k1 == k2
+    assert k1 != k3
+    k4 = ParseCache.make_key("abc", "pdf", "layout", {
+        "output_dir": "/c",
+        "di_result_dir": "/saved",
+        "figure_index_path": "/c/.rag_ready/figure_index.jsonl",
+        "formulas": True,
+    })
+    assert k4 == k1
+
+
+def test_roundtrip_restores_images() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        cache = ParseCache(os.path.join(td, "cache"))
+        src_out = os.path.join(td, "out1")
+        os.makedirs(os.path.join(src_out, "images"))
+        with open(os.path.join(src_out, "images", "1.1.png"), "wb") as f:
+            f.write(b"png")
+
+        doc = DocumentInfo(content="x", is_md=True, use_chainsaw=False)
+        doc.page_list.append(DocumentPageInfo(content="![fig](images/1.1.png)", metadata={"page": 1}))
+        cache.put("k" * 64, doc, output_dir=src_out)
+
+        dst_out = os.path.join(td, "out2")
+        hit = cache.get("k" * 64, output_dir=dst_out)
+        assert hit == doc
+        assert os.path.exists(os.path.join(dst_out, "images", "1.1.png"))
+        assert cache.get("m" * 64) is None
+
+
+def test_prune_by_size() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        cache = ParseCache(os.path.join(td, "cache"))
+        for i, key in enumerate(["a" * 64, "b" * 64, "c" * 64]):
+            cache.put(key, DocumentInfo(content=str(i) * 100))
+            path = os.path.join(cache._entry_dir(key), "document.json")
+            os.utime(path, (1000 + i, 1000 + i))
+        cache.max_bytes = 350
+        cache.prune()
+        assert cache.get("a" * 64) is None
+        assert cache.get("c" * 64) is not None
+
+
+def test_step_skips_parsing_on_hit() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        input_path = os.path.join(td, "a.txt")
+        with open(input_path, "w", encoding="utf-8") as f:
+            f.write("hello")
+        config = PipelineConfig(parse_cache_dir=os.path.join(td, "cache"))
+
+        first = PipelineContext(input_path=input_path, output_dir=td, config=config)
+        first.file_mes = FileMessage.from_local_path(input_path)
+        ParserDocumentStep(first).run()
+        assert first.success and first.doc_mes.content == "hello"
+
+        os.remove(input_path)
+        second = PipelineContext(input_path=input_path, output_dir=td, config=config)
+        second.file_mes = first.file_mes
+        second.input_md5 = first.input_md5
+        ParserDocumentStep(second).run()
+        assert second.success and second.doc_mes.content == "hello"
+
+
+def test_streaming_uses_cache_for_whole_document_parsers() -> None:
+    PARSERS.register("counting_pages", CountingPageParser)
+    with tempfile.TemporaryDirectory() as td:
+        input_path = os.path.join(td, "a.bin")
+        with open(input_path, "w", encoding="utf-8") as f:
+            f.write("page one")
+        config = PipelineConfig(parser="counting_pages", streaming=True, parse_cache_dir=os.path.join(td, "cache"))
+
+        texts = []
+        for _ in range(2):
+            ctx = PipelineContext(input_path=input_path, output_dir=td, config=config)
+            ctx.file_mes = FileMessage.from_local_path(input_path)
+            ParserDocumentStep(ctx).run()
+            assert ctx.success and ctx.doc_mes is None
+            texts.append([b.content for b in ctx.doc_stream.blocks])
+
+        assert texts == [["page one"], ["page one"]]
+        assert CountingPageParser.loads == 1
+
+
+if __name__ == "__main__":
+    test_key_ignores_paths_and_secrets()
+    test_roundtrip_restores_images()
+    test_prune_by_size()
+    test_step_skips_parsing_on_hit()
+    test_streaming_uses_cache_for_whole_document_parsers()
+    print("ok")
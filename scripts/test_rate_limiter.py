@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import os
+import sys
+import time
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from rag_ready.ai.rate_limiter import RateLimiter, TokenBucket, call_with_backoff, is_rate_limited
+
+
+class FakeRateLimitError(Exception):
+    status_code = 429
+
+
+def test_token_bucket_throttles() -> None:
+    bucket = TokenBucket(rate_per_min=600, capacity=1)
+    started = time.monotonic()
+    for _ in range(4):
+        bucket.acquire()
+    assert time.monotonic() - started >= 0.25
+
+
+def test_backoff_retries_on_429() -> None:
+    calls = {"n": 0}
+
+    def flaky() -> str:
+        calls["n"] += 1
+        if calls["n"] < 3:
+            raise FakeRateLimitError("too many requests")
+        return "ok"
+
+    assert call_with_backoff(flaky, RateLimiter(), base_delay_s=0.01) == "ok"
+    assert calls["n"] == 3
+
+
+def test_backoff_does_not_retry_other_errors() -> None:
+    calls = {"n": 0}
+
+    def broken() -> str:
+        calls["n"] += 1
+        raise ValueError("bad request")
+
+    try:
+        call_with_backoff(broken, RateLimiter(), base_delay_s=0.01)
+        raise AssertionError("expected ValueError")
+    except ValueError:
+        pass
+    assert calls["n"] == 1
+
+
+def test_rate_limit_is_not_guessed_from_the_message() -> None:
+    class RateLimitError(Exception):
+        pass
+
+    class Response:
+        status_code = 429
+
+    wrapped = RuntimeError("caption failed")
+    wrapped.__cause__ = FakeRateLimitError("slow down")
+    assert is_rate_limited(FakeRateLimitError("x"))
+    assert is_rate_limited(type("AzureRateLimitError", (RateLimitError,), {})("x"))
+    assert is_rate_limited(wrapped)
+    http_error = Exception("too many")
+    http_error.response = Response()
+    assert is_rate_limited(http_error)
+    assert not is_rate_limited(ValueError("image 4291 of page 429 is 1429 bytes"))
+
+
+if __name__ == "__main__":
+    test_token_bucket_throttles()
+    test_backoff_retries_on_429()
+    test_backoff_does_not_retry_other_errors()
+    test_rate_limit_is_not_guessed_from_the_message()
+    print("ok")
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import base64
+import os
+import random
+import sys
+import tempfile
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from rag_ready.chainsaw import (
+    ChainsawFactory,
+    LangChainRecursiveCharacterText,
+    RecursiveCharacterText,
+    TokenRecursiveCharacterText,
+)
+from rag_ready.chainsaw.token_character_text import MAX_CACHED_PIECE_CHARS, load_token_counter
+from rag_ready.models.document_model import DocumentInfo
+
+
+def _random_text(rng: random.Random, n_words: int) -> str:
+    seps = [" "] * 12 + ["\n"] * 3 + ["\n\n", "  ", "\n \n", ""]
+    words = ["".join(rng.choice("abcdefg中文") for _ in range(rng.randint(1, 40))) for _ in range(n_words)]
+    return "".join(w + rng.choice(seps) for w in words)
+
+
+def test_matches_langchain() -> None:
+    rng = random.Random(7)
+    for _ in range(200):
+        text = _random_text(rng, rng.randint(0, 300))
+        chunk_size = rng.randint(5, 300)
+        overlap = rng.randint(0, chunk_size // 2)
+        doc = DocumentInfo(content=text)
+        expected = LangChainRecursiveCharacterText(chunk_size, overlap).split_text(doc)
+        actual = RecursiveCharacterText(chunk_size, overlap).split_text(doc)
+        assert actual == expected, (chunk_size, overlap, text)
+
+
+def test_factory_honors_explicit_chainsaw() -> None:
+    factory = ChainsawFactory(100, 0)
+    assert isinstance(factory.get_chainsaw("default", "txt"), RecursiveCharacterText)
+    assert isinstance(factory.get_chainsaw("langchain", "txt"), LangChainRecursiveCharacterText)
+
+
+def test_token_chainsaw_counts_in_batches() -> None:
+    calls: list[int] = []
+    seen: list[str] = []
+
+    def count_words(texts: list[str]) -> list[int]:
+        calls.append(len(texts))
+        seen.extend(texts)
+        return [len(t.split()) or 1 for t in texts]
+
+    text = "\n\n".join(" ".join(f"w{i}_{j}" for j in range(30)) for i in range(20))
+    chainsaw = TokenRecursiveCharacterText(25, 5, count_tokens=count_words)
+    chunks = chainsaw.split_text(DocumentInfo(content=text))
+    assert chunks
+    assert all(len(c.split()) <= 25 for c in chunks)
+    assert " ".join(chunks).count("w19_29") >= 1
+    # one batch per split level; short pieces are memoized, pieces split again are not
+    assert sum(calls) > len(calls)
+    assert all(len(p) <= MAX_CACHED_PIECE_CHARS and len(p.split()) < 25 for p in chainsaw._lengths)
+    seen.clear()
+    assert chainsaw.split_text(DocumentInfo(content=text)) == chunks
+    assert seen and all(len(p.split()) >= 25 for p in seen)
+
+
+def test_tiktoken_vocabulary_uses_its_encoding_pattern() -> None:
+    try:
+        import tiktoken
+        import tiktoken_ext.openai_public as openai_public
+    except ImportError:
+        return  # optional dependency (requirements-tokenizer.txt)
+
+    # Byte-level vocabulary plus merges that only apply when a pattern keeps both bytes in one piece.
+    ranks = {bytes([i]): i for i in range(256)}
+    ranks.update({b"oW": 256, b"34": 257})
+    texts = ["HelloWorld", "12345", "it's 2024, HelloWorld!\n\n  x"]
+
+    with tempfile.TemporaryDirectory() as td:
+        counts = {}
+        for encoding in ("o200k_base", "cl100k_base", "r50k_base"):
+            path = os.path.join(td, f"{encoding}.tiktoken")
+            with open(path, "wb") as f:
+                f.write(b"".join(base64.b64encode(t) + b" " + str(r).encode() + b"\n" for t, r in ranks.items()))
+            # The real encoding definition from tiktoken, with its download replaced by the local ranks.
+            load_bpe = openai_public.load_tiktoken_bpe
+            openai_public.load_tiktoken_bpe = lambda *a, **k: ranks
+            try:
+                spec = getattr(openai_public, encoding)()
+            finally:
+                openai_public.load_tiktoken_bpe = load_bpe
+            reference = tiktoken.Encoding(encoding, pat_str=spec["pat_str"], mergeable_ranks=ranks, special_tokens={})
+            counts[encoding] = load_token_counter(path)(texts)
+            assert counts[encoding] == [len(ids) for ids in reference.encode_ordinary_batch(texts)]
+
+        assert counts["o200k_base"][0] == 10 and counts["cl100k_base"][0] == 9
+        assert counts["cl100k_base"][1] == 5 and counts["r50k_base"][1] == 4
+
+        unknown = os.path.join(td, "vocab.tiktoken")
+        os.rename(os.path.join(td, "o200k_base.tiktoken"), unknown)
+        try:
+            load_token_counter(unknown)
+            raise AssertionError("expected tokenizer_unknown_encoding")
+        except ValueError as e:
+            assert "tokenizer_unknown_encoding" in str(e)
+
+
+if __name__ == "__main__":
+    test_matches_langchain()
+    test_factory_honors_explicit_chainsaw()
+    test_token_chainsaw_counts_in_batches()
+    test_tiktoken_vocabulary_uses_its_encoding_pattern()
+    print("ok")
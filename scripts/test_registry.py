@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from rag_ready.chainsaw import ChainsawFactory, RecursiveCharacterText
+from rag_ready.parser import ParserFactory
+from rag_ready.parser.parser_factory import FILE_TYPE_PAESER, PARSER_ENTRY_POINT_GROUP
+from rag_ready.utils.registry import Registry
+
+_PLUGIN = '''
+from rag_ready.parser.txt_parser import TxtParser
+
+
+class UpperTxtParser(TxtParser):
+    pass
+'''
+
+
+def test_factories_share_instances() -> None:
+    assert ParserFactory.get_parser("txt") is ParserFactory.get_parser("txt")
+    assert type(ParserFactory.get_parser("unknown")).__name__ == "TxtParser"
+    a = ChainsawFactory(100, 10).get_chainsaw("default", "md")
+    assert a is ChainsawFactory(100, 10).get_chainsaw("recursive", "txt")
+    assert isinstance(a, RecursiveCharacterText)
+    assert a is not ChainsawFactory(200, 10).get_chainsaw("default", "md")
+
+
+def test_entry_points_override_builtins() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        with open(os.path.join(td, "acme_rag_plugin.py"), "w", encoding="utf-8") as f:
+            f.write(_PLUGIN)
+        dist = os.path.join(td, "acme_rag_plugin-0.1.dist-info")
+        os.makedirs(dist)
+        with open(os.path.join(dist, "METADATA"), "w", encoding="utf-8") as f:
+            f.write("Metadata-Version: 2.1\nName: acme-rag-plugin\nVersion: 0.1\n")
+        with open(os.path.join(dist, "entry_points.txt"), "w", encoding="utf-8") as f:
+            f.write(f"[{PARSER_ENTRY_POINT_GROUP}]\ntxt = acme_rag_plugin:UpperTxtParser\n")
+
+        sys.path.insert(0, td)
+        try:
+            registry: Registry = Registry(PARSER_ENTRY_POINT_GROUP, FILE_TYPE_PAESER, "rag_ready.parser")
+            assert registry.spec("txt") == "acme_rag_plugin:UpperTxtParser"
+            assert registry.resolve("txt").__name__ == "UpperTxtParser"
+            assert registry.resolve("md").__name__ == "MarkdownParser"
+
+            registry.register("txt", ".html_parser:HtmlParser")
+            assert registry.instance("txt").__class__.__name__ == "HtmlParser"
+            try:
+                registry.resolve("pdf")
+                raise AssertionError("expected KeyError")
+            except KeyError:
+                pass
+        finally:
+            sys.path.remove(td)
+            sys.modules.pop("acme_rag_plugin", None)
+
+
+if __name__ == "__main__":
+    test_factories_share_instances()
+    test_entry_points_override_builtins()
+    print("ok")
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import threading
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from rag_ready.batch import build_jobs, run_batch, run_batch_staged
+from rag_ready.context import PipelineConfig
+from rag_ready.scheduler import Stage, StagedScheduler, configure_stages, default_stages
+from rag_ready.utils.file_utils import batch_state_dir
+
+
+def _write(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _read(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def test_staged_batch_matches_serial_batch() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        in_dir = os.path.join(td, "in")
+        names = [f"{n}.txt" for n in range(6)] + ["missing.txt"]
+        for n, name in enumerate(names[:-1]):
+            _write(os.path.join(in_dir, name), f"paragraph {n}. " * (200 + 50 * n))
+        files = [os.path.join(in_dir, name) for name in names]
+        config = PipelineConfig(chunk_size=200, overlap=20, metrics_formats=["json"])
+
+        serial_out = os.path.join(td, "serial")
+        run_batch(build_jobs(files, serial_out, base_dir=in_dir), config, workers=1, output_root=serial_out)
+
+        staged_out = os.path.join(td, "staged")
+        stages = configure_stages(default_stages(2), ["parse=3"])
+        stages = [Stage(s.name, s.steps, s.workers, s.executor, queue_size=1) for s in stages]
+        results, summary = run_batch_staged(
+            build_jobs(files, staged_out, base_dir=in_dir), config, stages=stages, output_root=staged_out
+        )
+
+        assert [os.path.basename(r.input_path) for r in results] == names
+        assert summary.succeeded == 6 and summary.failed == 1
+        assert results[-1].error and not results[-1].ok
+        for name in names[:-1]:
+            assert _read(os.path.join(staged_out, name, "segments.json")) == _read(
+                os.path.join(serial_out, name, "segments.json")
+            )
+        steps = [s["name"] for s in results[0].metrics["steps"]]
+        assert steps == ["InputFileInfoStep", "IncrementalCheckStep", "ParserDocumentStep", "CuttingDocumentStep", "WriteOutputFilesStep"]
+        assert os.path.exists(os.path.join(batch_state_dir(staged_out), "metrics.json"))
+
+
+def test_stage_overrides_are_validated() -> None:
+    stages = configure_stages(default_stages(), ["parse=16", "cut=3:thread"])
+    by_name = {s.name: s for s in stages}
+    assert by_name["parse"].workers == 16 and by_name["cut"].executor == "thread" and by_name["cut"].workers == 3
+    for bad in ("parse", "nope=2", "cut=0", "cut=2:fiber"):
+        try:
+            configure_stages(default_stages(), [bad])
+            raise AssertionError(bad)
+        except ValueError as e:
+            assert str(e).startswith("bad_stage")
+
+
+def test_failing_result_callback_does_not_hang() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        in_dir = os.path.join(td, "in")
+        files = [os.path.join(in_dir, f"{n}.txt") for n in range(4)]
+        for path in files:
+            _write(path, "text. " * 100)
+        seen: list[str] = []
+
+        def on_result(result) -> None:
+            seen.append(result.input_path)
+            raise RuntimeError("callback failed")
+
+        stages = [Stage(s.name, s.steps, 1, "thread") for s in default_stages()]
+        scheduler = StagedScheduler(stages, PipelineConfig(chunk_size=200, overlap=20))
+        runner = threading.Thread(
+            target=lambda: scheduler.run(build_jobs(files, os.path.join(td, "out"), base_dir=in_dir), on_result=on_result),
+            daemon=True,
+        )
+        runner.start()
+        runner.join(timeout=30)
+        assert not runner.is_alive()
+        assert sorted(seen) == sorted(files)
+
+
+if __name__ == "__main__":
+    test_staged_batch_matches_serial_batch()
+    test_stage_overrides_are_validated()
+    test_failing_result_callback_does_not_hang()
+    print("ok")
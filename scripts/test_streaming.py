@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from rag_ready.context import PipelineConfig, PipelineContext
+from rag_ready.pipeline import RagPreprocessPipeline
+
+
+def _run(input_path: str, output_dir: str, streaming: bool) -> list[dict]:
+    config = PipelineConfig(chunk_size=200, overlap=20, streaming=streaming)
+    ctx = PipelineContext(input_path=input_path, output_dir=output_dir, config=config)
+    assert RagPreprocessPipeline(ctx).run(), ctx.error
+    with open(os.path.join(output_dir, "segments.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_streaming_matches_in_memory_for_txt() -> None:
+    paragraphs = [f"第 {i} 段。" + "内容 " * (i % 17 + 3) for i in range(4000)]
+    with tempfile.TemporaryDirectory() as td:
+        input_path = os.path.join(td, "doc.txt")
+        with open(input_path, "w", encoding="utf-8") as f:
+            f.write("\n\n".join(paragraphs))
+
+        expected = _run(input_path, os.path.join(td, "a"), streaming=False)
+        actual = _run(input_path, os.path.join(td, "b"), streaming=True)
+        assert [s["text"] for s in actual] == [s["text"] for s in expected]
+        assert os.path.exists(os.path.join(td, "b", "segments.md"))
+
+
+if __name__ == "__main__":
+    test_streaming_matches_in_memory_for_txt()
+    print("ok")
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from rag_ready.parser.txt_parser import TxtParser
+from rag_ready.utils.file_utils import iter_text_blocks, read_text
+
+
+def test_blocks_split_multibyte_characters() -> None:
+    text = "中文段落，包含多字节字符。\n" * 500 + "end"
+    with tempfile.TemporaryDirectory() as td:
+        path = os.path.join(td, "doc.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+        blocks = list(iter_text_blocks(path, block_size=1000))
+        assert len(blocks) > 1
+        assert "".join(blocks) == text
+        assert read_text(path) == text
+        assert TxtParser().load_path(path).content == text
+
+
+def test_empty_file() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        path = os.path.join(td, "empty.txt")
+        open(path, "wb").close()
+        assert list(iter_text_blocks(path)) == []
+        assert read_text(path) == ""
+
+
+if __name__ == "__main__":
+    test_blocks_split_multibyte_characters()
+    test_empty_file()
+    print("ok")
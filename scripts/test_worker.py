@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from rag_ready.context import PipelineConfig
+from rag_ready.worker import PipelineWorker, make_http_server, serve_stdin
+
+
+# Bypass HTTP(S)_PROXY for the loopback server.
+_opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+
+def _write(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_stdin_protocol_answers_every_line() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        paths = [os.path.join(td, "in", f"{n}.txt") for n in range(3)]
+        for n, path in enumerate(paths):
+            _write(path, f"doc {n} " * 200)
+        worker = PipelineWorker(PipelineConfig(chunk_size=128), output_root=os.path.join(td, "out"), max_jobs=2)
+        worker.warm_up()
+        requests = [{"id": f"j{n}", "input_path": path} for n, path in enumerate(paths)]
+        requests.append({"id": "small", "input_path": paths[0], "options": {"chunk_size": 64}})
+        requests.append({"id": "bad", "input_path": paths[0], "options": {"incremental": True}})
+        requests.append({"id": "../../escape", "input_path": paths[0]})
+        requests.append({"id": "abs", "input_path": paths[0], "output_dir": os.path.join(td, "elsewhere")})
+        lines = [json.dumps(r) for r in requests] + ["", "not json"]
+
+        out = io.StringIO()
+        assert serve_stdin(worker, io.StringIO("\n".join(lines) + "\n"), out) == 0
+        worker.close()
+
+        responses = [json.loads(line) for line in out.getvalue().splitlines()]
+        by_id = {r["id"]: r for r in responses}
+        assert len(responses) == 8
+        for n in range(3):
+            r = by_id[f"j{n}"]
+            assert r["ok"] and r["output_dir"] == os.path.join(td, "out", f"j{n}")
+            assert r["metrics"]["counters"]["bytes_read"] == os.path.getsize(paths[n])
+        assert by_id["small"]["metrics"]["counters"]["chunks_produced"] > by_id["j0"]["metrics"]["counters"]["chunks_produced"]
+        assert not by_id["bad"]["ok"] and "unknown_job_option: incremental" in by_id["bad"]["error"]
+        assert by_id[None]["error"].startswith("bad_request")
+        for job_id in ("../../escape", "abs"):
+            assert "output_dir_outside_root" in by_id[job_id]["error"]
+        assert sorted(os.listdir(td)) == ["in", "out"]
+
+
+def _post_error(url: str, body: bytes, headers: dict[str, str]) -> tuple[int, str]:
+    try:
+        _opener.open(urllib.request.Request(url, data=body, headers=headers))
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)["error"]
+    raise AssertionError("expected an error response")
+
+
+def test_http_jobs_and_health() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        path = os.path.join(td, "in", "a.txt")
+        _write(path, "alpha " * 100)
+        _write(os.path.join(td, "secret.txt"), "secret")
+        worker = PipelineWorker(PipelineConfig(chunk_size=128), max_jobs=1, input_root=os.path.join(td, "in"))
+        server = make_http_server(worker, "127.0.0.1", 0, token="s3cret")
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        headers = {"Content-Type": "application/json", "Authorization": "Bearer s3cret"}
+        try:
+            body = json.dumps({"id": "a", "input_path": "a.txt", "output_dir": os.path.join(td, "out")}).encode()
+            with _opener.open(urllib.request.Request(f"{base}/jobs", data=body, headers=headers)) as resp:
+                result = json.load(resp)
+            assert result["ok"] and result["id"] == "a" and result["input_path"] == os.path.realpath(path)
+            assert os.path.exists(os.path.join(td, "out", "segments.json"))
+
+            # A cross-origin form post, a missing token and an input outside --input-root are refused.
+            form = {"Content-Type": "text/plain", "Authorization": "Bearer s3cret"}
+            assert _post_error(f"{base}/jobs", body, form)[0] == 415
+            assert _post_error(f"{base}/jobs", body, {"Content-Type": "application/json"}) == (401, "unauthorized")
+            escape = json.dumps({"id": "x", "input_path": "../secret.txt", "output_dir": os.path.join(td, "x")}).encode()
+            code, error = _post_error(f"{base}/jobs", escape, headers)
+            assert code == 422 and "input_path_outside_root" in error
+
+            missing = json.dumps({"id": "m", "input_path": path}).encode()
+            code, error = _post_error(f"{base}/jobs", missing, headers)
+            assert code == 422 and "output_dir_missing" in error
+
+            with _opener.open(f"{base}/health") as resp:
+                assert json.load(resp)["done"] == 3
+        finally:
+            server.shutdown()
+            server.server_close()
+            worker.close()
+
+
+if __name__ == "__main__":
+    test_stdin_protocol_answers_every_line()
+    test_http_jobs_and_health()
+    print("ok")
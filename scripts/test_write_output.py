@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from rag_ready.context import PipelineConfig, PipelineContext
+from rag_ready.models.document_model import DocumentChunkInfo
+from rag_ready.steps.write_output_files_step import WriteOutputFilesStep
+
+
+def _write(out_dir: str, n: int, **config) -> PipelineContext:
+    ctx = PipelineContext(input_path="x", output_dir=out_dir, config=PipelineConfig(**config))
+    ctx.chunk_list = [DocumentChunkInfo(text=f"t{i}", metadata={"part": i}) for i in range(n)]
+    WriteOutputFilesStep(ctx).run()
+    assert ctx.success
+    return ctx
+
+
+def test_jsonl_rollover_and_stale_parts() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        _write(td, 5, output_format="jsonl", jsonl_max_segments=2, write_markdown=False)
+        assert sorted(os.listdir(td)) == ["segments-00000.jsonl", "segments-00001.jsonl", "segments-00002.jsonl"]
+        with open(os.path.join(td, "segments-00002.jsonl"), encoding="utf-8") as f:
+            assert [json.loads(line)["text"] for line in f] == ["t4"]
+
+        _write(td, 3, output_format="jsonl", jsonl_max_segments=2, write_markdown=False)
+        assert sorted(os.listdir(td)) == ["segments-00000.jsonl", "segments-00001.jsonl"]
+
+        _write(td, 3, output_format="jsonl")
+        assert sorted(os.listdir(td)) == ["segments.jsonl", "segments.md"]
+
+
+def test_switching_formats_removes_stale_outputs() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        _write(td, 3)
+        assert sorted(os.listdir(td)) == ["segments.json", "segments.md"]
+
+        _write(td, 3, output_format="jsonl", write_markdown=False)
+        assert sorted(os.listdir(td)) == ["segments.jsonl"]
+
+        _write(td, 5, output_format="jsonl", jsonl_max_segments=2)
+        assert sorted(os.listdir(td)) == ["segments-00000.jsonl", "segments-00001.jsonl", "segments-00002.jsonl", "segments.md"]
+
+        # Files the step never writes are left alone.
+        with open(os.path.join(td, "notes.txt"), "w", encoding="utf-8") as f:
+            f.write("keep")
+        _write(td, 2, write_markdown=False)
+        assert sorted(os.listdir(td)) == ["notes.txt", "segments.json"]
+
+
+def test_output_hash_is_stable() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        first = _write(td, 3)
+        second = _write(td, 3)
+        third = _write(td, 4)
+        assert first.output_md5 == second.output_md5 != third.output_md5
+
+
+if __name__ == "__main__":
+    test_jsonl_rollover_and_stale_parts()
+    test_switching_formats_removes_stale_outputs()
+    test_output_hash_is_stable()
+    print("ok")